@@ -23,124 +23,192 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['STATIC_FOLDER'] = os.path.join(basedir, 'static')
+    app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', 2))
+    app.config['JOB_RECOVER'] = os.getenv('JOB_RECOVER', '1') != '0'
+    app.config['JOB_HEARTBEAT_INTERVAL'] = float(os.getenv('JOB_HEARTBEAT_INTERVAL', 10))
+    app.config['JOB_STALE_SECONDS'] = float(os.getenv('JOB_STALE_SECONDS', 60))
+    app.config['JINJA_CACHE_DIR'] = os.getenv('JINJA_CACHE_DIR')
+    app.config['RESULT_CACHE_BACKEND'] = os.getenv('RESULT_CACHE_BACKEND', 'memory')
+    app.config['RESULT_CACHE_TTL'] = int(os.getenv('RESULT_CACHE_TTL', 300))
+    app.config['RESULT_CACHE_MAX_ENTRIES'] = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 1024))
+    app.config['RESULT_CACHE_DIR'] = os.getenv('RESULT_CACHE_DIR')
+    app.config['REDIS_URL'] = os.getenv('REDIS_URL')
+    app.config['SQLITE_PROFILE'] = os.getenv('SQLITE_PROFILE', '1') != '0'
+    app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    app.config['SQLITE_CACHE_SIZE'] = int(os.getenv('SQLITE_CACHE_SIZE', -64000))
+    app.config['SQLITE_BUSY_TIMEOUT'] = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))
+    app.config['SQLITE_MAINTENANCE_INTERVAL'] = int(os.getenv('SQLITE_MAINTENANCE_INTERVAL', 3600))
+    app.config['PAGE_LOADER_WORKERS'] = int(os.getenv('PAGE_LOADER_WORKERS', 4))
+    app.config['PAGE_LOADER_TIMEOUT'] = float(os.getenv('PAGE_LOADER_TIMEOUT', 5))
+    app.config['PAGE_LOADER_MAX_HUNG'] = int(os.getenv('PAGE_LOADER_MAX_HUNG', 0)) or None
+    app.config['PROFILING'] = os.getenv('PROFILING', '0') == '1'
+    app.config['PROFILING_SECRET'] = os.getenv('PROFILING_SECRET')
+    app.config['PROFILING_SAMPLE_RATE'] = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+    app.config['PROFILING_BUFFER_SIZE'] = int(os.getenv('PROFILING_BUFFER_SIZE', 50))
+    app.config['GROUP_COMMIT'] = os.getenv('GROUP_COMMIT', '0') == '1'
+    app.config['GROUP_COMMIT_MAX_BATCH'] = int(os.getenv('GROUP_COMMIT_MAX_BATCH', 50))
+    app.config['GROUP_COMMIT_MAX_DELAY_MS'] = float(os.getenv('GROUP_COMMIT_MAX_DELAY_MS', 5))
     
     # 初始化扩展
     db.init_app(app)
     CORS(app)
     
+    # 按需请求性能分析（最先注册，包裹其他请求钩子）
+    from app.profiling import init_profiling
+    init_profiling(app)
+    
+    # SQLite 连接参数、写事务串行化与定期维护
+    from app.sqlite_profile import init_sqlite_profile
+    init_sqlite_profile(app)
+    
+    # 查询结果缓存
+    from app.result_cache import init_result_cache
+    init_result_cache(app)
+    
+    # 页面数据并发加载
+    from app.page_loader import init_page_loader
+    init_page_loader(app)
+    
+    # 并发新增的合并提交（可选）
+    from app.group_commit import init_group_commit
+    init_group_commit(app)
+    
     # 注册蓝图
     from app.api import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # 模板字节码缓存与字典表片段缓存
+    from app.fragments import init_fragments
+    init_fragments(app)
+    
+    # 静态资源指纹
+    from app.assets import init_assets
+    init_assets(app)
+    
+    # 注册命令行
+    from app.cli import ledger_cli
+    app.cli.add_command(ledger_cli)
+    
     # 创建数据库表
     with app.app_context():
         db.create_all()
+        from app.models.money import verify_money_storage
+        verify_money_storage()
+    
+    # 后台任务执行器
+    from app.jobs import init_job_runner
+    init_job_runner(app)
     
     # 根路径返回首页模板
     @app.route('/')
     def index():
         from datetime import datetime
-        from app.models.consumption import get_pending_count
+        from app.api.dashboard import load_dashboard
+        from app.models.budget import get_budget_status
         
         # 获取当月1号作为默认开始时间
         today = datetime.now()
         default_start = today.replace(day=1).strftime('%Y-%m-%d')
         default_end = today.strftime('%Y-%m-%d')
         
+        # 首屏所需数据（概览、待收货数量）直接嵌入页面，无需再请求接口
         try:
-            pending_count = get_pending_count()
+            dashboard = load_dashboard(default_start, default_end)
         except Exception as e:
-            print(f"Error getting pending count: {e}")
-            pending_count = 0
+            print(f"Error loading dashboard: {e}")
+            dashboard = None
+        
+        # 本月预算来自按月累计支出，无需对消费项求和
+        try:
+            budgets = get_budget_status(today.strftime('%Y-%m'))
+        except Exception as e:
+            print(f"Error loading budgets: {e}")
+            budgets = []
         
         return render_template('index.html', 
-                               pending_count=pending_count,
+                               dashboard=dashboard,
+                               budgets=budgets,
+                               pending_count=dashboard['pending_count'] if dashboard else 0,
                                default_start=default_start,
                                default_end=default_end)
     
-    # 页面路由
+    # 页面路由（各项数据互不依赖，由页面数据加载器并发查询，单项失败只影响该项）
     @app.route('/list')
     def consumption_list():
-        """消费列表页"""
+        """消费列表页（字典表下拉选项由片段缓存提供，并发加载后传入模板）"""
         from app.models.consumption import get_pending_count
-        from app.models.channel import get_all_channels
-        from app.models.main_type import get_all_main_types
-        from app.models.sub_type import get_all_sub_types
+        from app.page_loader import load_page_data
+        from app.fragments import load_fragment, lookup_version
+        from functools import partial
         
-        try:
-            pending_count = get_pending_count()
-            channels = get_all_channels()
-            main_types = get_all_main_types()
-            sub_types = get_all_sub_types()
-        except Exception as e:
-            print(f"Error in consumption_list: {e}")
-            pending_count = 0
-            channels = []
-            main_types = []
-            sub_types = []
+        names = ('channel_options', 'main_type_options', 'sub_type_options')
+        version = lookup_version()
+        data = load_page_data({
+            'pending_count': get_pending_count,
+            **{name: partial(load_fragment, name, version) for name in names}
+        })
         
-        return render_template('list.html', 
-                               pending_count=pending_count,
-                               channels=channels,
-                               main_types=main_types,
-                               sub_types=sub_types)
+        return render_template('list.html',
+                               pending_count=data.get('pending_count', 0),
+                               fragments={name: data[name] for name in names if name in data},
+                               load_errors=data.errors)
     
     @app.route('/pending')
     def pending_list():
         """待收货列表页"""
-        from app.models.consumption import get_pending_count, get_pending_consumption
+        from app.models.consumption import get_pending_count, get_pending_consumption, PENDING_PAGE_FIELDS
+        from app.page_loader import load_page_data
+        from functools import partial
         
-        try:
-            pending_count = get_pending_count()
-            pending_list = get_pending_consumption()
-        except Exception as e:
-            print(f"Error in pending_list: {e}")
-            pending_count = 0
-            pending_list = []
+        data = load_page_data({
+            'pending_count': get_pending_count,
+            'pending_list': partial(get_pending_consumption, PENDING_PAGE_FIELDS)
+        })
         
-        return render_template('pending.html', pending_list=pending_list, pending_count=pending_count)
+        return render_template('pending.html',
+                               pending_list=data.get('pending_list', []),
+                               pending_count=data.get('pending_count', 0),
+                               load_errors=data.errors)
     
     @app.route('/price')
     def price_query():
-        """价格查询页"""
-        from app.models.sub_type import get_all_sub_types
+        """价格查询页（统计类型选项包括已删除但仍有消费记录的统计类型，用于查询历史价格）"""
         from app.models.consumption import get_pending_count
+        from app.page_loader import load_page_data
+        from app.fragments import load_fragment, lookup_version
+        from functools import partial
         
-        try:
-            sub_types = get_all_sub_types()
-            pending_count = get_pending_count()
-        except Exception as e:
-            print(f"Error in price_query: {e}")
-            sub_types = []
-            pending_count = 0
+        names = ('used_sub_type_options',)
+        version = lookup_version()
+        data = load_page_data({
+            'pending_count': get_pending_count,
+            **{name: partial(load_fragment, name, version) for name in names}
+        })
         
-        return render_template('price.html', sub_types=sub_types, pending_count=pending_count)
+        return render_template('price.html',
+                               pending_count=data.get('pending_count', 0),
+                               fragments={name: data[name] for name in names if name in data},
+                               load_errors=data.errors)
     
     @app.route('/manage')
     def manage_page():
-        """管理页面"""
+        """管理页面（字典表格行由片段缓存提供，并发加载后传入模板）"""
         from app.models.consumption import get_pending_count
-        from app.models.channel import get_all_channels
-        from app.models.main_type import get_all_main_types
-        from app.models.sub_type import get_all_sub_types
+        from app.page_loader import load_page_data
+        from app.fragments import load_fragment, lookup_version
+        from functools import partial
         
-        try:
-            pending_count = get_pending_count()
-            channels = get_all_channels()
-            main_types = get_all_main_types()
-            sub_types = get_all_sub_types()
-        except Exception as e:
-            print(f"Error in manage_page: {e}")
-            pending_count = 0
-            channels = []
-            main_types = []
-            sub_types = []
+        names = ('channel_rows', 'main_type_rows', 'sub_type_rows')
+        version = lookup_version()
+        data = load_page_data({
+            'pending_count': get_pending_count,
+            **{name: partial(load_fragment, name, version) for name in names}
+        })
         
-        return render_template('manage.html', 
-                               pending_count=pending_count,
-                               channels=channels,
-                               main_types=main_types,
-                               sub_types=sub_types)
+        return render_template('manage.html',
+                               pending_count=data.get('pending_count', 0),
+                               fragments={name: data[name] for name in names if name in data},
+                               load_errors=data.errors)
     
     # favicon.ico路由
     @app.route('/favicon.ico')
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__)
 
-from app.api import consumption, channel, main_type, sub_type, statistics
+from app.api import consumption, channel, main_type, sub_type, statistics, usage_record, job, cache, dashboard, profiling, budget
@@ -0,0 +1,109 @@
+from app.api import api_bp
+from flask import request, jsonify
+from app.models import Budget, MainType
+from app.models.budget import get_budget_status
+from app.models.lookup import get_lookup_cache
+from app.schemas import BudgetSet
+from app import db
+from datetime import datetime
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+@api_bp.route('/budget', methods=['GET'])
+def get_budgets():
+    """获取指定月份（默认当月）各账单类型的预算、已支出和剩余"""
+    try:
+        month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+        datetime.strptime(month, '%Y-%m')
+
+        return jsonify({
+            'success': True,
+            'data': get_budget_status(month)
+        }), 200
+    except ValueError as e:
+        logger.warning(f'月份格式错误: {str(e)}')
+        return jsonify({
+            'success': False,
+            'message': '月份格式错误，应为 YYYY-MM！'
+        }), 400
+    except Exception as e:
+        logger.error(f'获取预算失败: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/budget', methods=['PUT'])
+def set_budget():
+    """设置账单类型的月度预算（已存在时覆盖）"""
+    try:
+        data = request.get_json()
+        logger.info(f'接收到的预算数据: {data}')
+        schema = BudgetSet(**data)
+
+        main_type_id = get_lookup_cache().get_id(MainType, schema.main_type)
+        if main_type_id is None:
+            logger.warning(f'账单类型不存在: {schema.main_type}')
+            return jsonify({
+                'success': False,
+                'message': '账单类型不存在！'
+            }), 404
+
+        budget = db.session.get(Budget, main_type_id)
+        if budget is None:
+            budget = Budget(main_type_id=main_type_id)
+            db.session.add(budget)
+        budget.amount = schema.amount
+        db.session.commit()
+        logger.info(f'预算设置成功，账单类型: {schema.main_type}, 金额: {schema.amount}')
+
+        return jsonify({
+            'success': True,
+            'message': '设置成功！',
+            'data': budget.to_dict()
+        }), 200
+    except ValueError as e:
+        logger.warning(f'预算数据验证失败: {str(e)}')
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f'设置预算失败: {str(e)}', exc_info=True)
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/budget/<main_type>', methods=['DELETE'])
+def delete_budget(main_type):
+    """删除账单类型的月度预算"""
+    try:
+        main_type_id = get_lookup_cache().get_id(MainType, main_type)
+        budget = db.session.get(Budget, main_type_id) if main_type_id is not None else None
+        if budget is None:
+            return jsonify({
+                'success': False,
+                'message': '预算不存在！'
+            }), 404
+
+        db.session.delete(budget)
+        db.session.commit()
+        logger.info(f'预算删除成功，账单类型: {main_type}')
+
+        return jsonify({
+            'success': True,
+            'message': '删除成功！'
+        }), 200
+    except Exception as e:
+        logger.error(f'删除预算失败，账单类型: {main_type}, 错误: {str(e)}', exc_info=True)
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
@@ -0,0 +1,23 @@
+from app.api import api_bp
+from flask import jsonify
+from app.result_cache import get_result_cache
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """获取结果缓存各接口的命中率（本进程）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': get_result_cache().stats()
+        }), 200
+    except Exception as e:
+        logger.error(f'获取缓存统计失败: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
@@ -1,6 +1,7 @@
 from app.api import api_bp
 from flask import request, jsonify
-from app.models import Channel
+from app.models import Channel, Consumption
+from app.models.lookup import get_lookup_cache, delete_lookup, mark_lookups_changed
 from app.schemas import ChannelCreate, ChannelUpdate
 from app import db
 import logging
@@ -16,7 +17,7 @@ def get_channels():
         logger.info('开始获取渠道列表')
         
         # 执行数据库查询
-        channels = Channel.query.all()
+        channels = Channel.query.filter_by(is_deleted=False).all()
         logger.info(f'数据库查询完成，获取到 {len(channels)} 个渠道')
         
         # 转换为字典列表
@@ -51,18 +52,26 @@ def create_channel():
         existing = Channel.query.filter_by(name=schema.name).first()
         logger.info(f'检查渠道是否已存在，结果: {existing}')
         
-        if existing:
+        if existing and not existing.is_deleted:
             logger.warning(f'渠道已存在: {schema.name}')
             return jsonify({
                 'success': False,
                 'message': '渠道已存在！'
             }), 400
         
-        # 创建渠道
-        channel = Channel(name=schema.name)
-        db.session.add(channel)
+        if existing:
+            # 恢复仍被消费项引用的同名渠道
+            logger.info(f'恢复已删除的渠道: {schema.name}')
+            existing.is_deleted = False
+            channel = existing
+        else:
+            # 创建渠道
+            channel = Channel(name=schema.name)
+            db.session.add(channel)
+        mark_lookups_changed()
         logger.info('准备提交数据库')
         db.session.commit()
+        get_lookup_cache().invalidate(Channel)
         logger.info(f'渠道创建成功，ID: {channel.id}, 名称: {channel.name}')
         
         response = {
@@ -114,9 +123,12 @@ def update_channel(id):
                 'message': '渠道已存在！'
             }), 400
         
+        # 消费项只引用ID，改名只需更新字典表一行
         channel.name = schema.name
+        mark_lookups_changed()
         logger.info('准备提交数据库更新')
         db.session.commit()
+        get_lookup_cache().invalidate(Channel)
         logger.info(f'渠道更新成功，ID: {id}, 新名称: {channel.name}')
         
         response = {
@@ -152,7 +164,7 @@ def delete_channel(id):
             }), 404
         
         logger.info(f'准备删除渠道: {channel.name}')
-        db.session.delete(channel)
+        delete_lookup(channel, Consumption.channel_id)
         logger.info('准备提交数据库更新')
         db.session.commit()
         logger.info(f'渠道删除成功，ID: {id}, 名称: {channel.name}')
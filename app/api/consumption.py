@@ -1,9 +1,21 @@
 from app.api import api_bp
 from flask import request, jsonify
-from app.models import Consumption
-from app.schemas import ConsumptionCreate, ConsumptionUpdate
+from app.models import Channel, Consumption, MainType, SubType
+from app.models.budget import get_consumption_budget, track_spend, untrack_spend
+from app.models.consumption import fetch_consumption_dicts, mark_consumption_changed, parse_fields
+from app.models.consumption import get_pending_consumption as query_pending_consumption
+from app.models.lookup import get_lookup_cache
+from app.models.price_sketch import (
+    consumption_sub_type_ids, mark_price_sketches_stale, price_verdict, rebuild_price_sketch, record_price
+)
+from app.models.pricing import apply_derived_prices, derived_price_updates
+from app.models.suggest import get_content_index, MAX_SUGGESTIONS
+from app.result_cache import get_result_cache
+from app.schemas import ConsumptionCreate, ConsumptionUpdate, ConsumptionBulkUpdate
 from app import db
+from app.group_commit import get_group_committer
 from datetime import datetime, date
+from functools import partial
 import math
 import logging
 
@@ -11,6 +23,9 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 列表分页时单页最多返回的条数
+MAX_PAGE_SIZE = 1000
+
 def parse_purchase_time(time_str):
     """解析购买时间，支持多种格式"""
     if not time_str:
@@ -31,15 +46,173 @@ def parse_purchase_time(time_str):
     # 如果所有格式都失败，抛出异常
     raise ValueError(f"时间格式错误: {time_str}，支持的格式: YYYY-MM-DDTHH:MM 或 YYYY-MM-DD HH:MM")
 
+def get_price_verdict(consumption):
+    """新增消费项的单价在所属统计类型新增前的历史价格中的位置，无统计类型、无历史或无法判断时返回None"""
+    price = float(consumption.min_unit_price or 0)
+    if consumption.sub_type_id is None or price <= 0:
+        return None
+    try:
+        history = consumption.price_history
+        if history is None:
+            # 新增时摘要不可用，按表重建（排除本条）
+            history = rebuild_price_sketch(consumption.sub_type_id, exclude=consumption)
+        return price_verdict(history, price)
+    except Exception as e:
+        # 消费项已保存，价格判断失败不影响创建结果
+        logger.error(f'价格判断失败，ID: {consumption.id}, 错误: {str(e)}', exc_info=True)
+        return None
+
+def insert_consumption(schema, create_time):
+    """在当前事务中写入新增消费项及其价格摘要、当月累计（不提交）"""
+    consumption = Consumption(
+        content=schema.content,
+        quantity=schema.quantity,
+        total_price=schema.total_price,
+        channel=schema.channel,
+        main_type=schema.main_type,
+        sub_type=schema.sub_type,
+        unit_coefficient=schema.unit_coefficient,
+        receive_status=schema.receive_status,
+        create_time=create_time,
+        statistical_status='计入' if schema.receive_status == '已收货' else '不计入',
+        tag=schema.tag,
+        evaluate=schema.evaluate,
+        start_use_time=datetime.strptime(schema.start_use_time, '%Y-%m-%d').date() if schema.start_use_time else None,
+        end_use_time=datetime.strptime(schema.end_use_time, '%Y-%m-%d').date() if schema.end_use_time else None
+    )
+    
+    # 最小单位单价和日均价格由统一公式在数据库中计算
+    apply_derived_prices(consumption)
+    
+    db.session.add(consumption)
+    mark_consumption_changed()
+    db.session.flush()
+    # 单价加入所属统计类型的价格摘要（记下加入前的历史，用于价格判断），支出计入当月累计
+    consumption.price_history = record_price(consumption)
+    track_spend([consumption.id])
+    return consumption
+
+def finish_created(consumptions):
+    """新增消费项提交后更新内容补全索引，生成各项的响应数据"""
+    get_content_index().record(*consumptions)
+    items = []
+    for consumption in consumptions:
+        item = consumption.to_dict()
+        item['price_verdict'] = get_price_verdict(consumption)
+        item['budget'] = get_consumption_budget(consumption)
+        items.append(item)
+    return items
+
+# 影响当月累计支出的列
+SPEND_COLUMNS = {'total_price', 'main_type_id', 'create_time', 'receive_status'}
+# 影响价格摘要（统计类型下的最小单位单价分布）的列
+PRICE_SKETCH_COLUMNS = {'quantity', 'total_price', 'unit_coefficient', 'sub_type_id'}
+# 内容补全索引条目中的列
+SUGGEST_COLUMNS = {'content', 'create_time', 'total_price', 'channel_id', 'main_type_id', 'sub_type_id', 'unit_coefficient'}
+
+def build_update_values(schema):
+    """修改请求中填写的字段转换为 UPDATE 的列值
+
+    字典项名称只解析为已有的ID，返回 (列值, 尚不存在的字典项 {列: (模型, 名称)})，
+    不存在的字典项待确认可以修改后再创建，被拒绝的修改不会留下新字典项。
+    """
+    values = {}
+    for field in ('content', 'quantity', 'total_price', 'unit_coefficient', 'tag', 'evaluate', 'pickup_code'):
+        value = getattr(schema, field)
+        if value is not None:
+            values[field] = value
+    
+    lookup_cache = get_lookup_cache()
+    missing = {}
+    for field, model in (('channel', Channel), ('main_type', MainType), ('sub_type', SubType)):
+        value = getattr(schema, field)
+        if value is not None:
+            id = lookup_cache.get_id(model, value)
+            if id is None:
+                missing[f'{field}_id'] = (model, value)
+            else:
+                values[f'{field}_id'] = id
+    
+    if schema.receive_status is not None:
+        values['receive_status'] = schema.receive_status
+        values['statistical_status'] = '计入' if schema.receive_status == '已收货' else '不计入'
+    if schema.purchase_time is not None:
+        values['create_time'] = parse_purchase_time(schema.purchase_time)
+    for field in ('start_use_time', 'end_use_time'):
+        value = getattr(schema, field)
+        if value is not None:
+            values[field] = datetime.strptime(value, '%Y-%m-%d').date()
+    return values, missing
+
+def update_rejection(id, version, conflict=False):
+    """修改被拒绝时的响应：消费项不存在返回404，版本号不一致（或 conflict）返回409并附当前数据；可以修改时返回None"""
+    current = Consumption.query.filter_by(id=id, is_deleted=False).first()
+    if current is None:
+        logger.warning(f'消费项不存在，ID: {id}')
+        return jsonify({
+            'success': False,
+            'message': '消费项不存在！'
+        }), 404
+    if conflict or current.version != version:
+        logger.warning(f'消费项已被修改，ID: {id}, 请求版本: {version}, 当前版本: {current.version}')
+        return jsonify({
+            'success': False,
+            'message': '消费项已被修改，请刷新后重试！',
+            'data': current.to_dict()
+        }), 409
+    return None
+
+def execute_update(statement, id):
+    """执行单行 UPDATE，返回更新后的消费项，未更新任何行时返回None
+
+    支持 UPDATE ... RETURNING 的数据库（SQLite、PostgreSQL）在同一条语句中取回更新后的行，
+    不支持时（MySQL）再按ID查询一次。
+    """
+    statement = statement.execution_options(synchronize_session=False)
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(
+            statement.returning(Consumption).execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+    if db.session.execute(statement).rowcount == 0:
+        return None
+    return db.session.get(Consumption, id, populate_existing=True)
+
+def execute_bulk_update(conditions, values):
+    """执行批量条件 UPDATE，返回实际更新的消费项（按ID排序）
+
+    支持 RETURNING 的数据库直接取回更新的行；不支持时（MySQL）先锁定并记下满足条件的ID，只更新并返回这些行。
+    """
+    statement = db.update(Consumption).values(**values).execution_options(synchronize_session=False)
+    if db.session.get_bind().dialect.update_returning:
+        items = db.session.execute(
+            statement.where(*conditions).returning(Consumption).execution_options(populate_existing=True)
+        ).scalars().all()
+        return sorted(items, key=lambda item: item.id)
+    ids = db.session.scalars(
+        db.select(Consumption.id).where(*conditions).order_by(Consumption.id).with_for_update()
+    ).all()
+    if not ids:
+        return []
+    db.session.execute(statement.where(Consumption.id.in_(ids)))
+    return Consumption.query.filter(Consumption.id.in_(ids)).order_by(Consumption.id).populate_existing().all()
+
 @api_bp.route('/consumption', methods=['GET'])
 def get_consumption():
     """获取消费项列表"""
     try:
         logger.info('开始获取消费项列表')
         
-        # 获取查询参数
+        # 获取查询参数，fields 指定时只查询并返回这些字段
         start_date = request.args.get('startDate')
         end_date = request.args.get('endDate')
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            logger.warning(f'字段参数错误: {str(e)}')
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
         # 构建查询
         query = Consumption.query.filter_by(is_deleted=False)
@@ -64,18 +237,29 @@ def get_consumption():
             except ValueError:
                 logger.warning(f'结束日期格式错误：{end_date}')
         
-        # 执行查询
-        consumptions = query.order_by(Consumption.create_time.desc()).all()
-        logger.info(f'数据库查询完成，获取到 {len(consumptions)} 条消费项')
-        
-        # 转换为字典列表
-        data = [item.to_dict() for item in consumptions]
-        logger.info(f'数据转换完成，准备返回 {len(data)} 条记录')
+        # 按时间倒序，同一时间按ID倒序，保证分页时顺序稳定
+        query = query.order_by(Consumption.create_time.desc(), Consumption.id.desc())
+        
+        # 传入 limit 时分页返回（offset 为已加载的条数），多取一条判断是否还有下一页
+        limit = request.args.get('limit', type=int)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        has_more = False
+        if limit is not None:
+            limit = min(max(limit, 1), MAX_PAGE_SIZE)
+            data = fetch_consumption_dicts(query.offset(offset).limit(limit + 1), fields)
+            has_more = len(data) > limit
+            data = data[:limit]
+        else:
+            data = fetch_consumption_dicts(query, fields)
+        logger.info(f'数据库查询完成，准备返回 {len(data)} 条记录')
         
         response = {
             'success': True,
             'data': data
         }
+        if limit is not None:
+            response['has_more'] = has_more
+            response['next_offset'] = offset + len(data)
         logger.info('返回消费项列表成功')
         return jsonify(response), 200
     except Exception as e:
@@ -96,20 +280,6 @@ def create_consumption():
         schema = ConsumptionCreate(**data)
         logger.info(f'数据验证通过，准备创建消费项: {schema.content}')
         
-        # 计算最小单位单价
-        min_unit_price = schema.total_price / (schema.quantity * schema.unit_coefficient)
-        logger.info(f'计算最小单位单价: {min_unit_price}')
-        
-        # 计算使用天数和日均价格
-        daily_average_price = 0.0
-        if schema.start_use_time and schema.end_use_time:
-            start_date = datetime.strptime(schema.start_use_time, '%Y-%m-%d').date()
-            end_date = datetime.strptime(schema.end_use_time, '%Y-%m-%d').date()
-            days = (end_date - start_date).days + 1
-            if days > 0:
-                daily_average_price = schema.total_price / days
-                logger.info(f'计算日均价格: {daily_average_price} (使用天数: {days})')
-        
         # 处理购买时间
         create_time = datetime.now()
         if schema.purchase_time:
@@ -118,35 +288,21 @@ def create_consumption():
         else:
             logger.info(f'使用当前时间作为购买时间: {create_time}')
         
-        # 创建消费项
-        consumption = Consumption(
-            content=schema.content,
-            quantity=schema.quantity,
-            total_price=schema.total_price,
-            channel=schema.channel,
-            main_type=schema.main_type,
-            sub_type=schema.sub_type,
-            unit_coefficient=schema.unit_coefficient,
-            receive_status=schema.receive_status,
-            create_time=create_time,
-            statistical_status='计入' if schema.receive_status == '已收货' else '不计入',
-            min_unit_price=min_unit_price,
-            tag=schema.tag,
-            evaluate=schema.evaluate,
-            start_use_time=datetime.strptime(schema.start_use_time, '%Y-%m-%d').date() if schema.start_use_time else None,
-            end_use_time=datetime.strptime(schema.end_use_time, '%Y-%m-%d').date() if schema.end_use_time else None,
-            daily_average_price=daily_average_price
-        )
-        
-        db.session.add(consumption)
-        logger.info('准备提交数据库')
-        db.session.commit()
-        logger.info(f'消费项创建成功，ID: {consumption.id}')
+        # 开启合并提交时与其他并发新增合并为一个事务，返回前均已提交
+        committer = get_group_committer()
+        if committer is not None:
+            response_data = committer.submit(partial(insert_consumption, schema, create_time), finish_created)
+        else:
+            consumption = insert_consumption(schema, create_time)
+            logger.info('准备提交数据库')
+            db.session.commit()
+            response_data = finish_created([consumption])[0]
+        logger.info(f'消费项创建成功，ID: {response_data["id"]}')
         
         response = {
             'success': True,
             'message': '创建成功！',
-            'data': consumption.to_dict()
+            'data': response_data
         }
         logger.info(f'返回创建结果: {response}')
         return jsonify(response), 201
@@ -163,19 +319,27 @@ def get_consumption_by_id(id):
     """获取单个消费项"""
     try:
         logger.info(f'开始获取ID为 {id} 的消费项')
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            logger.warning(f'字段参数错误: {str(e)}')
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
         # 执行数据库查询
-        consumption = Consumption.query.filter_by(id=id, is_deleted=False).first()
-        logger.info(f'数据库查询完成，结果: {consumption}')
+        items = fetch_consumption_dicts(Consumption.query.filter_by(id=id, is_deleted=False).limit(1), fields)
+        logger.info(f'数据库查询完成，结果: {items}')
         
-        if not consumption:
+        if not items:
             logger.warning(f'消费项不存在，ID: {id}')
             return jsonify({
                 'success': False,
                 'message': '消费项不存在！'
             }), 404
         
-        response_data = consumption.to_dict()
+        response_data = items[0]
         logger.info(f'获取消费项成功，ID: {id}, 数据: {response_data}')
         
         return jsonify({
@@ -191,88 +355,75 @@ def get_consumption_by_id(id):
 
 @api_bp.route('/consumption/<int:id>', methods=['PUT'])
 def update_consumption(id):
-    """更新消费项"""
+    """更新消费项
+
+    version 必填：仅在读取后未被他人修改过时更新，否则返回409并附当前数据；缺少时返回400。
+    """
     try:
         logger.info(f'开始更新ID为 {id} 的消费项')
-        
-        # 执行数据库查询
-        consumption = Consumption.query.filter_by(id=id, is_deleted=False).first()
-        logger.info(f'数据库查询完成，结果: {consumption}')
-        
-        if not consumption:
-            logger.warning(f'消费项不存在，ID: {id}')
-            return jsonify({
-                'success': False,
-                'message': '消费项不存在！'
-            }), 404
-        
         data = request.get_json()
         logger.info(f'接收到的更新数据: {data}')
         
         schema = ConsumptionUpdate(**data)
-        logger.info('数据验证通过，准备更新字段')
-        
-        # 更新字段
-        if schema.content is not None:
-            logger.info(f'更新content: {schema.content}')
-            consumption.content = schema.content
-        if schema.quantity is not None:
-            logger.info(f'更新quantity: {schema.quantity}')
-            consumption.quantity = schema.quantity
-        if schema.total_price is not None:
-            logger.info(f'更新total_price: {schema.total_price}')
-            consumption.total_price = schema.total_price
-        if schema.channel is not None:
-            logger.info(f'更新channel: {schema.channel}')
-            consumption.channel = schema.channel
-        if schema.main_type is not None:
-            logger.info(f'更新main_type: {schema.main_type}')
-            consumption.main_type = schema.main_type
-        if schema.sub_type is not None:
-            logger.info(f'更新sub_type: {schema.sub_type}')
-            consumption.sub_type = schema.sub_type
-        if schema.unit_coefficient is not None:
-            logger.info(f'更新unit_coefficient: {schema.unit_coefficient}')
-            consumption.unit_coefficient = schema.unit_coefficient
-        if schema.receive_status is not None:
-            logger.info(f'更新receive_status: {schema.receive_status}')
-            consumption.receive_status = schema.receive_status
-            consumption.statistical_status = '计入' if schema.receive_status == '已收货' else '不计入'
-        if schema.purchase_time is not None:
-            logger.info(f'更新purchase_time: {schema.purchase_time}')
-            consumption.create_time = parse_purchase_time(schema.purchase_time)
-        if schema.tag is not None:
-            logger.info(f'更新tag: {schema.tag}')
-            consumption.tag = schema.tag
-        if schema.evaluate is not None:
-            logger.info(f'更新evaluate: {schema.evaluate}')
-            consumption.evaluate = schema.evaluate
-        if schema.start_use_time is not None:
-            logger.info(f'更新start_use_time: {schema.start_use_time}')
-            consumption.start_use_time = datetime.strptime(schema.start_use_time, '%Y-%m-%d').date()
-        if schema.end_use_time is not None:
-            logger.info(f'更新end_use_time: {schema.end_use_time}')
-            consumption.end_use_time = datetime.strptime(schema.end_use_time, '%Y-%m-%d').date()
-        if schema.pickup_code is not None:
-            logger.info(f'更新pickup_code: {schema.pickup_code}')
-            consumption.pickup_code = schema.pickup_code
-        
-        # 重新计算最小单位单价
-        consumption.min_unit_price = consumption.total_price / (consumption.quantity * consumption.unit_coefficient)
-        logger.info(f'重新计算最小单位单价: {consumption.min_unit_price}')
-        
-        # 重新计算日均价格
-        if consumption.start_use_time and consumption.end_use_time:
-            days = (consumption.end_use_time - consumption.start_use_time).days + 1
-            if days > 0:
-                consumption.daily_average_price = consumption.total_price / days
-                logger.info(f'重新计算日均价格: {consumption.daily_average_price} (使用天数: {days})')
-        
+        if schema.version is None:
+            logger.warning(f'更新消费项缺少版本号，ID: {id}')
+            return jsonify({
+                'success': False,
+                'message': '缺少版本号，请刷新后重试！'
+            }), 400
+        values, missing = build_update_values(schema)
+        if missing:
+            # 需要新建字典项时先确认消费项存在且版本一致
+            rejection = update_rejection(id, schema.version)
+            if rejection is not None:
+                return rejection
+            lookup_cache = get_lookup_cache()
+            for column, (model, name) in missing.items():
+                values[column] = lookup_cache.get_or_create_id(model, name)
+        logger.info(f'数据验证通过，更新字段: {values}')
+        
+        # 只有修改了相关字段才维护补全索引、当月累计支出和价格摘要，减少往返
+        contents = set()
+        if 'content' in values:
+            contents.add(db.session.query(Consumption.content).filter(Consumption.id == id).scalar())
+        changes_suggest = not SUGGEST_COLUMNS.isdisjoint(values)
+        changes_spend = not SPEND_COLUMNS.isdisjoint(values)
+        changes_prices = not PRICE_SKETCH_COLUMNS.isdisjoint(values)
+        
+        # 修改前先减去原来的支出（可能跨月份或账单类型），原统计类型的价格摘要过期
+        if changes_spend:
+            untrack_spend([id])
+        if changes_prices:
+            mark_price_sketches_stale(consumption_sub_type_ids([id]))
+        
+        # 条件UPDATE完成修改：派生价格在同一语句中计算，版本号一致时才更新并递增
+        conditions = [Consumption.id == id, Consumption.is_deleted == False, Consumption.version == schema.version]
+        values.update(derived_price_updates(values))
+        values['version'] = Consumption.version + 1
+        consumption = execute_update(
+            db.update(Consumption).where(*conditions).values(**values), id
+        )
+        if consumption is None:
+            db.session.rollback()
+            return update_rejection(id, schema.version, conflict=True)
+        
+        # 修改后的统计类型的价格摘要过期，支出按新值计入
+        if 'sub_type_id' in values:
+            mark_price_sketches_stale([consumption.sub_type_id])
+        mark_consumption_changed()
+        if changes_spend:
+            track_spend([id])
+        
+        # 提交前生成响应，避免提交后重新加载
+        response_data = consumption.to_dict()
+        response_data['budget'] = get_consumption_budget(consumption)
+        if changes_suggest:
+            contents.add(consumption.content)
         logger.info('准备提交数据库更新')
         db.session.commit()
+        get_content_index().refresh(contents)
         logger.info(f'消费项更新成功，ID: {id}')
         
-        response_data = consumption.to_dict()
         response = {
             'success': True,
             'message': '更新成功！',
@@ -294,22 +445,28 @@ def delete_consumption(id):
     try:
         logger.info(f'开始删除ID为 {id} 的消费项')
         
-        # 执行数据库查询
-        consumption = Consumption.query.filter_by(id=id, is_deleted=False).first()
-        logger.info(f'数据库查询完成，结果: {consumption}')
-        
-        if not consumption:
+        # 单条条件UPDATE完成标记删除，按影响行数判断是否存在；删除前先减去其支出
+        untrack_spend([id])
+        result = db.session.execute(
+            db.update(Consumption)
+            .where(Consumption.id == id, Consumption.is_deleted == False)
+            .values(is_deleted=True, version=Consumption.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.session.rollback()
             logger.warning(f'消费项不存在，ID: {id}')
             return jsonify({
                 'success': False,
                 'message': '消费项不存在！'
             }), 404
         
-        logger.info(f'准备标记消费项为已删除，ID: {id}')
-        consumption.is_deleted = True
-        
+        mark_consumption_changed()
+        mark_price_sketches_stale(consumption_sub_type_ids([id]))
+        content = db.session.query(Consumption.content).filter(Consumption.id == id).scalar()
         logger.info('准备提交数据库更新')
         db.session.commit()
+        get_content_index().refresh([content])
         logger.info(f'消费项删除成功，ID: {id}')
         
         response = {
@@ -326,25 +483,109 @@ def delete_consumption(id):
             'message': str(e)
         }), 500
 
+@api_bp.route('/consumption/bulk', methods=['PATCH'])
+def bulk_update_consumption():
+    """批量操作消费项：确认收货、删除、设置标签、设置取件码"""
+    try:
+        logger.info('开始批量操作消费项')
+        data = request.get_json()
+        logger.info(f'接收到的请求数据: {data}')
+        
+        schema = ConsumptionBulkUpdate(**data)
+        
+        conditions = [Consumption.id.in_(schema.ids), Consumption.is_deleted == False]
+        if schema.operation == 'receive':
+            conditions.append(Consumption.receive_status == '待收货')
+            values = {'receive_status': '已收货', 'statistical_status': '计入'}
+        elif schema.operation == 'delete':
+            values = {'is_deleted': True}
+        elif schema.operation == 'set_tag':
+            values = {'tag': schema.value}
+        else:
+            values = {'pickup_code': schema.value}
+        values['version'] = Consumption.version + 1
+        
+        # 确认收货和删除会改变计入支出的消费项，操作前后分别减去、计入支出
+        changes_spend = schema.operation in ('receive', 'delete')
+        if changes_spend:
+            untrack_spend(schema.ids)
+        
+        # 单条条件UPDATE完成整批操作，只返回实际更新的行
+        items = execute_bulk_update(conditions, values)
+        if changes_spend:
+            track_spend(schema.ids)
+        updated = len(items)
+        if updated:
+            mark_consumption_changed()
+            if schema.operation == 'delete':
+                mark_price_sketches_stale(consumption_sub_type_ids(schema.ids))
+        logger.info(f'批量操作 {schema.operation} 完成，影响 {updated} 行')
+        
+        # 返回更新后的行，页面据此原地更新；批量删除只影响补全索引中这些行的内容
+        contents = {item.content for item in items} if schema.operation == 'delete' else set()
+        response_items = [item.to_dict() for item in items] if schema.operation != 'delete' else []
+        db.session.commit()
+        if updated:
+            get_content_index().refresh(contents)
+        
+        return jsonify({
+            'success': True,
+            'message': f'成功处理 {updated} 条消费项！',
+            'data': {
+                'updated': updated,
+                'items': response_items
+            }
+        }), 200
+    except Exception as e:
+        logger.error(f'批量操作消费项失败: {str(e)}', exc_info=True)
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/consumption/suggest', methods=['GET'])
+def suggest_consumption_content():
+    """按前缀补全消费内容，附带最近一次购买的价格、渠道和类型"""
+    try:
+        prefix = request.args.get('prefix', '').strip()
+        limit = request.args.get('limit', 10, type=int)
+        if not prefix:
+            return jsonify({
+                'success': False,
+                'message': '前缀不能为空！'
+            }), 400
+        limit = min(max(limit, 1), MAX_SUGGESTIONS)
+        
+        data = get_content_index().suggest(prefix, limit)
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    except Exception as e:
+        logger.error(f'补全消费内容失败，前缀: {request.args.get("prefix")}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
 @api_bp.route('/consumption/pending', methods=['GET'])
 def get_pending_consumption():
     """获取待收货列表"""
     try:
         logger.info('开始获取待收货列表')
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            logger.warning(f'字段参数错误: {str(e)}')
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        # 构建查询
-        query = Consumption.query.filter_by(
-            receive_status='待收货',
-            is_deleted=False
-        ).order_by(Consumption.create_time.desc())
         logger.info('执行数据库查询')
-        
-        consumptions = query.all()
-        logger.info(f'数据库查询完成，获取到 {len(consumptions)} 条待收货记录')
-        
-        # 转换为字典列表
-        data = [item.to_dict() for item in consumptions]
-        logger.info(f'数据转换完成，准备返回 {len(data)} 条记录')
+        data = query_pending_consumption(fields)
+        logger.info(f'数据库查询完成，获取到 {len(data)} 条待收货记录')
         
         response = {
             'success': True,
@@ -370,47 +611,70 @@ def get_consumption_by_type(sub_type):
         start_date = request.args.get('startDate')
         end_date = request.args.get('endDate')
         logger.info(f'接收到的时间范围参数: startDate={start_date}, endDate={end_date}')
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            logger.warning(f'字段参数错误: {str(e)}')
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        # 构建查询
-        query = Consumption.query.filter(
-            Consumption.sub_type == sub_type,
-            Consumption.receive_status == '已收货',
-            Consumption.is_deleted == False
-        )
-        logger.info('构建基础查询完成')
-        
-        # 添加时间范围过滤
-        if start_date:
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-            query = query.filter(Consumption.create_time >= start_date_obj)
-            logger.info(f'添加开始日期过滤: {start_date}')
-        
-        if end_date:
-            # 结束日期需要包含当天的所有时间
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-            end_date_obj = end_date_obj.replace(hour=23, minute=59, second=59)
-            query = query.filter(Consumption.create_time <= end_date_obj)
-            logger.info(f'添加结束日期过滤: {end_date}')
-        
-        # 默认查询近30天
-        else:
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            query = query.filter(Consumption.create_time >= thirty_days_ago)
-            logger.info(f'未指定时间范围，默认查询近30天: {thirty_days_ago}')
-        
-        # 执行查询
-        logger.info('执行数据库查询')
-        consumptions = query.order_by(Consumption.create_time.desc()).all()
-        logger.info(f'数据库查询完成，获取到 {len(consumptions)} 条记录')
-        
-        # 转换为字典列表
-        data = [item.to_dict() for item in consumptions]
-        logger.info(f'数据转换完成，准备返回 {len(data)} 条记录')
+        # 统计类型名称解析为ID，不存在的类型直接返回空列表
+        sub_type_id = get_lookup_cache().get_id(SubType, sub_type)
+        if sub_type_id is None:
+            logger.info(f'统计类型不存在: {sub_type}')
+            return jsonify({
+                'success': True,
+                'data': [],
+                'count': 0
+            }), 200
+        
+        def compute():
+            # 构建查询
+            query = Consumption.query.filter(
+                Consumption.sub_type_id == sub_type_id,
+                Consumption.receive_status == '已收货',
+                Consumption.is_deleted == False
+            )
+            logger.info('构建基础查询完成')
+            
+            # 添加时间范围过滤
+            if start_date:
+                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
+                query = query.filter(Consumption.create_time >= start_date_obj)
+                logger.info(f'添加开始日期过滤: {start_date}')
+            
+            if end_date:
+                # 结束日期需要包含当天的所有时间
+                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
+                end_date_obj = end_date_obj.replace(hour=23, minute=59, second=59)
+                query = query.filter(Consumption.create_time <= end_date_obj)
+                logger.info(f'添加结束日期过滤: {end_date}')
+            
+            # 默认查询近30天
+            else:
+                thirty_days_ago = datetime.now() - timedelta(days=30)
+                query = query.filter(Consumption.create_time >= thirty_days_ago)
+                logger.info(f'未指定时间范围，默认查询近30天: {thirty_days_ago}')
+            
+            # 执行查询
+            logger.info('执行数据库查询')
+            data = fetch_consumption_dicts(query.order_by(Consumption.create_time.desc()), fields)
+            logger.info(f'数据库查询完成，获取到 {len(data)} 条记录')
+            
+            return data
+        
+        # 相同类型和时间范围的结果按数据版本缓存；默认近30天的范围按天区分
+        params = {'subType': sub_type, 'startDate': start_date, 'endDate': end_date, 'fields': ','.join(fields or ())}
+        if not end_date:
+            params['today'] = date.today().isoformat()
+        data = get_result_cache().get_or_compute('consumption_by_type', params, compute)
         
         response = {
             'success': True,
             'data': data,
-            'count': len(consumptions)
+            'count': len(data)
         }
         logger.info(f'返回统计类型 {sub_type} 的消费项成功，共 {len(data)} 条记录')
         return jsonify(response), 200
@@ -420,3 +684,107 @@ def get_consumption_by_type(sub_type):
             'success': False,
             'message': str(e)
         }), 500
+
+@api_bp.route('/consumption/type/<sub_type>/series', methods=['GET'])
+def get_price_series_by_type(sub_type):
+    """获取指定统计类型的单价走势（滚动均价、滚动最低价）"""
+    try:
+        logger.info(f'开始获取统计类型为 {sub_type} 的单价走势')
+        from app.models.price_series import get_price_series, WINDOW_TYPES
+        
+        start_date = request.args.get('startDate')
+        end_date = request.args.get('endDate')
+        window_type = request.args.get('window_type', 'purchases')
+        try:
+            window = int(request.args.get('window', 5))
+            points = int(request.args['points']) if request.args.get('points') else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'window和points必须为整数！'
+            }), 400
+        logger.info(f'接收到的参数: startDate={start_date}, endDate={end_date}, window={window}, window_type={window_type}, points={points}')
+        
+        if window_type not in WINDOW_TYPES or window < 1 or (points is not None and points < 3):
+            logger.warning('单价走势参数不合法')
+            return jsonify({
+                'success': False,
+                'message': f'window_type仅支持: {", ".join(WINDOW_TYPES)}，window需大于0，points需不小于3'
+            }), 400
+        
+        sub_type_id = get_lookup_cache().get_id(SubType, sub_type)
+        if sub_type_id is None:
+            logger.info(f'统计类型不存在: {sub_type}')
+            return jsonify({
+                'success': True,
+                'data': {'count': 0, 'points': []}
+            }), 200
+        
+        start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        end = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if end_date else None
+        
+        data = get_price_series(sub_type_id, start, end, window, window_type, points)
+        logger.info(f'单价走势查询完成，共 {data["count"]} 条记录，返回 {len(data["points"])} 个点')
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    except Exception as e:
+        logger.error(f'获取单价走势失败，类型: {sub_type}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/consumption/type/<sub_type>/channels', methods=['GET'])
+def get_channel_ranking_by_type(sub_type):
+    """获取指定统计类型下各渠道的单价排行（次数、最低价、均价、最近价格、最后购买日期）"""
+    try:
+        logger.info(f'开始获取统计类型为 {sub_type} 的渠道单价排行')
+        from app.models.channel_ranking import get_channel_ranking
+        
+        sub_type_id = get_lookup_cache().get_id(SubType, sub_type)
+        if sub_type_id is None:
+            logger.info(f'统计类型不存在: {sub_type}')
+            return jsonify({
+                'success': True,
+                'data': []
+            }), 200
+        
+        data = get_result_cache().get_or_compute(
+            'channel_ranking', {'subType': sub_type}, lambda: get_channel_ranking(sub_type_id)
+        )
+        logger.info(f'渠道单价排行查询完成，共 {len(data)} 个渠道')
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    except Exception as e:
+        logger.error(f'获取渠道单价排行失败，类型: {sub_type}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/consumption/channels', methods=['GET'])
+def get_all_channel_rankings():
+    """获取全部统计类型的渠道单价排行，按统计类型名称分组"""
+    try:
+        logger.info('开始获取全部统计类型的渠道单价排行')
+        from app.models.channel_ranking import get_all_channel_rankings as compute
+        
+        data = get_result_cache().get_or_compute('channel_ranking', {}, compute)
+        logger.info(f'渠道单价排行查询完成，共 {len(data)} 个统计类型')
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    except Exception as e:
+        logger.error(f'获取全部渠道单价排行失败: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
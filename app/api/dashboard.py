@@ -0,0 +1,54 @@
+from app.api import api_bp
+from flask import request, jsonify
+from app.models.dashboard import get_dashboard
+from app.result_cache import get_result_cache
+from datetime import date, datetime
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def load_dashboard(start_date=None, end_date=None):
+    """按日期字符串（YYYY-MM-DD）获取概览，默认当月1号至今天；结果按数据版本缓存"""
+    today = date.today()
+    start_date = start_date or today.replace(day=1).strftime('%Y-%m-%d')
+    end_date = end_date or today.strftime('%Y-%m-%d')
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    if start > end:
+        raise ValueError('开始日期不能晚于结束日期！')
+    return get_result_cache().get_or_compute(
+        'dashboard',
+        {'startDate': start_date, 'endDate': end_date},
+        lambda: get_dashboard(start, end)
+    )
+
+@api_bp.route('/dashboard', methods=['GET'])
+def get_dashboard_summary():
+    """获取首页概览"""
+    try:
+        start_date = request.args.get('startDate')
+        end_date = request.args.get('endDate')
+        logger.info(f'开始获取首页概览: startDate={start_date}, endDate={end_date}')
+        
+        try:
+            data = load_dashboard(start_date, end_date)
+        except ValueError as e:
+            logger.warning(f'首页概览参数错误: {str(e)}')
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        logger.info(f'首页概览计算完成，本期合计 {data["total"]}，共 {data["count"]} 条')
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    except Exception as e:
+        logger.error(f'获取首页概览失败: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
@@ -0,0 +1,138 @@
+from app.api import api_bp
+from flask import request, jsonify, send_from_directory
+from app.models import Job
+from app.schemas import JobCreate
+from app.jobs import get_job_runner, JOB_TYPES
+from app.jobs.handlers import get_export_dir
+from app import db
+import json
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+@api_bp.route('/jobs', methods=['POST'])
+def create_job():
+    """提交后台任务"""
+    try:
+        logger.info('开始提交后台任务')
+        data = request.get_json()
+        logger.info(f'接收到的请求数据: {data}')
+        
+        schema = JobCreate(**data)
+        if schema.job_type not in JOB_TYPES:
+            logger.warning(f'未知的任务类型: {schema.job_type}')
+            return jsonify({
+                'success': False,
+                'message': f'未知的任务类型，可用: {", ".join(JOB_TYPES)}'
+            }), 400
+        
+        job = get_job_runner().submit(schema.job_type, schema.params)
+        logger.info(f'后台任务已提交，ID: {job.id}, 类型: {job.job_type}')
+        
+        return jsonify({
+            'success': True,
+            'message': '任务已提交！',
+            'data': job.to_dict()
+        }), 202
+    except Exception as e:
+        logger.error(f'提交后台任务失败: {str(e)}', exc_info=True)
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """获取最近的后台任务列表"""
+    try:
+        status = request.args.get('status')
+        limit = min(int(request.args.get('limit', 50)), 500)
+        logger.info(f'开始获取后台任务列表，status={status}, limit={limit}')
+        
+        query = Job.query
+        if status:
+            query = query.filter_by(status=status)
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [job.to_dict() for job in jobs]
+        }), 200
+    except Exception as e:
+        logger.error(f'获取后台任务列表失败: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/jobs/<int:id>', methods=['GET'])
+def get_job(id):
+    """获取后台任务状态"""
+    try:
+        job = db.session.get(Job, id)
+        if not job:
+            logger.warning(f'任务不存在，ID: {id}')
+            return jsonify({
+                'success': False,
+                'message': '任务不存在！'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': job.to_dict()
+        }), 200
+    except Exception as e:
+        logger.error(f'获取后台任务失败，ID: {id}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/jobs/<int:id>/cancel', methods=['POST'])
+def cancel_job(id):
+    """取消后台任务"""
+    try:
+        logger.info(f'开始取消任务，ID: {id}')
+        job = get_job_runner().cancel(id)
+        if not job:
+            logger.warning(f'任务不存在，ID: {id}')
+            return jsonify({
+                'success': False,
+                'message': '任务不存在！'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': '已请求取消任务！',
+            'data': job.to_dict()
+        }), 200
+    except Exception as e:
+        logger.error(f'取消后台任务失败，ID: {id}, 错误: {str(e)}', exc_info=True)
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/jobs/<int:id>/download', methods=['GET'])
+def download_job_result(id):
+    """下载任务生成的文件"""
+    try:
+        job = db.session.get(Job, id)
+        result = json.loads(job.result) if job and job.result else {}
+        if not result.get('file'):
+            return jsonify({
+                'success': False,
+                'message': '任务没有可下载的文件！'
+            }), 404
+        
+        return send_from_directory(get_export_dir(), result['file'], as_attachment=True)
+    except Exception as e:
+        logger.error(f'下载任务文件失败，ID: {id}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
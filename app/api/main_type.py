@@ -1,6 +1,7 @@
 from app.api import api_bp
 from flask import request, jsonify
-from app.models import MainType
+from app.models import MainType, Consumption
+from app.models.lookup import get_lookup_cache, delete_lookup, mark_lookups_changed
 from app.schemas import MainTypeCreate, MainTypeUpdate
 from app import db
 import logging
@@ -16,7 +17,7 @@ def get_main_types():
         logger.info('开始获取账单类型列表')
         
         # 执行数据库查询
-        main_types = MainType.query.all()
+        main_types = MainType.query.filter_by(is_deleted=False).all()
         logger.info(f'数据库查询完成，获取到 {len(main_types)} 个账单类型')
         
         # 转换为字典列表
@@ -51,18 +52,26 @@ def create_main_type():
         existing = MainType.query.filter_by(name=schema.name).first()
         logger.info(f'检查账单类型是否已存在，结果: {existing}')
         
-        if existing:
+        if existing and not existing.is_deleted:
             logger.warning(f'账单类型已存在: {schema.name}')
             return jsonify({
                 'success': False,
                 'message': '账单类型已存在！'
             }), 400
         
-        # 创建账单类型
-        main_type = MainType(name=schema.name)
-        db.session.add(main_type)
+        if existing:
+            # 恢复仍被消费项引用的同名账单类型
+            logger.info(f'恢复已删除的账单类型: {schema.name}')
+            existing.is_deleted = False
+            main_type = existing
+        else:
+            # 创建账单类型
+            main_type = MainType(name=schema.name)
+            db.session.add(main_type)
+        mark_lookups_changed()
         logger.info('准备提交数据库')
         db.session.commit()
+        get_lookup_cache().invalidate(MainType)
         logger.info(f'账单类型创建成功，ID: {main_type.id}, 名称: {main_type.name}')
         
         response = {
@@ -114,9 +123,12 @@ def update_main_type(id):
                 'message': '账单类型已存在！'
             }), 400
         
+        # 消费项只引用ID，改名只需更新字典表一行
         main_type.name = schema.name
+        mark_lookups_changed()
         logger.info('准备提交数据库更新')
         db.session.commit()
+        get_lookup_cache().invalidate(MainType)
         logger.info(f'账单类型更新成功，ID: {id}, 新名称: {main_type.name}')
         
         response = {
@@ -152,7 +164,7 @@ def delete_main_type(id):
             }), 404
         
         logger.info(f'准备删除账单类型: {main_type.name}')
-        db.session.delete(main_type)
+        delete_lookup(main_type, Consumption.main_type_id)
         logger.info('准备提交数据库更新')
         db.session.commit()
         logger.info(f'账单类型删除成功，ID: {id}, 名称: {main_type.name}')
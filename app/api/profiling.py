@@ -0,0 +1,88 @@
+from app.api import api_bp
+from flask import jsonify, request, send_file
+from app.profiling import get_profiler
+import io
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _check_profiler():
+    """未启用时返回404，密钥不符时返回403"""
+    profiler = get_profiler()
+    if profiler is None:
+        return None, (jsonify({
+            'success': False,
+            'message': '请求性能分析未启用！'
+        }), 404)
+    if not profiler.authorized(request.headers):
+        return None, (jsonify({
+            'success': False,
+            'message': '无权查看性能分析结果！'
+        }), 403)
+    return profiler, None
+
+@api_bp.route('/debug/profiles', methods=['GET'])
+def list_profiles():
+    """获取最近的请求分析结果列表"""
+    try:
+        profiler, error = _check_profiler()
+        if error:
+            return error
+        return jsonify({
+            'success': True,
+            'data': profiler.records()
+        }), 200
+    except Exception as e:
+        logger.error(f'获取请求分析列表失败: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/debug/profiles/<int:id>', methods=['GET'])
+def get_profile(id):
+    """获取单次请求的分析结果：累计耗时最高的函数和分配内存最多的代码行"""
+    try:
+        profiler, error = _check_profiler()
+        if error:
+            return error
+        record = profiler.get(id)
+        if record is None:
+            return jsonify({
+                'success': False,
+                'message': '分析结果不存在或已被覆盖！'
+            }), 404
+        return jsonify({
+            'success': True,
+            'data': {key: value for key, value in record.items() if key != 'pstats'}
+        }), 200
+    except Exception as e:
+        logger.error(f'获取请求分析结果失败，ID: {id}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/debug/profiles/<int:id>/pstats', methods=['GET'])
+def download_profile(id):
+    """下载单次请求的 .pstats 文件"""
+    try:
+        profiler, error = _check_profiler()
+        if error:
+            return error
+        record = profiler.get(id)
+        if record is None:
+            return jsonify({
+                'success': False,
+                'message': '分析结果不存在或已被覆盖！'
+            }), 404
+        return send_file(io.BytesIO(record['pstats']), mimetype='application/octet-stream',
+                         as_attachment=True, download_name=f'profile_{id}.pstats')
+    except Exception as e:
+        logger.error(f'下载请求分析结果失败，ID: {id}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
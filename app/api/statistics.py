@@ -1,6 +1,8 @@
 from app.api import api_bp
 from flask import request, jsonify
-from app.models import Consumption
+from app.models import Consumption, MainType
+from app.models.lookup import get_lookup_cache
+from app.result_cache import get_result_cache
 from app import db
 from datetime import datetime
 import logging
@@ -31,36 +33,40 @@ def get_statistics():
         end = end.replace(hour=23, minute=59, second=59)
         logger.info(f'转换后的时间范围: start={start}, end={end}')
         
-        # 查询数据
-        logger.info('开始执行数据库统计查询')
-        result = db.session.query(
-            Consumption.main_type,
-            db.func.sum(Consumption.total_price).label('total_amount')
-        ).filter(
-            Consumption.create_time.between(start, end),
-            Consumption.receive_status == '已收货',
-            Consumption.is_deleted == False
-        ).group_by(
-            Consumption.main_type
-        ).all()
-        logger.info(f'数据库查询完成，获取到 {len(result)} 条记录')
+        def compute():
+            # 查询数据
+            logger.info('开始执行数据库统计查询')
+            result = db.session.query(
+                Consumption.main_type_id,
+                db.func.sum(Consumption.total_price).label('total_amount')
+            ).filter(
+                Consumption.create_time.between(start, end),
+                Consumption.receive_status == '已收货',
+                Consumption.is_deleted == False
+            ).group_by(
+                Consumption.main_type_id
+            ).all()
+            logger.info(f'数据库查询完成，获取到 {len(result)} 条记录')
+            
+            # 格式化数据（账单类型ID通过字典缓存转换为名称）
+            lookup_cache = get_lookup_cache()
+            categories = []
+            values = []
+            for item in result:
+                categories.append(lookup_cache.get_name(MainType, item.main_type_id))
+                values.append(float(item.total_amount))
+            logger.info(f'数据格式化完成，categories={categories}, values={values}')
+            
+            return {'categories': categories, 'values': values}
         
-        # 格式化数据
-        categories = []
-        values = []
-        for item in result:
-            categories.append(item.main_type)
-            values.append(float(item.total_amount))
-        logger.info(f'数据格式化完成，categories={categories}, values={values}')
+        # 相同时间范围的结果按数据版本缓存
+        data = get_result_cache().get_or_compute('statistics', {'startDate': start_date, 'endDate': end_date}, compute)
         
         response = {
             'success': True,
-            'data': {
-                'categories': categories,
-                'values': values
-            }
+            'data': data
         }
-        logger.info(f'返回统计数据成功，共 {len(categories)} 个类别')
+        logger.info(f'返回统计数据成功，共 {len(data["categories"])} 个类别')
         return jsonify(response), 200
     except Exception as e:
         logger.error(f'获取统计数据失败: {str(e)}', exc_info=True)
@@ -68,3 +74,56 @@ def get_statistics():
             'success': False,
             'message': str(e)
         }), 500
+
+@api_bp.route('/consumption/amortized', methods=['GET'])
+def get_amortized_statistics():
+    """获取按使用时间分摊后的每日花费"""
+    try:
+        logger.info('开始获取分摊后的每日花费')
+        from app.models.amortization import get_amortized_cost, GROUP_BY_COLUMNS, MAX_DAYS
+        start_date = request.args.get('startDate')
+        end_date = request.args.get('endDate')
+        group_by = request.args.get('group_by') or None
+        logger.info(f'接收到的参数: startDate={start_date}, endDate={end_date}, group_by={group_by}')
+        
+        if not start_date or not end_date:
+            logger.warning('开始日期和结束日期不能为空')
+            return jsonify({
+                'success': False,
+                'message': '开始日期和结束日期不能为空！'
+            }), 400
+        
+        if group_by and group_by not in GROUP_BY_COLUMNS:
+            logger.warning(f'不支持的分组字段: {group_by}')
+            return jsonify({
+                'success': False,
+                'message': f'group_by仅支持: {", ".join(GROUP_BY_COLUMNS)}'
+            }), 400
+        
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end = datetime.strptime(end_date, '%Y-%m-%d').date()
+        if start > end:
+            return jsonify({
+                'success': False,
+                'message': '开始日期不能晚于结束日期！'
+            }), 400
+        if (end - start).days + 1 > MAX_DAYS:
+            logger.warning(f'日期范围过长: {start_date} ~ {end_date}')
+            return jsonify({
+                'success': False,
+                'message': f'日期范围不能超过 {MAX_DAYS} 天！'
+            }), 400
+        
+        data = get_amortized_cost(start, end, group_by)
+        logger.info(f'分摊计算完成，共 {len(data["dates"])} 天，{len(data["series"])} 个分组')
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    except Exception as e:
+        logger.error(f'获取分摊后的每日花费失败: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
@@ -1,6 +1,7 @@
 from app.api import api_bp
 from flask import request, jsonify
-from app.models import SubType
+from app.models import SubType, Consumption
+from app.models.lookup import get_lookup_cache, delete_lookup, mark_lookups_changed
 from app.schemas import SubTypeCreate, SubTypeUpdate
 from app import db
 import logging
@@ -15,7 +16,7 @@ def get_sub_types():
     try:
         logger.info('开始获取统计类型列表')
         
-        # 使用get_all_sub_types函数获取所有统计类型（包括consumption表中使用的）
+        # 只返回未删除的统计类型
         from app.models.sub_type import get_all_sub_types
         sub_types = get_all_sub_types()
         logger.info(f'数据库查询完成，获取到 {len(sub_types)} 个统计类型')
@@ -52,18 +53,26 @@ def create_sub_type():
         existing = SubType.query.filter_by(name=schema.name).first()
         logger.info(f'检查统计类型是否已存在，结果: {existing}')
         
-        if existing:
+        if existing and not existing.is_deleted:
             logger.warning(f'统计类型已存在: {schema.name}')
             return jsonify({
                 'success': False,
                 'message': '统计类型已存在！'
             }), 400
         
-        # 创建统计类型
-        sub_type = SubType(name=schema.name)
-        db.session.add(sub_type)
+        if existing:
+            # 恢复仍被消费项引用的同名统计类型
+            logger.info(f'恢复已删除的统计类型: {schema.name}')
+            existing.is_deleted = False
+            sub_type = existing
+        else:
+            # 创建统计类型
+            sub_type = SubType(name=schema.name)
+            db.session.add(sub_type)
+        mark_lookups_changed()
         logger.info('准备提交数据库')
         db.session.commit()
+        get_lookup_cache().invalidate(SubType)
         logger.info(f'统计类型创建成功，ID: {sub_type.id}, 名称: {sub_type.name}')
         
         response = {
@@ -115,9 +124,12 @@ def update_sub_type(id):
                 'message': '统计类型已存在！'
             }), 400
         
+        # 消费项只引用ID，改名只需更新字典表一行
         sub_type.name = schema.name
+        mark_lookups_changed()
         logger.info('准备提交数据库更新')
         db.session.commit()
+        get_lookup_cache().invalidate(SubType)
         logger.info(f'统计类型更新成功，ID: {id}, 新名称: {sub_type.name}')
         
         response = {
@@ -153,7 +165,7 @@ def delete_sub_type(id):
             }), 404
         
         logger.info(f'准备删除统计类型: {sub_type.name}')
-        db.session.delete(sub_type)
+        delete_lookup(sub_type, Consumption.sub_type_id)
         logger.info('准备提交数据库更新')
         db.session.commit()
         logger.info(f'统计类型删除成功，ID: {id}, 名称: {sub_type.name}')
@@ -171,3 +183,40 @@ def delete_sub_type(id):
             'success': False,
             'message': str(e)
         }), 500
+
+@api_bp.route('/sub-type/<name>/quantiles', methods=['GET'])
+def get_sub_type_quantiles(name):
+    """获取统计类型的最小单位单价分位数（来自价格摘要）；指定 price 时同时返回该价格的判断"""
+    try:
+        from app.models.price_sketch import get_price_sketch, summarize_quantiles, price_verdict
+        
+        sub_type_id = get_lookup_cache().get_id(SubType, name)
+        if sub_type_id is None:
+            logger.warning(f'统计类型不存在: {name}')
+            return jsonify({
+                'success': False,
+                'message': '统计类型不存在！'
+            }), 404
+        
+        digest = get_price_sketch(sub_type_id)
+        data = summarize_quantiles(digest)
+        price = request.args.get('price')
+        if price is not None:
+            data['price_verdict'] = price_verdict(digest, float(price))
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    except ValueError as e:
+        logger.warning(f'价格参数错误: {str(e)}')
+        return jsonify({
+            'success': False,
+            'message': '价格格式错误！'
+        }), 400
+    except Exception as e:
+        logger.error(f'获取统计类型分位数失败，类型: {name}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
@@ -0,0 +1,140 @@
+from app.api import api_bp
+from flask import request, jsonify
+from app.models import Consumption, UsageRecord
+from app.models.consumption import mark_consumption_changed
+from app.models.usage_record import get_usage_records, get_usage_summary
+from app.models.pricing import apply_derived_prices
+from app.models.suggest import get_content_index
+from app.schemas import UsageRecordBatchCreate
+from app import db
+from datetime import datetime
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+@api_bp.route('/consumption/<int:id>/usage', methods=['POST'])
+def create_usage_records(id):
+    """批量创建使用记录，并在同一事务中更新消费项的使用时间和日均价格"""
+    try:
+        logger.info(f'开始为ID为 {id} 的消费项创建使用记录')
+
+        consumption = Consumption.query.filter_by(id=id, is_deleted=False).with_for_update().first()
+        if not consumption:
+            logger.warning(f'消费项不存在，ID: {id}')
+            return jsonify({
+                'success': False,
+                'message': '消费项不存在！'
+            }), 404
+
+        data = request.get_json()
+        logger.info(f'接收到的使用记录: {data}')
+        schema = UsageRecordBatchCreate(**data)
+
+        rows = []
+        for record in schema.records:
+            start_use_time = datetime.strptime(record.start_use_time, '%Y-%m-%d').date()
+            end_use_time = datetime.strptime(record.end_use_time, '%Y-%m-%d').date()
+            if start_use_time > end_use_time:
+                logger.warning(f'使用时间不合法: {record.start_use_time} ~ {record.end_use_time}')
+                return jsonify({
+                    'success': False,
+                    'message': '使用开始时间不能晚于结束时间！'
+                }), 400
+            rows.append({
+                'consumption_id': id,
+                'quantity': record.quantity,
+                'start_use_time': start_use_time,
+                'end_use_time': end_use_time,
+                'create_time': datetime.now()
+            })
+
+        # 校验使用数量不超过消费项数量
+        used_quantity, first_start, last_end = get_usage_summary(id)
+        total_quantity = float(used_quantity) + sum(row['quantity'] for row in rows)
+        if total_quantity > float(consumption.quantity):
+            logger.warning(f'使用数量超出，已使用: {used_quantity}, 本次: {total_quantity - float(used_quantity)}, 数量: {consumption.quantity}')
+            return jsonify({
+                'success': False,
+                'message': f'使用数量不能超过消费项数量（{float(consumption.quantity):g}）！'
+            }), 400
+
+        # 一次性批量插入
+        db.session.execute(db.insert(UsageRecord), rows)
+
+        # 消费项的使用时间覆盖全部使用记录
+        starts = [row['start_use_time'] for row in rows] + ([first_start] if first_start else [])
+        ends = [row['end_use_time'] for row in rows] + ([last_end] if last_end else [])
+        consumption.start_use_time = min(starts)
+        consumption.end_use_time = max(ends)
+        consumption.version = Consumption.version + 1
+        apply_derived_prices(consumption)
+        mark_consumption_changed()
+
+        logger.info('准备提交数据库')
+        db.session.commit()
+        # 使用时间不影响内容补全，只需同步补全索引的数据版本
+        get_content_index().refresh()
+        logger.info(f'使用记录创建成功，消费项ID: {id}, 新增 {len(rows)} 条')
+
+        return jsonify({
+            'success': True,
+            'message': f'成功提交 {len(rows)} 条使用记录！',
+            'data': {
+                'count': len(rows),
+                'consumption': consumption.to_dict()
+            }
+        }), 201
+    except Exception as e:
+        logger.error(f'创建使用记录失败，ID: {id}, 错误: {str(e)}', exc_info=True)
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/consumption/<int:id>/usage', methods=['GET'])
+def get_usage_records_by_id(id):
+    """获取单个消费项的使用记录"""
+    try:
+        logger.info(f'开始获取ID为 {id} 的消费项的使用记录')
+        records = get_usage_records([id])[id]
+        return jsonify({
+            'success': True,
+            'data': [record.to_dict() for record in records]
+        }), 200
+    except Exception as e:
+        logger.error(f'获取使用记录失败，ID: {id}, 错误: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@api_bp.route('/consumption/usage', methods=['GET'])
+def get_usage_records_by_ids():
+    """批量获取多个消费项的使用记录，参数 ids=1,2,3"""
+    try:
+        ids_param = request.args.get('ids', '')
+        logger.info(f'开始批量获取使用记录，ids={ids_param}')
+        try:
+            ids = [int(item) for item in ids_param.split(',') if item.strip()]
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'ids参数格式错误！'
+            }), 400
+
+        records = get_usage_records(ids)
+        data = {str(consumption_id): [record.to_dict() for record in items] for consumption_id, items in records.items()}
+        logger.info(f'批量获取使用记录完成，共 {len(ids)} 个消费项')
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+    except Exception as e:
+        logger.error(f'批量获取使用记录失败: {str(e)}', exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
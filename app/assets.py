@@ -0,0 +1,79 @@
+"""静态资源指纹
+
+构建时（flask ledger build-assets）把 static 下的 js/css 按内容哈希复制到 static/dist，
+并生成 manifest.json 记录原路径到带哈希文件名的映射。
+模板统一通过 asset_url() 引用静态资源：有清单时返回带哈希的地址，
+这些文件内容永不变化，可以让浏览器长期缓存；没有构建清单时回退到原路径。
+"""
+from flask import current_app, request, url_for
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+# 构建输出目录（相对 static 目录）与清单文件名
+DIST_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+# 参与指纹的文件类型；CSS 内的 url() 引用不做改写
+ASSET_EXTENSIONS = ('.js', '.css')
+# 带哈希的资源一年内不再校验
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def build_assets(static_folder):
+    """为静态资源生成带内容哈希的副本和清单，返回清单字典"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    # 清除上次构建的产物，避免旧哈希文件堆积
+    shutil.rmtree(dist, ignore_errors=True)
+    
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder) and DIST_DIR in dirs:
+            dirs.remove(DIST_DIR)
+        for filename in sorted(files):
+            if not filename.endswith(ASSET_EXTENSIONS):
+                continue
+            source = os.path.join(root, filename)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:12]
+            stem, ext = os.path.splitext(logical)
+            hashed = f'{DIST_DIR}/{stem}.{digest}{ext}'
+            target = os.path.join(static_folder, *hashed.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            manifest[logical] = hashed
+    
+    with open(os.path.join(dist, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(static_folder):
+    """读取资源清单，未构建时返回空字典"""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def asset_url(filename):
+    """模板全局函数：返回静态资源地址（已构建时带内容哈希）"""
+    manifest = current_app.extensions.get('asset_manifest', {})
+    return url_for('static', filename=manifest.get(filename, filename))
+
+def init_assets(app):
+    """加载资源清单，注册 asset_url 并为带哈希的资源设置长期缓存头"""
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    if not app.extensions['asset_manifest']:
+        logger.info('未找到静态资源清单，使用原始路径（可执行 flask ledger build-assets 生成）')
+    app.add_template_global(asset_url, 'asset_url')
+    
+    dist_prefix = f'{app.static_url_path}/{DIST_DIR}/'
+    
+    @app.after_request
+    def set_asset_cache_control(response):
+        if request.path.startswith(dist_prefix) and response.status_code == 200:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
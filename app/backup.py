@@ -0,0 +1,252 @@
+"""账本备份与恢复
+
+备份文件为 gzip 压缩的 JSON 行：
+- 第一行为文件头：格式名、结构版本（SCHEMA_VERSION）、创建时间和各表的列
+- 之后每行一个数据块：{"table": 表名, "rows": [[列值, ...], ...]}，每块最多 chunk_size 行
+- 最后一行为结尾：{"end": true, "counts": {表名: 行数}}，恢复时据此发现不完整的文件
+
+备份在一个只读事务中读取全部表，得到一致性快照且不加锁（MySQL 为 CONSISTENT SNAPSHOT，
+SQLite WAL 模式下为读事务的快照），不阻塞写入；查询使用服务端游标按块读取，内存占用与总行数无关。
+金额按 Decimal 写出，与金额存储方式（DECIMAL 或整数分）无关。
+
+恢复在一个事务中批量写入（executemany，MySQL 驱动会改写为多行 INSERT），
+写入前删除各表的普通索引、写完后重建；按月累计支出、价格摘要等派生数据在恢复后重建。
+"""
+from app.sqlite_profile import write_transactions
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import inspect, select
+import gzip
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+BACKUP_FORMAT = 'ledger-backup'
+# 备份涉及的表结构变化时递增（2：消费项增加 version 列）
+SCHEMA_VERSION = 2
+# 账本数据表，按外键依赖顺序（派生数据、任务记录不备份）
+BACKUP_TABLES = ('channels', 'main_types', 'sub_types', 'consumption', 'usage_records', 'budgets')
+
+def _tables():
+    from app import db
+    return [db.metadata.tables[name] for name in BACKUP_TABLES]
+
+def _column_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+def _encoder(column):
+    """列值转换为可写入 JSON 的值（金额、日期时间转为字符串）"""
+    python_type = _column_type(column)
+    if python_type is Decimal:
+        return str
+    if python_type in (datetime, date):
+        return python_type.isoformat
+    return None
+
+def _converter(column):
+    """备份中的 JSON 值转换回列的 Python 类型"""
+    python_type = _column_type(column)
+    if python_type is Decimal:
+        return Decimal
+    if python_type in (datetime, date):
+        return python_type.fromisoformat
+    return None
+
+def _convert_rows(rows, functions):
+    """按列就地转换各行中的非空值，functions 为 [(列序号, 转换函数)]"""
+    for row in rows:
+        for i, function in functions:
+            if row[i] is not None:
+                row[i] = function(row[i])
+    return rows
+
+def _dump(item):
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+@contextmanager
+def _snapshot(engine):
+    """只读的一致性快照连接：全部查询在同一个事务中执行，结束时回滚"""
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect == 'mysql':
+            connection = connection.execution_options(isolation_level='REPEATABLE READ')
+            connection.exec_driver_sql('START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY')
+        elif dialect == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+            # pysqlite 不为查询开启事务，显式 BEGIN 后第一条查询固定快照
+            connection.exec_driver_sql('BEGIN')
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+
+def backup_ledger(engine, path, chunk_size=10000, compress_level=6):
+    """把账本数据的一致性快照写入备份文件，返回各表行数"""
+    tables = _tables()
+    counts = {}
+    # 先写临时文件，完成后再替换，中途失败不会留下不完整的备份
+    tmp = f'{path}.tmp'
+    with _snapshot(engine) as connection, gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=compress_level) as out:
+        out.write(_dump({
+            'format': BACKUP_FORMAT,
+            'schema_version': SCHEMA_VERSION,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'tables': {table.name: [column.name for column in table.columns] for table in tables},
+        }))
+        for table in tables:
+            encoders = [(i, encoder) for i, encoder in enumerate(map(_encoder, table.columns)) if encoder]
+            result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(
+                select(table).order_by(*table.primary_key.columns)
+            )
+            count = 0
+            for rows in result.partitions():
+                out.write(_dump({'table': table.name, 'rows': _convert_rows([list(row) for row in rows], encoders)}))
+                count += len(rows)
+            counts[table.name] = count
+            logger.info(f'备份表 {table.name} 完成，共 {count} 行')
+        out.write(_dump({'end': True, 'counts': counts}))
+    os.replace(tmp, path)
+    return counts
+
+def _read_header(lines):
+    header = json.loads(next(lines, 'null'))
+    if not isinstance(header, dict) or header.get('format') != BACKUP_FORMAT:
+        raise ValueError('不是账本备份文件！')
+    if header['schema_version'] > SCHEMA_VERSION:
+        raise ValueError(f'备份文件结构版本 {header["schema_version"]} 高于当前支持的版本 {SCHEMA_VERSION}，请先升级程序！')
+
+    tables = {table.name: table for table in _tables()}
+    for name, columns in header['tables'].items():
+        if name not in tables:
+            raise ValueError(f'备份文件中的表 {name} 不存在！')
+        unknown = set(columns) - set(tables[name].columns.keys())
+        if unknown:
+            raise ValueError(f'备份文件中表 {name} 的列 {", ".join(sorted(unknown))} 不存在！')
+    return header, tables
+
+def _deferrable_indexes(connection, table):
+    """可在写入后再创建的普通索引（数据库中实际存在的）"""
+    existing = {index['name'] for index in inspect(connection).get_indexes(table.name)}
+    foreign_key_columns = {foreign_key.parent for foreign_key in table.foreign_keys}
+    for index in table.indexes:
+        if index.unique or index.name not in existing:
+            continue
+        # MySQL 的外键依赖以外键列开头的索引，不能删除
+        if connection.dialect.name == 'mysql' and list(index.columns)[0] in foreign_key_columns:
+            continue
+        yield index
+
+def _insert_statement(connection, table, columns):
+    """编译指定列的 INSERT，返回 (SQL, 转换函数)；转换函数把一行 JSON 值转为驱动参数
+
+    行数据在这里一次完成类型转换和列类型的绑定处理，直接交给驱动的 executemany，
+    省去逐行构造参数字典的开销。
+    """
+    dialect = connection.dialect
+    compiled = table.insert().compile(dialect=dialect, column_keys=columns)
+    # 旧版本备份中没有的列（之后新增的列）按列的默认值写入，追加在每行末尾
+    defaults = {}
+    for column in table.columns:
+        if column.name not in columns and column.default is not None and column.default.is_scalar:
+            processor = column.type.bind_processor(dialect)
+            defaults[column.name] = processor(column.default.arg) if processor else column.default.arg
+    names = columns + list(defaults)
+    order = [names.index(key) for key in compiled.positiontup] if compiled.positional else None
+    steps = []
+    for i, name in enumerate(columns):
+        converter = _converter(table.columns[name])
+        processor = table.columns[name].type.bind_processor(dialect)
+        if converter and processor:
+            steps.append((i, lambda value, converter=converter, processor=processor: processor(converter(value))))
+        elif converter or processor:
+            steps.append((i, converter or processor))
+
+    def to_params(rows):
+        _convert_rows(rows, steps)
+        if defaults:
+            for row in rows:
+                row.extend(defaults.values())
+        if order is not None:
+            return [tuple(row[i] for i in order) for row in rows]
+        return [dict(zip(names, row)) for row in rows]
+    return str(compiled), to_params
+
+def _load_chunks(connection, lines, header, tables, restored):
+    """逐块批量写入，返回各表行数；结尾缺失或行数不符时抛出 ValueError"""
+    counts = {table.name: 0 for table in restored}
+    statements = {}
+    footer = None
+    for line in lines:
+        chunk = json.loads(line)
+        if chunk.get('end'):
+            footer = chunk
+            break
+        name = chunk['table']
+        if name not in statements:
+            statements[name] = _insert_statement(connection, tables[name], header['tables'][name])
+        sql, to_params = statements[name]
+        connection.exec_driver_sql(sql, to_params(chunk['rows']))
+        counts[name] += len(chunk['rows'])
+
+    if footer is None or footer['counts'] != counts:
+        raise ValueError('备份文件不完整，已放弃恢复！')
+    return counts
+
+def restore_ledger(engine, path, force=False):
+    """从备份文件恢复账本数据，返回各表行数；目标库已有数据时需 force=True（先清空）"""
+    with gzip.open(path, 'rt', encoding='utf-8') as lines, write_transactions(), engine.begin() as connection:
+        header, tables = _read_header(lines)
+        restored = [tables[name] for name in BACKUP_TABLES if name in header['tables']]
+
+        is_mysql = connection.dialect.name == 'mysql'
+        if is_mysql:
+            connection.exec_driver_sql('SET foreign_key_checks = 0, unique_checks = 0')
+        try:
+            # 先删除索引再清空、写入（MySQL 的 DDL 会隐式提交，放在最前面使清空和写入仍在同一事务中）
+            deferred = [index for table in restored for index in _deferrable_indexes(connection, table)]
+            for index in deferred:
+                index.drop(connection)
+
+            try:
+                if any(connection.execute(select(table).limit(1)).first() is not None for table in restored):
+                    if not force:
+                        raise ValueError('目标数据库已有账本数据，如需覆盖请使用 --force！')
+                    for table in reversed(restored):
+                        connection.execute(table.delete())
+                counts = _load_chunks(connection, lines, header, tables, restored)
+            except Exception:
+                # SQLite 回滚时索引随之恢复；MySQL 的删除索引已提交，需要补建
+                if is_mysql:
+                    for index in deferred:
+                        index.create(connection)
+                raise
+
+            for index in deferred:
+                index.create(connection)
+        finally:
+            # 会话级设置，恢复失败时也要还原，避免连接回到连接池后其他请求跳过约束检查
+            if is_mysql:
+                connection.exec_driver_sql('SET foreign_key_checks = 1, unique_checks = 1')
+
+    _rebuild_derived()
+    return counts
+
+def _rebuild_derived():
+    """恢复后重建派生数据，并使各类缓存失效"""
+    from app import db
+    from app.models.budget import reconcile_spend
+    from app.models.consumption import mark_consumption_changed
+    from app.models.lookup import get_lookup_cache, mark_lookups_changed
+    from app.models.price_sketch import mark_price_sketches_stale
+
+    mark_price_sketches_stale()
+    mark_consumption_changed()
+    mark_lookups_changed()
+    db.session.commit()
+    reconcile_spend(fix=True)
+    get_lookup_cache().invalidate()
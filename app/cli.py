@@ -0,0 +1,122 @@
+import click
+from flask.cli import AppGroup
+
+# 账本维护命令：flask ledger <command>
+ledger_cli = AppGroup('ledger', help='账本维护命令')
+
+@ledger_cli.command('migrate')
+@click.argument('name')
+def migrate(name):
+    """执行数据库迁移"""
+    from app.migrations import run_migration
+
+    run_migration(name)
+    click.echo(f'迁移 {name} 执行完成')
+
+@ledger_cli.command('build-assets')
+def build_assets():
+    """为静态资源生成带内容哈希的文件和清单（部署时执行，之后需重启服务）"""
+    from flask import current_app
+    from app.assets import build_assets as build
+
+    manifest = build(current_app.static_folder)
+    click.echo(f'已生成 {len(manifest)} 个带哈希的静态资源')
+
+@ledger_cli.command('recompute-prices')
+@click.option('--dry-run', is_flag=True, help='只输出与公式不一致的统计，不修改数据')
+@click.option('--sub-type', help='只处理指定统计类型')
+@click.option('--start-date', help='购买时间起始（YYYY-MM-DD）')
+@click.option('--end-date', help='购买时间结束（YYYY-MM-DD）')
+@click.option('--chunk-size', default=50000, show_default=True, help='每个事务处理的ID区间大小')
+def recompute_prices(dry_run, sub_type, start_date, end_date, chunk_size):
+    """按统一公式重算最小单位单价和日均价格"""
+    import json
+    from app.models.pricing import build_recompute_filters, drift_report, recompute_derived_prices
+
+    try:
+        filters = build_recompute_filters(sub_type, start_date, end_date)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    if dry_run:
+        click.echo(json.dumps(drift_report(filters), ensure_ascii=False, indent=2))
+        return
+
+    updated = recompute_derived_prices(filters, chunk_size=chunk_size)
+    click.echo(f'重算完成，更新 {updated} 行')
+
+@ledger_cli.command('run-job')
+@click.argument('job_type')
+@click.option('--params', default='{}', help='任务参数（JSON）')
+def run_job(job_type, params):
+    """在当前进程中同步执行后台任务"""
+    import json
+    from app import db
+    from app.jobs import JOB_TYPES, execute_job
+    from app.models import Job
+
+    if job_type not in JOB_TYPES:
+        raise click.BadParameter(f'未知的任务类型，可用: {", ".join(JOB_TYPES)}')
+    job = Job(job_type=job_type, params=json.dumps(json.loads(params), ensure_ascii=False))
+    db.session.add(job)
+    db.session.commit()
+
+    job = execute_job(job.id)
+    click.echo(json.dumps(job.to_dict(), ensure_ascii=False, indent=2))
+    if job.status != 'succeeded':
+        raise SystemExit(1)
+
+@ledger_cli.command('reconcile-budgets')
+@click.option('--fix', is_flag=True, help='按消费项表重建不一致的月度累计支出')
+def reconcile_budgets(fix):
+    """核对按月累计支出与消费项表是否一致"""
+    import json
+    from app.models.budget import reconcile_spend
+
+    mismatches = reconcile_spend(fix=fix)
+    if not mismatches:
+        click.echo('月度累计支出与消费项一致')
+        return
+    click.echo(json.dumps(mismatches, ensure_ascii=False, indent=2))
+    if fix:
+        click.echo(f'已修正 {len(mismatches)} 个不一致的分组')
+    else:
+        raise SystemExit(1)
+
+@ledger_cli.command('backup')
+@click.argument('path')
+@click.option('--chunk-size', default=10000, show_default=True, help='每个数据块的行数')
+@click.option('--compress-level', default=6, show_default=True, type=click.IntRange(1, 9), help='gzip 压缩级别')
+def backup(path, chunk_size, compress_level):
+    """把账本数据的一致性快照备份到压缩文件（读取期间不阻塞写入）"""
+    import time
+    from app import db
+    from app.backup import backup_ledger
+
+    begin = time.perf_counter()
+    counts = backup_ledger(db.engine, path, chunk_size=chunk_size, compress_level=compress_level)
+    elapsed = time.perf_counter() - begin
+    total = sum(counts.values())
+    click.echo(f'备份完成: {path}，共 {total} 行，耗时 {elapsed:.1f} s（{total / max(elapsed, 1e-9):,.0f} 行/s）')
+    for table, count in counts.items():
+        click.echo(f'  {table}: {count}')
+
+@ledger_cli.command('restore')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--force', is_flag=True, help='目标数据库已有数据时先清空再恢复')
+def restore(path, force):
+    """从备份文件恢复账本数据"""
+    import time
+    from app import db
+    from app.backup import restore_ledger
+
+    begin = time.perf_counter()
+    try:
+        counts = restore_ledger(db.engine, path, force=force)
+    except (ValueError, OSError) as e:
+        raise click.ClickException(str(e))
+    elapsed = time.perf_counter() - begin
+    total = sum(counts.values())
+    click.echo(f'恢复完成: {path}，共 {total} 行，耗时 {elapsed:.1f} s（{total / max(elapsed, 1e-9):,.0f} 行/s）')
+    for table, count in counts.items():
+        click.echo(f'  {table}: {count}')
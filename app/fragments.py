@@ -0,0 +1,106 @@
+"""页面片段缓存
+
+字典表（渠道、账单类型、统计类型）的下拉选项和管理表格行在多个页面重复渲染，
+且远少于读取次数变化。这些片段渲染一次后按字典表数据版本缓存，
+任何进程修改字典表都会递增版本号，下次渲染时自动重建。
+版本号每个请求只读取一次（保存在 g 中），同一页面的各片段共用。
+"""
+from app.models.channel import get_all_channels
+from app.models.data_version import LOOKUP_VERSION, get_data_version
+from app.models.main_type import get_all_main_types
+from app.models.sub_type import get_all_sub_types, get_used_sub_types
+from flask import current_app, g, render_template
+from jinja2 import FileSystemBytecodeCache, pass_context
+from markupsafe import Markup
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 片段名称 -> (模板, 数据加载函数)
+FRAGMENTS = {
+    'channel_options': ('fragments/lookup_options.html', get_all_channels),
+    'main_type_options': ('fragments/lookup_options.html', get_all_main_types),
+    'sub_type_options': ('fragments/lookup_options.html', get_all_sub_types),
+    'used_sub_type_options': ('fragments/lookup_options.html', get_used_sub_types),
+    'channel_rows': ('fragments/channel_rows.html', get_all_channels),
+    'main_type_rows': ('fragments/main_type_rows.html', get_all_main_types),
+    'sub_type_rows': ('fragments/sub_type_rows.html', get_all_sub_types),
+}
+
+class FragmentCache:
+    """按数据版本缓存的已渲染片段"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}
+
+    def get(self, name, version):
+        cached = self._items.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        return None
+
+    def set(self, name, version, html):
+        with self._lock:
+            self._items[name] = (version, html)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+def get_fragment_cache():
+    return current_app.extensions.setdefault('fragment_cache', FragmentCache())
+
+def lookup_version():
+    """本次请求的字典表数据版本，首次调用时按主键读取（其他进程的修改也能立即生效）"""
+    if 'lookup_version' not in g:
+        g.lookup_version = get_data_version(LOOKUP_VERSION)
+    return g.lookup_version
+
+def load_fragment(name, version=None):
+    """返回缓存的片段HTML，缓存未命中时渲染并缓存（出错时抛出异常）
+
+    version: 字典表数据版本，在其他线程中加载时由请求线程传入；省略时取本次请求的版本
+    """
+    if version is None:
+        version = lookup_version()
+    cache = get_fragment_cache()
+    html = cache.get(name, version)
+    if html is None:
+        template, loader = FRAGMENTS[name]
+        html = Markup(render_template(template, items=loader()))
+        cache.set(name, version, html)
+    return html
+
+@pass_context
+def fragment(context, name):
+    """模板全局函数：返回片段HTML，出错时返回空片段，不影响页面其余部分
+
+    页面路由已由页面数据加载器并发取得的片段通过模板变量 fragments 传入，直接使用；
+    加载失败的片段（记录在 load_errors 中）不再重试，其余情况按缓存加载。
+    """
+    preloaded = context.get('fragments') or {}
+    if name in preloaded:
+        return preloaded[name]
+    if name in (context.get('load_errors') or {}):
+        return Markup('')
+    try:
+        return load_fragment(name)
+    except Exception as e:
+        logger.error(f'渲染页面片段失败，片段: {name}, 错误: {str(e)}', exc_info=True)
+        return Markup('')
+
+def init_fragments(app):
+    """配置Jinja字节码缓存并注册片段函数（须在首次访问 app.jinja_env 之前调用）"""
+    cache_dir = app.config.get('JINJA_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    # 编译后的模板持久化到磁盘，进程重启后无需重新解析和编译
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(cache_dir)}
+    app.add_template_global(fragment, 'fragment')
+
+    @app.before_request
+    def reset_lookup_version():
+        # 应用上下文可能跨多个请求（如测试中），每个请求重新读取版本号
+        g.pop('lookup_version', None)
@@ -0,0 +1,156 @@
+"""合并提交（group commit）
+
+每个新增请求单独提交时，每次提交都要等待一次落盘，并发写入的吞吐受限于磁盘的提交速率。
+开启 GROUP_COMMIT 后，并发的单条写入交给后台提交线程：第一项到达后最多等待
+GROUP_COMMIT_MAX_DELAY_MS 毫秒或凑满 GROUP_COMMIT_MAX_BATCH 项，在同一个事务中依次执行并一次提交。
+
+- 每项在单独的保存点中执行，出错只回滚该项，异常交还给对应的调用方
+- 调用方阻塞到所在事务提交（或失败）后才返回，响应发出前数据已经提交，持久性与逐条提交相同
+- 提交失败时该批所有调用方都收到异常
+
+内存数据库只有一个共享连接，此时退化为在当前线程中执行并立即提交。
+"""
+from app.sqlite_profile import write_transactions
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class _Pending:
+    """一项待提交的写入"""
+
+    def __init__(self, work, finish):
+        self.work = work
+        self.finish = finish
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+class GroupCommitter:
+    """后台提交线程：收集并发提交的写入，合并为一个事务"""
+
+    def __init__(self, app, max_batch=50, max_delay=0.005):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _concurrent(self):
+        from app import db
+        # 共享单个连接的连接池不能在后台线程中使用
+        return not isinstance(db.engine.pool, (StaticPool, SingletonThreadPool))
+
+    def submit(self, work, finish=None):
+        """提交一项写入，阻塞到其所在事务提交后返回
+
+        work(): 在合并事务中执行的写操作（不提交），返回值交给 finish
+        finish(results): 事务提交后对同一批中 finish 相同的各项结果统一处理，返回与之对应的列表；
+                         为 None 时直接返回 work 的结果
+        """
+        if not self._concurrent():
+            from app import db
+            result = work()
+            db.session.commit()
+            return finish([result])[0] if finish else result
+
+        self._ensure_thread()
+        item = _Pending(work, finish)
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _ensure_thread(self):
+        # 首次提交时启动，避免多进程部署时在 fork 之前创建线程
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                with self.app.app_context():
+                    self._commit_batch(batch)
+            except Exception as e:
+                logger.error(f'合并提交失败: {str(e)}', exc_info=True)
+                for item in batch:
+                    if item.error is None:
+                        item.error = e
+            finally:
+                for item in batch:
+                    item.done.set()
+
+    def _commit_batch(self, batch):
+        from app import db
+
+        session = db.session()
+        # 提交后保留已加载的属性，finish 中生成响应时无需逐行重新查询
+        session.expire_on_commit = False
+        committed = []
+        try:
+            with write_transactions():
+                for item in batch:
+                    try:
+                        with session.begin_nested():
+                            item.result = item.work()
+                        committed.append(item)
+                    except Exception as e:
+                        logger.warning(f'合并提交中单项写入失败: {str(e)}')
+                        item.error = e
+                session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        self.batches += 1
+        self.items += len(committed)
+        logger.debug(f'合并提交完成，本批 {len(committed)}/{len(batch)} 项')
+
+        # 事务已提交，按 finish 分组后处理结果
+        groups = {}
+        for item in committed:
+            if item.finish is not None:
+                groups.setdefault(item.finish, []).append(item)
+        for finish, items in groups.items():
+            try:
+                for item, result in zip(items, finish([item.result for item in items])):
+                    item.result = result
+            except Exception as e:
+                logger.error(f'合并提交后处理结果失败: {str(e)}', exc_info=True)
+                for item in items:
+                    item.error = e
+
+def init_group_commit(app):
+    """GROUP_COMMIT 开启时创建合并提交器"""
+    if not app.config.get('GROUP_COMMIT'):
+        return None
+    committer = GroupCommitter(
+        app,
+        max_batch=int(app.config.get('GROUP_COMMIT_MAX_BATCH', 50)),
+        max_delay=float(app.config.get('GROUP_COMMIT_MAX_DELAY_MS', 5)) / 1000
+    )
+    app.extensions['group_commit'] = committer
+    return committer
+
+def get_group_committer():
+    """当前应用的合并提交器，未开启时为 None"""
+    from flask import current_app
+    return current_app.extensions.get('group_commit')
@@ -0,0 +1,285 @@
+"""进程内后台任务
+
+耗时操作（导出、重算、重建等）提交为任务，在有界线程池中执行，
+任务记录持久化在jobs表中（状态、进度、结果）。
+- 每种任务类型有并发上限，超出的任务排队等待
+- 取消为协作式：排队中的任务立即取消，运行中的任务在下次汇报进度时停止
+- 任务由条件 UPDATE（status 为 pending 时改为 running）领取，多个进程同时入队同一任务也只执行一次
+- 运行中的任务定期写入心跳；服务进程处理第一个请求前恢复遗留任务：
+  心跳超时的运行中任务标记为失败，排队中的任务重新入队（命令行等非服务进程不做恢复）
+"""
+from app import db
+from app.models.job import Job, JOB_PENDING, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED, JOB_FINISHED_STATUSES
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+import json
+import logging
+import os
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 任务类型注册表：名称 -> JobType
+JOB_TYPES = {}
+
+class JobType:
+    def __init__(self, name, func, max_concurrency):
+        self.name = name
+        self.func = func
+        self.max_concurrency = max_concurrency
+
+def job_type(name, max_concurrency=1):
+    """注册任务类型，被装饰函数签名为 func(ctx, **params)，返回值作为任务结果（需可JSON序列化）"""
+    def decorator(func):
+        JOB_TYPES[name] = JobType(name, func, max_concurrency)
+        return func
+    return decorator
+
+class JobCancelled(Exception):
+    """任务被取消"""
+
+class JobContext:
+    """传给任务函数的上下文，用于汇报进度和响应取消"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def check_cancelled(self):
+        cancel_requested = db.session.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar()
+        if cancel_requested:
+            raise JobCancelled()
+
+    def set_progress(self, progress):
+        """更新进度（0~1）并检查是否已取消；会提交当前会话，应在一批工作完成后调用"""
+        db.session.execute(db.update(Job).where(Job.id == self.job_id).values(progress=progress, heartbeat=datetime.now()))
+        db.session.commit()
+        self.check_cancelled()
+
+def process_id():
+    """当前进程的标识（fork 出的子进程各不相同）"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+def _claim(job_id):
+    """领取排队中的任务，返回是否领取成功（已被其他进程领取或已结束时返回False）"""
+    now = datetime.now()
+    claimed = db.session.execute(
+        db.update(Job)
+        .where(Job.id == job_id, Job.status == JOB_PENDING, Job.cancel_requested == False)
+        .values(status=JOB_RUNNING, owner=process_id(), start_time=now, heartbeat=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        # 排队中被请求取消的任务直接结束
+        db.session.execute(
+            db.update(Job)
+            .where(Job.id == job_id, Job.status == JOB_PENDING, Job.cancel_requested == True)
+            .values(status=JOB_CANCELLED, finish_time=now)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return bool(claimed)
+
+class _Heartbeat:
+    """任务运行期间在后台线程中定期更新心跳"""
+
+    def __init__(self, app, job_id, interval):
+        self.app = app
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        # 共享单个连接的连接池不能在后台线程中使用
+        if not isinstance(db.engine.pool, (StaticPool, SingletonThreadPool)):
+            self._thread = threading.Thread(target=self._run, name=f'job-heartbeat-{self.job_id}', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.app.app_context():
+                    db.session.execute(
+                        db.update(Job)
+                        .where(Job.id == self.job_id, Job.status == JOB_RUNNING)
+                        .values(heartbeat=datetime.now())
+                        .execution_options(synchronize_session=False)
+                    )
+                    db.session.commit()
+            except Exception as e:
+                logger.warning(f'任务心跳更新失败，ID: {self.job_id}, 错误: {str(e)}')
+
+def execute_job(job_id):
+    """在当前线程执行任务（后台线程和命令行同步执行共用）"""
+    if not _claim(job_id):
+        return db.session.get(Job, job_id, populate_existing=True)
+    job = db.session.get(Job, job_id, populate_existing=True)
+    logger.info(f'任务开始执行，ID: {job_id}, 类型: {job.job_type}')
+
+    params = json.loads(job.params) if job.params else {}
+    try:
+        app = current_app._get_current_object()
+        with _Heartbeat(app, job_id, app.config.get('JOB_HEARTBEAT_INTERVAL', 10)):
+            result = JOB_TYPES[job.job_type].func(JobContext(job_id), **params)
+        job = db.session.get(Job, job_id)
+        job.progress = 1.0
+        job.result = json.dumps(result, ensure_ascii=False) if result is not None else None
+        _finish(job, JOB_SUCCEEDED)
+        logger.info(f'任务执行成功，ID: {job_id}')
+    except JobCancelled:
+        db.session.rollback()
+        _finish(db.session.get(Job, job_id), JOB_CANCELLED)
+        logger.info(f'任务已取消，ID: {job_id}')
+    except Exception as e:
+        logger.error(f'任务执行失败，ID: {job_id}, 错误: {str(e)}', exc_info=True)
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.error = str(e)
+        _finish(job, JOB_FAILED)
+    return job
+
+def _finish(job, status):
+    job.status = status
+    job.finish_time = datetime.now()
+    db.session.commit()
+
+class JobRunner:
+    """有界线程池 + 按任务类型的并发上限"""
+
+    def __init__(self, app, max_workers=2):
+        self.app = app
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._running = {}
+        self._waiting = {}
+        self._done = {}
+        self._recovered = False
+
+    def submit(self, name, params=None):
+        """创建任务记录并入队，返回任务"""
+        if name not in JOB_TYPES:
+            raise ValueError(f'未知的任务类型: {name}，可用: {", ".join(JOB_TYPES)}')
+        job = Job(job_type=name, params=json.dumps(params or {}, ensure_ascii=False))
+        db.session.add(job)
+        db.session.commit()
+        self._enqueue(job.id, name)
+        return job
+
+    def _enqueue(self, job_id, name):
+        with self._lock:
+            self._done[job_id] = threading.Event()
+            if self._running.get(name, 0) < JOB_TYPES[name].max_concurrency:
+                self._running[name] = self._running.get(name, 0) + 1
+                self._executor.submit(self._run, job_id, name)
+            else:
+                self._waiting.setdefault(name, deque()).append(job_id)
+
+    def _run(self, job_id, name):
+        try:
+            with self.app.app_context():
+                execute_job(job_id)
+        except Exception as e:
+            logger.error(f'任务调度失败，ID: {job_id}, 错误: {str(e)}', exc_info=True)
+        finally:
+            with self._lock:
+                self._done.pop(job_id, threading.Event()).set()
+                waiting = self._waiting.get(name)
+                if waiting:
+                    # 同类型有排队任务时直接占用当前名额
+                    self._executor.submit(self._run, waiting.popleft(), name)
+                else:
+                    self._running[name] -= 1
+
+    def cancel(self, job_id):
+        """请求取消任务，返回任务（不存在时返回None）"""
+        job = db.session.get(Job, job_id)
+        if job is None or job.status in JOB_FINISHED_STATUSES:
+            return job
+        # 排队中的任务直接取消，条件UPDATE避免与其他进程的领取冲突；已开始运行的只请求取消
+        cancelled = db.session.execute(
+            db.update(Job)
+            .where(Job.id == job_id, Job.status == JOB_PENDING)
+            .values(status=JOB_CANCELLED, cancel_requested=True, finish_time=datetime.now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if cancelled:
+            with self._lock:
+                waiting = self._waiting.get(job.job_type)
+                if waiting and job_id in waiting:
+                    waiting.remove(job_id)
+                    self._done.pop(job_id, threading.Event()).set()
+        else:
+            db.session.execute(
+                db.update(Job)
+                .where(Job.id == job_id, Job.status == JOB_RUNNING)
+                .values(cancel_requested=True)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        return db.session.get(Job, job_id, populate_existing=True)
+
+    def wait(self, job_id, timeout=None):
+        """等待本进程提交的任务结束，返回是否已结束"""
+        event = self._done.get(job_id)
+        return event.wait(timeout) if event else True
+
+    def recover(self):
+        """处理遗留任务：心跳超时的运行中任务标记失败，排队中的任务入队
+
+        其他存活进程正在执行的任务心跳未超时，不受影响；排队中的任务可能同时被多个进程入队，
+        执行前的领取保证只执行一次。
+        """
+        now = datetime.now()
+        stale_before = now - timedelta(seconds=self.app.config.get('JOB_STALE_SECONDS', 60))
+        interrupted = db.session.execute(
+            db.update(Job)
+            .where(Job.status == JOB_RUNNING, db.func.coalesce(Job.heartbeat, Job.start_time, Job.create_time) < stale_before)
+            .values(status=JOB_FAILED, error='任务中断（执行进程已退出），可重新提交', finish_time=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        pending = Job.query.filter_by(status=JOB_PENDING).order_by(Job.id).all()
+        db.session.commit()
+        enqueued = 0
+        for job in pending:
+            if job.job_type in JOB_TYPES and job.id not in self._done:
+                self._enqueue(job.id, job.job_type)
+                enqueued += 1
+        if interrupted or enqueued:
+            logger.info(f'任务恢复：{interrupted} 个中断任务标记失败，{enqueued} 个排队任务重新入队')
+
+    def recover_once(self):
+        """本进程只恢复一次"""
+        with self._lock:
+            if self._recovered:
+                return
+            self._recovered = True
+        self.recover()
+
+def init_job_runner(app):
+    """创建应用的任务执行器；服务进程处理第一个请求前恢复遗留任务
+
+    导入应用的命令行、脚本等进程不处理请求，不会恢复任务，也不会误判正在运行的任务。
+    JOB_RECOVER=0 时不自动恢复。
+    """
+    from app.jobs import handlers  # 注册任务类型
+
+    runner = JobRunner(app, max_workers=int(app.config.get('JOB_WORKERS', 2)))
+    app.extensions['job_runner'] = runner
+    if app.config.get('JOB_RECOVER', True):
+        @app.before_request
+        def recover_jobs():
+            runner.recover_once()
+    return runner
+
+def get_job_runner():
+    return current_app.extensions['job_runner']
@@ -0,0 +1,57 @@
+"""内置任务类型"""
+from app.jobs import job_type
+from app.models import Consumption
+from app.models.pricing import build_recompute_filters, recompute_derived_prices
+from datetime import datetime, timedelta
+from flask import current_app
+import csv
+import os
+
+# 导出文件目录（位于实例目录下）
+EXPORT_DIR = 'exports'
+
+EXPORT_COLUMNS = [
+    'id', 'content', 'quantity', 'total_price', 'channel', 'main_type', 'sub_type',
+    'unit_coefficient', 'receive_status', 'create_time', 'statistical_status', 'min_unit_price',
+    'tag', 'evaluate', 'start_use_time', 'end_use_time', 'daily_average_price', 'pickup_code'
+]
+
+def get_export_dir():
+    path = os.path.join(current_app.instance_path, EXPORT_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+@job_type('recompute_prices', max_concurrency=1)
+def recompute_prices(ctx, sub_type=None, start_date=None, end_date=None, chunk_size=50000):
+    """按统一公式重算派生价格"""
+    filters = build_recompute_filters(sub_type, start_date, end_date)
+    updated = recompute_derived_prices(filters, chunk_size=chunk_size, progress=ctx.set_progress)
+    return {'updated': updated}
+
+@job_type('export_consumption', max_concurrency=2)
+def export_consumption(ctx, start_date=None, end_date=None, batch_size=1000):
+    """导出消费项为CSV文件"""
+    query = Consumption.query.filter_by(is_deleted=False)
+    if start_date:
+        query = query.filter(Consumption.create_time >= datetime.strptime(start_date, '%Y-%m-%d'))
+    if end_date:
+        query = query.filter(Consumption.create_time < datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1))
+    total = query.count()
+
+    filename = f'consumption_{ctx.job_id}.csv'
+    rows = 0
+    with open(os.path.join(get_export_dir(), filename), 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        # 按ID分批读取，批与批之间可以安全地提交进度
+        last_id = 0
+        while True:
+            batch = query.filter(Consumption.id > last_id).order_by(Consumption.id).limit(batch_size).all()
+            if not batch:
+                break
+            for item in batch:
+                writer.writerow(item.to_dict())
+            rows += len(batch)
+            last_id = batch[-1].id
+            ctx.set_progress(rows / total if total else 1.0)
+    return {'file': filename, 'rows': rows, 'total': total}
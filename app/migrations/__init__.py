@@ -0,0 +1,29 @@
+"""数据库迁移
+
+db.create_all() 只会创建缺失的表，不会修改已有表结构。
+已有数据的数据库升级时，通过 `flask ledger migrate <name>` 执行对应迁移。
+"""
+from app.migrations import channel_index, consumption_version, data_versions, job_heartbeat, lookup_fk, money_storage
+
+MIGRATIONS = {
+    'lookup_fk': lookup_fk.upgrade,
+    'money_cents': money_storage.upgrade,
+    'money_decimal': money_storage.downgrade,
+    'channel_index': channel_index.upgrade,
+    'consumption_version': consumption_version.upgrade,
+    'job_heartbeat': job_heartbeat.upgrade,
+    'data_versions': data_versions.upgrade,
+}
+
+def run_migration(name):
+    """在一个事务中执行指定迁移
+
+    SQLite 下整个迁移可以回滚；MySQL 的 DDL 会隐式提交，失败时已执行的步骤保留，
+    因此各迁移都须可重复执行，修复问题后重新运行。
+    """
+    from app import db
+
+    if name not in MIGRATIONS:
+        raise ValueError(f'未知的迁移: {name}，可用: {", ".join(MIGRATIONS)}')
+    with db.engine.begin() as connection:
+        MIGRATIONS[name](connection)
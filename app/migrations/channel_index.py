@@ -0,0 +1,10 @@
+"""consumption表增加 (sub_type_id, channel_id, create_time) 复合索引，供渠道单价排行使用"""
+from sqlalchemy import inspect, text
+
+INDEX_NAME = 'ix_consumption_sub_type_channel'
+
+def upgrade(connection):
+    """创建索引，已存在时跳过"""
+    indexes = {i['name'] for i in inspect(connection).get_indexes('consumption')}
+    if INDEX_NAME not in indexes:
+        connection.execute(text(f'CREATE INDEX {INDEX_NAME} ON consumption (sub_type_id, channel_id, create_time)'))
@@ -0,0 +1,8 @@
+"""consumption表增加行版本号 version，修改消费项时用于检测并发修改"""
+from sqlalchemy import inspect, text
+
+def upgrade(connection):
+    """增加 version 列（已有行为1），已存在时跳过"""
+    columns = {c['name'] for c in inspect(connection).get_columns('consumption')}
+    if 'version' not in columns:
+        connection.execute(text('ALTER TABLE consumption ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
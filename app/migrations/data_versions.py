@@ -0,0 +1,11 @@
+"""data_versions 预先写入各数据版本的全部计数行，递增版本号时只需 UPDATE，避免首次递增时并发插入同一行"""
+from sqlalchemy import text
+
+def upgrade(connection):
+    """补齐缺失的计数行，已存在的行保持不变"""
+    from app.models.data_version import seed_rows
+
+    existing = set(connection.execute(text('SELECT name FROM data_versions')).scalars())
+    rows = [row for row in seed_rows() if row['name'] not in existing]
+    if rows:
+        connection.execute(text('INSERT INTO data_versions (name, version) VALUES (:name, :version)'), rows)
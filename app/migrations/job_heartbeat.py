@@ -0,0 +1,10 @@
+"""jobs表增加执行进程 owner 和心跳时间 heartbeat，重启恢复时只处理心跳超时的运行中任务"""
+from sqlalchemy import inspect, text
+
+def upgrade(connection):
+    """增加 owner、heartbeat 列，已存在时跳过"""
+    columns = {c['name'] for c in inspect(connection).get_columns('jobs')}
+    if 'owner' not in columns:
+        connection.execute(text('ALTER TABLE jobs ADD COLUMN owner VARCHAR(100)'))
+    if 'heartbeat' not in columns:
+        connection.execute(text('ALTER TABLE jobs ADD COLUMN heartbeat DATETIME'))
@@ -0,0 +1,76 @@
+"""consumption表的渠道、账单类型、统计类型由字符串列迁移为整数外键"""
+from sqlalchemy import inspect, text
+
+# (旧字符串列, 新外键列, 字典表)
+LOOKUP_COLUMNS = [
+    ('channel', 'channel_id', 'channels'),
+    ('main_type', 'main_type_id', 'main_types'),
+    ('sub_type', 'sub_type_id', 'sub_types'),
+]
+# 外键列非空的字符串列：名称为空或NULL的消费项归入该名称的字典项
+REQUIRED_COLUMNS = {'channel', 'main_type'}
+MISSING_NAME = '未设置'
+
+def upgrade(connection):
+    """执行迁移，可重复执行（已完成的步骤会跳过）"""
+    inspector = inspect(connection)
+    dialect = connection.dialect.name
+
+    # 1. 字典表增加逻辑删除标记
+    for _, _, table in LOOKUP_COLUMNS:
+        columns = {c['name'] for c in inspector.get_columns(table)}
+        if 'is_deleted' not in columns:
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN is_deleted BOOLEAN NOT NULL DEFAULT 0'))
+
+    columns = {c['name'] for c in inspector.get_columns('consumption')}
+    indexes = {i['name'] for i in inspector.get_indexes('consumption')}
+
+    for old_column, new_column, table in LOOKUP_COLUMNS:
+        # 2. 增加外键列
+        if new_column not in columns:
+            connection.execute(text(f'ALTER TABLE consumption ADD COLUMN {new_column} INTEGER'))
+
+        if old_column in columns:
+            if old_column in REQUIRED_COLUMNS:
+                connection.execute(text(
+                    f'UPDATE consumption SET {old_column} = :name '
+                    f'WHERE {old_column} IS NULL OR {old_column} = \'\''
+                ), {'name': MISSING_NAME})
+            # 3. 消费项中使用但字典表中没有的名称补入字典表（标记删除，不出现在下拉列表中）
+            connection.execute(text(
+                f'INSERT INTO {table} (name, is_deleted) '
+                f'SELECT DISTINCT c.{old_column}, 1 FROM consumption c '
+                f'WHERE c.{old_column} IS NOT NULL AND c.{old_column} <> \'\' '
+                f'AND c.{old_column} NOT IN (SELECT t.name FROM {table} t)'
+            ))
+            # 4. 回填外键
+            connection.execute(text(
+                f'UPDATE consumption SET {new_column} = '
+                f'(SELECT t.id FROM {table} t WHERE t.name = consumption.{old_column}) '
+                f'WHERE {new_column} IS NULL'
+            ))
+
+        # 5. 外键列索引
+        index_name = f'ix_consumption_{new_column}'
+        if index_name not in indexes:
+            connection.execute(text(f'CREATE INDEX {index_name} ON consumption ({new_column})'))
+
+        # 6. 删除旧字符串列
+        if old_column in columns:
+            connection.execute(text(f'ALTER TABLE consumption DROP COLUMN {old_column}'))
+
+    if 'ix_consumption_create_time' not in indexes:
+        connection.execute(text('CREATE INDEX ix_consumption_create_time ON consumption (create_time)'))
+
+    # SQLite不支持修改列约束，MySQL下补充非空与外键约束
+    if dialect == 'mysql':
+        connection.execute(text('ALTER TABLE consumption MODIFY channel_id INT NOT NULL'))
+        connection.execute(text('ALTER TABLE consumption MODIFY main_type_id INT NOT NULL'))
+        foreign_keys = {fk['name'] for fk in inspector.get_foreign_keys('consumption')}
+        for _, new_column, table in LOOKUP_COLUMNS:
+            fk_name = f'fk_consumption_{new_column}'
+            if fk_name not in foreign_keys:
+                connection.execute(text(
+                    f'ALTER TABLE consumption ADD CONSTRAINT {fk_name} '
+                    f'FOREIGN KEY ({new_column}) REFERENCES {table} (id)'
+                ))
@@ -0,0 +1,52 @@
+"""金额列在 DECIMAL 与整数最小单位（分）之间转换
+
+转换方式：新增临时列并按比例回填，删除原列后把临时列改回原名。
+迁移后需设置 MONEY_STORAGE 与之对应（cents / decimal）并重启服务。
+"""
+from sqlalchemy import Integer, inspect, text
+
+# (表名, 列名, 是否非空, DECIMAL 精度)
+MONEY_COLUMNS = [
+    ('consumption', 'total_price', True, 10),
+    ('consumption', 'min_unit_price', False, 10),
+    ('consumption', 'daily_average_price', False, 10),
+    ('budgets', 'amount', True, 10),
+    ('monthly_spend', 'total', True, 12),
+]
+
+# 最小单位与元的比例（两位小数）
+MINOR_UNITS = 100
+
+def _convert(connection, to_minor_units):
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    columns = {}
+
+    for table, column, not_null, precision in MONEY_COLUMNS:
+        # 尚未创建的表跳过（由 create_all 按当前存储方式创建）
+        if table not in tables:
+            continue
+        if table not in columns:
+            columns[table] = {c['name']: c['type'] for c in inspector.get_columns(table)}
+        # 已是目标类型的列跳过，可重复执行
+        if isinstance(columns[table][column], Integer) == to_minor_units:
+            continue
+        tmp = f'{column}_tmp'
+        column_type = 'BIGINT' if to_minor_units else f'DECIMAL({precision}, 2)'
+        constraint = ' NOT NULL DEFAULT 0' if not_null else ' DEFAULT 0'
+        if tmp not in columns[table]:
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {tmp} {column_type}{constraint}'))
+        if to_minor_units:
+            connection.execute(text(f'UPDATE {table} SET {tmp} = ROUND({column} * {MINOR_UNITS})'))
+        else:
+            connection.execute(text(f'UPDATE {table} SET {tmp} = {column} / {MINOR_UNITS}.0'))
+        connection.execute(text(f'ALTER TABLE {table} DROP COLUMN {column}'))
+        connection.execute(text(f'ALTER TABLE {table} RENAME COLUMN {tmp} TO {column}'))
+
+def upgrade(connection):
+    """DECIMAL 转为整数分（MONEY_STORAGE=cents）"""
+    _convert(connection, True)
+
+def downgrade(connection):
+    """整数分转回 DECIMAL（MONEY_STORAGE=decimal）"""
+    _convert(connection, False)
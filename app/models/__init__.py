@@ -2,3 +2,8 @@ from app.models.consumption import Consumption
 from app.models.channel import Channel
 from app.models.main_type import MainType
 from app.models.sub_type import SubType
+from app.models.usage_record import UsageRecord
+from app.models.job import Job
+from app.models.data_version import DataVersion
+from app.models.price_sketch import PriceSketch
+from app.models.budget import Budget, MonthlySpend
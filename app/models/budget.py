@@ -0,0 +1,186 @@
+"""账单类型月度预算与按月累计支出
+
+monthly_spend 按 (月份, 账单类型) 保存已计入统计的支出合计（与统计接口口径一致：已收货且未删除），
+由消费项的写操作在同一事务中增量维护，查询预算剩余时无需对当月消费项求和：
+- 变更前调用 untrack_spend(ids) 减去这些消费项原来的贡献
+- 变更并 flush 后调用 track_spend(ids) 加上新的贡献
+跨月份、跨账单类型的修改因此自动从旧分组移到新分组。
+untrack_spend 先以 SELECT ... FOR UPDATE 锁定这些消费项再读取贡献，并发修改同一消费项
+（如不带版本号的修改、重叠的批量删除与单条删除）排队执行，不会重复减去同一笔贡献。
+reconcile_spend() 按消费项表重新汇总，核对（并可修正）累计值。
+db.create_all() 为已有账本新建 monthly_spend 时按消费项表写入初始累计；
+此前已建表但累计为空的账本需执行一次 `flask ledger reconcile-budgets --fix`。
+"""
+from app import db
+from app.models.consumption import Consumption
+from app.models.lookup import get_lookup_cache
+from app.models.main_type import MainType
+from app.models.money import Money
+from app.models.sql_functions import month_key
+from sqlalchemy import event, insert, literal, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+class Budget(db.Model):
+    """账单类型的月度预算（每月相同）"""
+    __tablename__ = 'budgets'
+
+    main_type_id = db.Column(db.Integer, db.ForeignKey('main_types.id'), primary_key=True)
+    amount = db.Column(Money(10, 2), nullable=False)
+
+    def to_dict(self):
+        return {
+            'main_type': get_lookup_cache().get_name(MainType, self.main_type_id),
+            'amount': float(self.amount)
+        }
+
+class MonthlySpend(db.Model):
+    """按月份和账单类型累计的支出"""
+    __tablename__ = 'monthly_spend'
+
+    month = db.Column(db.String(7), primary_key=True)
+    main_type_id = db.Column(db.Integer, primary_key=True)
+    total = db.Column(Money(12, 2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+@event.listens_for(db.metadata, 'after_create')
+def _seed_monthly_spend(target, connection, tables=(), **kwargs):
+    """新建 monthly_spend 时按已有消费项写入初始累计（新库中消费项为空，不写入任何行）"""
+    if MonthlySpend.__table__ not in tables:
+        return
+    month = month_key(Consumption.create_time)
+    connection.execute(insert(MonthlySpend).from_select(
+        ['month', 'main_type_id', 'total', 'count'],
+        select(month, Consumption.main_type_id, db.func.sum(Consumption.total_price), db.func.count(Consumption.id))
+        .where(*_counted_filters())
+        .group_by(month, Consumption.main_type_id)
+    ))
+
+def _counted_filters():
+    """计入支出的消费项，与统计接口口径一致"""
+    return (Consumption.receive_status == '已收货', Consumption.is_deleted == False)
+
+def _contributions(filters):
+    """按 (月份, 账单类型) 汇总消费项的支出"""
+    month = month_key(Consumption.create_time)
+    return db.session.query(
+        month.label('month'),
+        Consumption.main_type_id,
+        db.func.sum(Consumption.total_price).label('total'),
+        db.func.count(Consumption.id).label('count')
+    ).filter(*filters, *_counted_filters()).group_by(month, Consumption.main_type_id).all()
+
+# 支持单条语句插入或累加的方言
+UPSERT_DIALECTS = {'mysql': mysql, 'postgresql': postgresql, 'sqlite': sqlite}
+
+def _apply(month, main_type_id, total, count):
+    """在当前事务中累加一个分组的支出
+
+    分组不存在时插入、已存在时累加，由一条 upsert 语句完成，并发的首次写入不会因主键冲突失败。
+    """
+    dialect = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(MonthlySpend).values(month=month, main_type_id=main_type_id, total=total, count=count)
+        if dialect is mysql:
+            statement = statement.on_duplicate_key_update(
+                total=MonthlySpend.total + statement.inserted.total,
+                count=MonthlySpend.count + statement.inserted.count
+            )
+        else:
+            statement = statement.on_conflict_do_update(
+                index_elements=[MonthlySpend.month, MonthlySpend.main_type_id],
+                set_={
+                    'total': MonthlySpend.total + statement.excluded.total,
+                    'count': MonthlySpend.count + statement.excluded.count
+                }
+            )
+        db.session.execute(statement)
+        return
+
+    total_type = MonthlySpend.total.type
+    result = db.session.execute(
+        db.update(MonthlySpend)
+        .where(MonthlySpend.month == month, MonthlySpend.main_type_id == main_type_id)
+        .values(total=MonthlySpend.total + literal(total, total_type), count=MonthlySpend.count + count)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.execute(db.insert(MonthlySpend).values(month=month, main_type_id=main_type_id, total=total, count=count))
+
+def track_spend(ids):
+    """把消费项当前的支出加入累计（须在变更 flush 之后调用）"""
+    for row in _contributions([Consumption.id.in_(ids)]):
+        _apply(row.month, row.main_type_id, row.total, row.count)
+
+def _lock_consumptions(ids):
+    """在当前事务中按ID顺序锁定消费项，直到提交或回滚
+
+    SQLite 不支持行锁，同一数据库的写事务本身串行（读后写冲突时返回 SQLITE_BUSY），跳过加锁。
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return
+    db.session.execute(
+        db.select(Consumption.id).where(Consumption.id.in_(ids)).order_by(Consumption.id).with_for_update()
+    )
+
+def untrack_spend(ids):
+    """从累计中减去消费项当前的支出（须在变更之前调用，锁定这些消费项后再读取）"""
+    _lock_consumptions(ids)
+    for row in _contributions([Consumption.id.in_(ids)]):
+        _apply(row.month, row.main_type_id, -row.total, -row.count)
+
+def get_budget_status(month, main_type_ids=None):
+    """指定月份各账单类型的预算、已支出、剩余和是否超支（只含设置了预算的账单类型）"""
+    query = db.session.query(Budget.main_type_id, Budget.amount, MonthlySpend.total).outerjoin(
+        MonthlySpend, db.and_(MonthlySpend.main_type_id == Budget.main_type_id, MonthlySpend.month == month)
+    )
+    if main_type_ids is not None:
+        query = query.filter(Budget.main_type_id.in_(main_type_ids))
+    lookup_cache = get_lookup_cache()
+    items = []
+    for main_type_id, amount, spent in query.order_by(Budget.main_type_id).all():
+        spent = float(spent or 0)
+        items.append({
+            'month': month,
+            'main_type': lookup_cache.get_name(MainType, main_type_id),
+            'budget': float(amount),
+            'spent': round(spent, 2),
+            'remaining': round(float(amount) - spent, 2),
+            'over_budget': spent > float(amount),
+        })
+    return items
+
+def get_consumption_budget(consumption):
+    """消费项所在月份和账单类型的预算状态，未设置预算时返回None"""
+    items = get_budget_status(consumption.create_time.strftime('%Y-%m'), [consumption.main_type_id])
+    return items[0] if items else None
+
+def reconcile_spend(fix=False):
+    """按消费项表重新汇总并与累计值核对，返回不一致的分组；fix=True 时按汇总结果修正"""
+    expected = {(row.month, row.main_type_id): (row.total, row.count) for row in _contributions([])}
+    actual = {(row.month, row.main_type_id): (row.total, row.count) for row in db.session.query(
+        MonthlySpend.month, MonthlySpend.main_type_id, MonthlySpend.total, MonthlySpend.count
+    )}
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        expected_total, expected_count = expected.get(key, (0, 0))
+        actual_total, actual_count = actual.get(key, (0, 0))
+        if round(float(expected_total), 2) != round(float(actual_total), 2) or expected_count != actual_count:
+            mismatches.append({
+                'month': key[0],
+                'main_type': get_lookup_cache().get_name(MainType, key[1]),
+                'expected_total': float(expected_total),
+                'actual_total': float(actual_total),
+                'expected_count': expected_count,
+                'actual_count': actual_count,
+            })
+
+    if fix and mismatches:
+        db.session.execute(db.delete(MonthlySpend))
+        if expected:
+            db.session.execute(db.insert(MonthlySpend), [
+                {'month': month, 'main_type_id': main_type_id, 'total': total, 'count': count}
+                for (month, main_type_id), (total, count) in expected.items()
+            ])
+        db.session.commit()
+    return mismatches
@@ -5,6 +5,7 @@ class Channel(db.Model):
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False)
     
     def to_dict(self):
         return {
@@ -14,4 +15,4 @@ class Channel(db.Model):
 
 def get_all_channels():
     """获取所有渠道"""
-    return Channel.query.order_by(Channel.id).all()
+    return Channel.query.filter_by(is_deleted=False).order_by(Channel.id).all()
@@ -0,0 +1,71 @@
+"""统计类型下各渠道的单价排行：哪个渠道最便宜、最近一次买的价格是多少
+
+一条分组查询完成：内层用窗口函数取每个 (统计类型, 渠道) 最近一次购买的单价，
+外层按 (统计类型, 渠道) 分组求次数、最低价、均价和最后购买时间。
+分区与排序和索引 ix_consumption_sub_type_channel (sub_type_id, channel_id, create_time) 一致。
+"""
+from app import db
+from app.models.channel import Channel
+from app.models.consumption import Consumption
+from app.models.lookup import get_lookup_cache
+from app.models.sub_type import SubType
+
+def _ranking_rows(sub_type_id=None):
+    """按 (统计类型, 渠道) 分组的单价汇总，同一统计类型内按最低价、均价升序"""
+    price_type = Consumption.min_unit_price.type
+    # 参与排行的消费项与价格分布一致：未删除且单价大于0
+    filters = [Consumption.is_deleted == False, Consumption.min_unit_price > 0]
+    if sub_type_id is not None:
+        filters.append(Consumption.sub_type_id == sub_type_id)
+    else:
+        filters.append(Consumption.sub_type_id.isnot(None))
+
+    latest = db.func.first_value(Consumption.min_unit_price, type_=price_type).over(
+        partition_by=(Consumption.sub_type_id, Consumption.channel_id),
+        order_by=(Consumption.create_time.desc(), Consumption.id.desc())
+    )
+    ranked = db.session.query(
+        Consumption.sub_type_id,
+        Consumption.channel_id,
+        Consumption.min_unit_price,
+        Consumption.create_time,
+        latest.label('latest_price')
+    ).filter(*filters).subquery()
+
+    min_price = db.func.min(ranked.c.min_unit_price)
+    avg_price = db.func.avg(ranked.c.min_unit_price, type_=price_type)
+    return db.session.query(
+        ranked.c.sub_type_id,
+        ranked.c.channel_id,
+        db.func.count().label('count'),
+        min_price.label('min_price'),
+        avg_price.label('avg_price'),
+        db.func.max(ranked.c.latest_price).label('latest_price'),
+        db.func.max(ranked.c.create_time).label('last_purchase')
+    ).group_by(ranked.c.sub_type_id, ranked.c.channel_id).order_by(
+        ranked.c.sub_type_id, min_price, avg_price, ranked.c.channel_id
+    ).all()
+
+def _to_item(row, rank):
+    return {
+        'rank': rank,
+        'channel': get_lookup_cache().get_name(Channel, row.channel_id),
+        'count': row.count,
+        'min_price': round(float(row.min_price), 2),
+        'avg_price': round(float(row.avg_price), 2),
+        'latest_price': round(float(row.latest_price), 2),
+        'last_purchase_date': row.last_purchase.strftime('%Y-%m-%d'),
+    }
+
+def get_channel_ranking(sub_type_id):
+    """指定统计类型下各渠道的单价排行，第一名为最低价最低的渠道"""
+    return [_to_item(row, rank) for rank, row in enumerate(_ranking_rows(sub_type_id), 1)]
+
+def get_all_channel_rankings():
+    """全部统计类型的渠道单价排行，按统计类型名称分组"""
+    lookup_cache = get_lookup_cache()
+    rankings = {}
+    for row in _ranking_rows():
+        items = rankings.setdefault(lookup_cache.get_name(SubType, row.sub_type_id), [])
+        items.append(_to_item(row, len(items) + 1))
+    return rankings
@@ -1,56 +1,145 @@
 from app import db
+from app.models.channel import Channel
+from app.models.main_type import MainType
+from app.models.sub_type import SubType
+from app.models.data_version import CONSUMPTION_VERSION, bump_data_version
+from app.models.lookup import get_lookup_cache
+from app.models.money import Money
 from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
 
 class Consumption(db.Model):
     __tablename__ = 'consumption'
+    __table_args__ = (
+        # 按统计类型、渠道分组并取最近价格（渠道单价排行）
+        db.Index('ix_consumption_sub_type_channel', 'sub_type_id', 'channel_id', 'create_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     content = db.Column(db.String(255), nullable=False)
     quantity = db.Column(db.DECIMAL(10, 1), nullable=False)
-    total_price = db.Column(db.DECIMAL(10, 2), nullable=False)
-    channel = db.Column(db.String(50), nullable=False)
-    main_type = db.Column(db.String(50), nullable=False)
-    sub_type = db.Column(db.String(50))
+    total_price = db.Column(Money(10, 2), nullable=False)
+    channel_id = db.Column(db.Integer, db.ForeignKey('channels.id'), nullable=False, index=True)
+    main_type_id = db.Column(db.Integer, db.ForeignKey('main_types.id'), nullable=False, index=True)
+    sub_type_id = db.Column(db.Integer, db.ForeignKey('sub_types.id'), index=True)
     unit_coefficient = db.Column(db.DECIMAL(10, 1), nullable=False, default=1.0)
     receive_status = db.Column(db.String(20), nullable=False, default='已收货')
-    create_time = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    create_time = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
     statistical_status = db.Column(db.String(20), nullable=False, default='计入')
-    min_unit_price = db.Column(db.DECIMAL(10, 2), default=0.00)
+    min_unit_price = db.Column(Money(10, 2), default=0.00)
     tag = db.Column(db.String(20))
     evaluate = db.Column(db.Text)
     start_use_time = db.Column(db.Date)
     end_use_time = db.Column(db.Date)
-    daily_average_price = db.Column(db.DECIMAL(10, 2), default=0.00)
+    daily_average_price = db.Column(Money(10, 2), default=0.00)
     is_deleted = db.Column(db.Boolean, default=False)
     pickup_code = db.Column(db.String(50), nullable=True)
+    # 行版本号，每次修改递增；修改时带上读取到的版本号，被他人修改过则拒绝（乐观锁）
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # 新增时记下的加入前价格摘要（不入库），用于价格判断；摘要不可用时为None
+    price_history = None
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'content': self.content,
-            'quantity': float(self.quantity),
-            'total_price': float(self.total_price),
-            'channel': self.channel,
-            'main_type': self.main_type,
-            'sub_type': self.sub_type,
-            'unit_coefficient': float(self.unit_coefficient),
-            'receive_status': self.receive_status,
-            'create_time': self.create_time.strftime('%Y-%m-%d %H:%M:%S'),
-            'statistical_status': self.statistical_status,
-            'min_unit_price': float(self.min_unit_price),
-            'tag': self.tag,
-            'evaluate': self.evaluate,
-            'start_use_time': self.start_use_time.strftime('%Y-%m-%d') if self.start_use_time else None,
-            'end_use_time': self.end_use_time.strftime('%Y-%m-%d') if self.end_use_time else None,
-            'daily_average_price': float(self.daily_average_price),
-            'is_deleted': self.is_deleted,
-            'pickup_code': self.pickup_code
-        }
+    # 渠道、账单类型、统计类型以名称对外，通过字典缓存与外键互相转换
+    @property
+    def channel(self):
+        return get_lookup_cache().get_name(Channel, self.channel_id)
+    
+    @channel.setter
+    def channel(self, name):
+        self.channel_id = get_lookup_cache().get_or_create_id(Channel, name)
+    
+    @property
+    def main_type(self):
+        return get_lookup_cache().get_name(MainType, self.main_type_id)
+    
+    @main_type.setter
+    def main_type(self, name):
+        self.main_type_id = get_lookup_cache().get_or_create_id(MainType, name)
+    
+    @property
+    def sub_type(self):
+        return get_lookup_cache().get_name(SubType, self.sub_type_id)
+    
+    @sub_type.setter
+    def sub_type(self, name):
+        self.sub_type_id = get_lookup_cache().get_or_create_id(SubType, name)
+    
+    def to_dict(self, fields=None):
+        return consumption_dict(self, fields)
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d')
+
+# 消费项对外的字段：字段名 → (读取的列, 序列化函数)；同时是 fields 参数允许的字段；空值不经序列化直接返回None
+CONSUMPTION_FIELDS = {
+    'id': ('id', None),
+    'content': ('content', None),
+    'quantity': ('quantity', float),
+    'total_price': ('total_price', float),
+    'channel': ('channel_id', lambda value: get_lookup_cache().get_name(Channel, value)),
+    'main_type': ('main_type_id', lambda value: get_lookup_cache().get_name(MainType, value)),
+    'sub_type': ('sub_type_id', lambda value: get_lookup_cache().get_name(SubType, value)),
+    'unit_coefficient': ('unit_coefficient', float),
+    'receive_status': ('receive_status', None),
+    'create_time': ('create_time', lambda value: value.strftime('%Y-%m-%d %H:%M:%S')),
+    'statistical_status': ('statistical_status', None),
+    'min_unit_price': ('min_unit_price', float),
+    'tag': ('tag', None),
+    'evaluate': ('evaluate', None),
+    'start_use_time': ('start_use_time', _format_date),
+    'end_use_time': ('end_use_time', _format_date),
+    'daily_average_price': ('daily_average_price', float),
+    'is_deleted': ('is_deleted', None),
+    'pickup_code': ('pickup_code', None),
+    'version': ('version', None),
+}
+
+@lru_cache(maxsize=64)
+def _serializer(fields):
+    """按字段组合预先生成 (一次读取全部列的函数, [(字段名, 序列化函数)])"""
+    columns = [CONSUMPTION_FIELDS[name][0] for name in fields]
+    getter = attrgetter(*columns) if len(columns) > 1 else (lambda source: (getattr(source, columns[0]),))
+    return getter, [(name, CONSUMPTION_FIELDS[name][1]) for name in fields]
+
+def consumption_dict(source, fields=None):
+    """把消费项（ORM对象或只含所需列的查询行）序列化为字典，fields 为 None 时包含全部字段"""
+    getter, serializers = _serializer(tuple(fields or CONSUMPTION_FIELDS))
+    return {
+        name: serialize(value) if serialize and value is not None else value
+        for (name, serialize), value in zip(serializers, getter(source))
+    }
+
+def parse_fields(value):
+    """解析逗号分隔的 fields 参数，未传时返回None（全部字段）；含不支持的字段时抛出 ValueError"""
+    if value is None:
+        return None
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in CONSUMPTION_FIELDS]
+    if not fields or unknown:
+        raise ValueError(f'不支持的字段: {", ".join(unknown) or value}，可用: {", ".join(CONSUMPTION_FIELDS)}')
+    return fields
+
+def fetch_consumption_dicts(query, fields=None):
+    """执行消费项查询并序列化；指定 fields 时 SELECT 只包含这些字段读取的列，不加载整行"""
+    if fields is None:
+        return [item.to_dict() for item in query.all()]
+    columns = dict.fromkeys(CONSUMPTION_FIELDS[name][0] for name in fields)
+    rows = query.with_entities(*(getattr(Consumption, column) for column in columns)).all()
+    return [consumption_dict(row, fields) for row in rows]
 
 def get_pending_count():
     """获取待收货数量"""
     return Consumption.query.filter_by(receive_status='待收货', is_deleted=False).count()
 
-def get_pending_consumption():
-    """获取待收货列表"""
-    return Consumption.query.filter_by(receive_status='待收货', is_deleted=False).order_by(Consumption.create_time.desc()).all()
+# 待收货页面用到的字段
+PENDING_PAGE_FIELDS = ('id', 'content', 'total_price', 'channel', 'create_time', 'pickup_code')
+
+def get_pending_consumption(fields=None):
+    """获取待收货列表（序列化后的字典）"""
+    query = Consumption.query.filter_by(receive_status='待收货', is_deleted=False).order_by(Consumption.create_time.desc())
+    return fetch_consumption_dicts(query, fields)
+
+def mark_consumption_changed():
+    """在当前事务中递增消费项数据版本，使依赖消费项的结果缓存失效"""
+    bump_data_version(CONSUMPTION_VERSION)
@@ -0,0 +1,91 @@
+"""首页概览：本期合计、环比、账单类型分布、渠道/统计类型排行、待收货数量
+
+所有指标由一条分组查询完成：按 (账单类型, 渠道, 统计类型) 分组，
+用条件聚合同时求本期和上期金额，待收货数量以标量子查询附带返回，
+再在内存中把少量分组行汇总为各维度。
+"""
+from app import db
+from app.models.consumption import Consumption
+from app.models.channel import Channel
+from app.models.main_type import MainType
+from app.models.sub_type import SubType
+from app.models.lookup import get_lookup_cache
+from datetime import datetime, timedelta
+
+# 排行榜条数
+TOP_COUNT = 5
+
+def _top(totals, model):
+    lookup_cache = get_lookup_cache()
+    ranked = sorted(((id, total) for id, total in totals.items() if id is not None and total > 0),
+                    key=lambda item: item[1], reverse=True)
+    return [{'name': lookup_cache.get_name(model, id), 'total': round(total, 2)} for id, total in ranked[:TOP_COUNT]]
+
+def get_dashboard(start, end):
+    """计算 [start, end]（date，含首尾）的概览，上期为紧接在 start 之前、天数相同的区间"""
+    previous_end = start - timedelta(days=1)
+    previous_start = previous_end - (end - start)
+    current_from = datetime.combine(start, datetime.min.time())
+    current_to = datetime.combine(end, datetime.max.time())
+    previous_from = datetime.combine(previous_start, datetime.min.time())
+    previous_to = datetime.combine(previous_end, datetime.max.time())
+
+    in_current = Consumption.create_time >= current_from
+    in_previous = Consumption.create_time.between(previous_from, previous_to)
+    pending_count = db.session.query(db.func.count(Consumption.id)).filter(
+        Consumption.receive_status == '待收货',
+        Consumption.is_deleted == False
+    ).scalar_subquery()
+
+    rows = db.session.query(
+        Consumption.main_type_id,
+        Consumption.channel_id,
+        Consumption.sub_type_id,
+        db.func.sum(db.case((in_current, Consumption.total_price), else_=0)).label('current_total'),
+        db.func.sum(db.case((in_previous, Consumption.total_price), else_=0)).label('previous_total'),
+        db.func.sum(db.case((in_current, 1), else_=0)).label('current_count'),
+        pending_count.label('pending_count')
+    ).filter(
+        Consumption.create_time.between(previous_from, current_to),
+        Consumption.receive_status == '已收货',
+        Consumption.is_deleted == False
+    ).group_by(
+        Consumption.main_type_id,
+        Consumption.channel_id,
+        Consumption.sub_type_id
+    ).all()
+
+    # 区间内没有消费项时没有分组行，待收货数量单独查询
+    pending = rows[0].pending_count if rows else db.session.query(pending_count).scalar()
+
+    total = previous_total = 0.0
+    count = 0
+    by_main_type, by_channel, by_sub_type = {}, {}, {}
+    for row in rows:
+        current = float(row.current_total or 0)
+        total += current
+        previous_total += float(row.previous_total or 0)
+        count += int(row.current_count or 0)
+        by_main_type[row.main_type_id] = by_main_type.get(row.main_type_id, 0.0) + current
+        by_channel[row.channel_id] = by_channel.get(row.channel_id, 0.0) + current
+        by_sub_type[row.sub_type_id] = by_sub_type.get(row.sub_type_id, 0.0) + current
+
+    lookup_cache = get_lookup_cache()
+    distribution = [(lookup_cache.get_name(MainType, id), round(value, 2)) for id, value in by_main_type.items() if value > 0]
+    delta = total - previous_total
+    return {
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': end.strftime('%Y-%m-%d'),
+        'previous_start_date': previous_start.strftime('%Y-%m-%d'),
+        'previous_end_date': previous_end.strftime('%Y-%m-%d'),
+        'total': round(total, 2),
+        'count': count,
+        'previous_total': round(previous_total, 2),
+        'delta': round(delta, 2),
+        'delta_ratio': round(delta / previous_total, 4) if previous_total else None,
+        'categories': [name for name, _ in distribution],
+        'values': [value for _, value in distribution],
+        'top_channels': _top(by_channel, Channel),
+        'top_sub_types': _top(by_sub_type, SubType),
+        'pending_count': int(pending or 0)
+    }
@@ -0,0 +1,60 @@
+from app import db
+from sqlalchemy import event, insert
+import os
+import threading
+
+# 数据版本名称：字典表（渠道、账单类型、统计类型）
+LOOKUP_VERSION = 'lookup'
+# 数据版本名称：消费项及其使用记录
+CONSUMPTION_VERSION = 'consumption'
+DATA_VERSION_NAMES = (LOOKUP_VERSION, CONSUMPTION_VERSION)
+
+# 每个数据版本拆分为多行计数，版本号为各行之和。
+# 写事务只递增其中一行并持有该行的锁直到提交，并发写入大多落在不同行上，不会全部排队等待同一行
+DATA_VERSION_SHARDS = 8
+
+class DataVersion(db.Model):
+    """数据版本号，写操作在同一事务中递增，缓存以版本号作为键的一部分，无需扫描即可失效"""
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def shard_names(name):
+    """数据版本的各计数行名称（第一行沿用版本名称本身）"""
+    return [name] + [f'{name}#{i}' for i in range(1, DATA_VERSION_SHARDS)]
+
+def seed_rows():
+    """所有数据版本计数行的初始值，建表或迁移时预先写入，递增时无需插入"""
+    return [{'name': shard, 'version': 0} for name in DATA_VERSION_NAMES for shard in shard_names(name)]
+
+@event.listens_for(DataVersion.__table__, 'after_create')
+def _seed_data_versions(table, connection, **kwargs):
+    connection.execute(insert(table), seed_rows())
+
+def get_data_versions(*names):
+    """一次查询获取多个数据版本号，返回 {名称: 版本号}，不存在时为0"""
+    shards = {shard: name for name in names for shard in shard_names(name)}
+    versions = dict.fromkeys(names, 0)
+    rows = db.session.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(shards))
+    for shard, version in rows:
+        versions[shards[shard]] += version
+    return versions
+
+def get_data_version(name):
+    """获取数据版本号，不存在时为0"""
+    return get_data_versions(name)[name]
+
+def bump_data_version(name):
+    """在当前事务中递增数据版本号（按进程和线程选择其中一行计数）"""
+    shard = shard_names(name)[hash((os.getpid(), threading.get_ident())) % DATA_VERSION_SHARDS]
+    result = db.session.execute(
+        db.update(DataVersion)
+        .where(DataVersion.name == shard)
+        .values(version=DataVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # 未执行 data_versions 迁移的旧数据库
+        db.session.add(DataVersion(name=shard, version=1))
+        db.session.flush()
@@ -0,0 +1,44 @@
+from app import db
+from datetime import datetime
+import json
+
+# 任务状态
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+JOB_FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_type = db.Column(db.String(50), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default=JOB_PENDING, index=True)
+    params = db.Column(db.Text)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    create_time = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    start_time = db.Column(db.DateTime)
+    finish_time = db.Column(db.DateTime)
+    # 执行任务的进程（主机名:进程号）和最近一次心跳时间，心跳超时的运行中任务视为已中断
+    owner = db.Column(db.String(100))
+    heartbeat = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'params': json.loads(self.params) if self.params else {},
+            'progress': round(self.progress, 4),
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'create_time': self.create_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'start_time': self.start_time.strftime('%Y-%m-%d %H:%M:%S') if self.start_time else None,
+            'finish_time': self.finish_time.strftime('%Y-%m-%d %H:%M:%S') if self.finish_time else None
+        }
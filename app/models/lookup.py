@@ -0,0 +1,132 @@
+from app import db
+from app.models.data_version import LOOKUP_VERSION, bump_data_version, get_data_version
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import threading
+
+# session.info 中的键：当前事务是否修改了字典表（尚未提交）
+_DIRTY_KEY = 'lookup_dirty'
+# session.info 中的键：当前事务中新建、尚未提交的字典项 {表名: {名称: ID}}
+_PENDING_KEY = 'lookup_pending'
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _clear_uncommitted(session):
+    session.info.pop(_DIRTY_KEY, None)
+    session.info.pop(_PENDING_KEY, None)
+
+class LookupCache:
+    """名称与ID的映射缓存（渠道、账单类型、统计类型共用）
+
+    consumption表只保存整数外键，接口层仍按名称读写，
+    名称解析统一走这里的内存映射，避免每行都回表或JOIN。
+    任何对字典表的写操作都应调用 invalidate()，同时递增 version。
+    - 缓存只保存已提交的数据：修改过字典表、尚未提交的事务中加载的映射不写入缓存，
+      事务中新建的字典项记在 session.info 中，只对本事务可见
+    - 未命中时只在字典表数据版本变化（其他进程修改过字典表）时重新加载，每个版本最多加载一次
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {表名: (名称->ID, ID->名称, 加载时的字典表数据版本)}
+        self._maps = {}
+        self.version = 0
+
+    def _load(self, model):
+        """从数据库加载某张字典表的完整映射"""
+        data_version = get_data_version(LOOKUP_VERSION)
+        rows = db.session.query(model.id, model.name).all()
+        maps = ({row.name: row.id for row in rows}, {row.id: row.name for row in rows}, data_version)
+        if not db.session.info.get(_DIRTY_KEY):
+            with self._lock:
+                self._maps[model.__tablename__] = maps
+        return maps
+
+    def _get_maps(self, model):
+        maps = self._maps.get(model.__tablename__)
+        if maps is None:
+            maps = self._load(model)
+        return maps
+
+    def _reload_if_changed(self, model, maps):
+        """未命中时：字典表数据版本与加载时相同则不重新加载（结果确实不存在）"""
+        if maps[2] == get_data_version(LOOKUP_VERSION):
+            return maps
+        return self._load(model)
+
+    @staticmethod
+    def _pending(model):
+        return db.session.info.get(_PENDING_KEY, {}).get(model.__tablename__, {})
+
+    def get_id(self, model, name):
+        """按名称获取ID，不存在时返回None"""
+        if name is None:
+            return None
+        maps = self._get_maps(model)
+        id = maps[0].get(name)
+        if id is None:
+            id = self._pending(model).get(name)
+        if id is None:
+            # 可能是其他进程新增的名称
+            id = self._reload_if_changed(model, maps)[0].get(name)
+        return id
+
+    def get_name(self, model, id):
+        """按ID获取名称，不存在时返回None"""
+        if id is None:
+            return None
+        maps = self._get_maps(model)
+        name = maps[1].get(id)
+        if name is None:
+            name = next((name for name, pending_id in self._pending(model).items() if pending_id == id), None)
+        if name is None:
+            name = self._reload_if_changed(model, maps)[1].get(id)
+        return name
+
+    def get_or_create_id(self, model, name):
+        """按名称获取ID，不存在时在当前事务中创建字典项"""
+        if name is None:
+            return None
+        id = self.get_id(model, name)
+        if id is not None:
+            return id
+        item = model(name=name)
+        db.session.add(item)
+        db.session.flush()
+        mark_lookups_changed()
+        # 新行尚未提交，不写入缓存，只在本事务中可见；提交后数据版本变化，下次未命中时重新加载
+        db.session.info.setdefault(_PENDING_KEY, {}).setdefault(model.__tablename__, {})[name] = item.id
+        return item.id
+
+    def invalidate(self, model=None):
+        """清除缓存并递增版本号"""
+        with self._lock:
+            if model is None:
+                self._maps.clear()
+            else:
+                self._maps.pop(model.__tablename__, None)
+            self.version += 1
+
+def mark_lookups_changed():
+    """在当前事务中递增字典表数据版本，使依赖字典表的页面片段缓存失效"""
+    bump_data_version(LOOKUP_VERSION)
+    db.session.info[_DIRTY_KEY] = True
+
+def get_lookup_cache():
+    """获取当前应用的字典缓存（每个应用实例一份）"""
+    return current_app.extensions.setdefault('lookup_cache', LookupCache())
+
+def is_lookup_in_use(column, id):
+    """判断字典项是否仍被消费项引用"""
+    from app.models.consumption import Consumption
+    return db.session.query(Consumption.id).filter(column == id).first() is not None
+
+def delete_lookup(item, column):
+    """删除字典项：仍被引用时仅标记删除，保证历史消费项的名称不丢失"""
+    if is_lookup_in_use(column, item.id):
+        item.is_deleted = True
+    else:
+        db.session.delete(item)
+    mark_lookups_changed()
+    get_lookup_cache().invalidate(type(item))
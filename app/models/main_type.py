@@ -5,6 +5,7 @@ class MainType(db.Model):
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False)
     
     def to_dict(self):
         return {
@@ -14,4 +15,4 @@ class MainType(db.Model):
 
 def get_all_main_types():
     """获取所有账单类型"""
-    return MainType.query.order_by(MainType.id).all()
+    return MainType.query.filter_by(is_deleted=False).order_by(MainType.id).all()
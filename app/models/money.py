@@ -0,0 +1,88 @@
+"""金额列的存储方式
+
+默认以 DECIMAL 存储；设置环境变量 MONEY_STORAGE=cents 后以整数最小单位（分）存储，
+SQL 中的求和等聚合全部是精确的整数运算，只在读取结果时转换一次为 Decimal。
+切换存储方式前需先执行对应迁移（flask ledger migrate money_cents / money_decimal）。
+"""
+from app import db
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import inspect
+from sqlalchemy.sql import operators
+from sqlalchemy.types import TypeDecorator
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MONEY_DECIMAL = 'decimal'
+MONEY_CENTS = 'cents'
+MONEY_STORAGE = os.getenv('MONEY_STORAGE', MONEY_DECIMAL)
+
+# 金额小数位数（整数存储时即最小单位的位数）
+MONEY_SCALE = 2
+
+# 与普通数值做算术运算时，另一侧按普通数值绑定，不做最小单位换算
+_ARITHMETIC_OPERATORS = (operators.mul, operators.truediv, operators.floordiv, operators.add, operators.sub)
+
+class Money(TypeDecorator):
+    """金额类型：Python 侧始终为 Decimal，数据库侧按存储方式为 DECIMAL 或整数最小单位"""
+    impl = db.Numeric
+    cache_ok = True
+
+    def __init__(self, precision=10, scale=MONEY_SCALE, storage=None):
+        self.precision = precision
+        self.scale = scale
+        self.storage = storage or MONEY_STORAGE
+        super().__init__()
+
+    @property
+    def is_minor_units(self):
+        return self.storage == MONEY_CENTS
+
+    @property
+    def python_type(self):
+        return Decimal
+
+    def load_dialect_impl(self, dialect):
+        if self.is_minor_units:
+            return dialect.type_descriptor(db.BigInteger())
+        return dialect.type_descriptor(db.Numeric(self.precision, self.scale))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not self.is_minor_units:
+            return value
+        return int((Decimal(str(value)).scaleb(self.scale)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+    def process_result_value(self, value, dialect):
+        if value is None or not self.is_minor_units:
+            return value
+        # 聚合函数（如AVG）可能返回小数
+        return (Decimal(value) if isinstance(value, int) else Decimal(str(value))).scaleb(-self.scale)
+
+    def coerce_compared_value(self, op, value):
+        if op in _ARITHMETIC_OPERATORS:
+            return db.Numeric()
+        return self
+
+def money_round(expression, money_type):
+    """把以存储单位计算的表达式按存储方式取整：DECIMAL 保留小数位，整数存储取整到最小单位"""
+    from sqlalchemy import cast, func, type_coerce
+
+    if money_type.is_minor_units:
+        return type_coerce(cast(func.round(expression), db.BigInteger), money_type)
+    return type_coerce(func.round(expression, money_type.scale), money_type)
+
+def verify_money_storage():
+    """启动时检查数据库中的金额列类型与配置的存储方式是否一致"""
+    from app.models.consumption import Consumption
+
+    columns = {c['name']: c['type'] for c in inspect(db.engine).get_columns(Consumption.__tablename__)}
+    column_type = columns.get('total_price')
+    if column_type is None:
+        return
+    stored_as_integer = isinstance(column_type, db.Integer)
+    if stored_as_integer != (MONEY_STORAGE == MONEY_CENTS):
+        logger.warning(
+            f'金额存储方式不一致：配置为 {MONEY_STORAGE}，数据库列类型为 {column_type}，'
+            f'请执行 flask ledger migrate {"money_cents" if MONEY_STORAGE == MONEY_CENTS else "money_decimal"}'
+        )
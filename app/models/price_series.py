@@ -0,0 +1,97 @@
+"""统计类型的单价走势：窗口函数计算滚动均价/最低价，LTTB降采样"""
+from app import db
+from app.models.consumption import Consumption
+from app.models.sql_functions import day_number
+
+# 滚动窗口类型：按购买次数、按天数
+WINDOW_TYPES = ('purchases', 'days')
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的下标
+
+    参数：
+        points: [(x, y), ...]，x 单调递增
+        threshold: 目标点数（至少3，不足时原样返回）
+    """
+    size = len(points)
+    if threshold >= size or threshold < 3:
+        return list(range(size))
+
+    selected = [0]
+    bucket_size = (size - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的平均点
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, size)
+        next_bucket = points[next_start:next_end]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        # 当前桶中与上一个选中点、下一个桶平均点构成最大三角形的点
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = points[a]
+        max_area = -1.0
+        max_index = start
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                max_index = j
+        selected.append(max_index)
+        a = max_index
+
+    selected.append(size - 1)
+    return selected
+
+def get_price_series(sub_type_id, start=None, end=None, window=5, window_type='purchases', points=None):
+    """查询统计类型的单价序列及滚动均价、滚动最低价
+
+    窗口在 end 之前的全部历史上计算，start 只裁剪输出，保证区间开头的滚动值不失真。
+    """
+    if window_type == 'purchases':
+        over = {'order_by': (Consumption.create_time, Consumption.id), 'rows': (-(window - 1), 0)}
+    else:
+        over = {'order_by': day_number(Consumption.create_time), 'range_': (-window, 0)}
+
+    filters = [
+        Consumption.sub_type_id == sub_type_id,
+        Consumption.receive_status == '已收货',
+        Consumption.is_deleted == False
+    ]
+    if end:
+        filters.append(Consumption.create_time <= end)
+
+    windowed = db.session.query(
+        Consumption.id,
+        Consumption.create_time,
+        Consumption.min_unit_price,
+        db.func.avg(Consumption.min_unit_price, type_=Consumption.min_unit_price.type).over(**over).label('rolling_avg'),
+        db.func.min(Consumption.min_unit_price).over(**over).label('rolling_min')
+    ).filter(*filters).subquery()
+
+    query = db.session.query(windowed)
+    if start:
+        query = query.filter(windowed.c.create_time >= start)
+    rows = query.order_by(windowed.c.create_time, windowed.c.id).all()
+
+    total = len(rows)
+    if points:
+        indexes = lttb([(row.create_time.timestamp(), float(row.min_unit_price or 0)) for row in rows], points)
+        rows = [rows[i] for i in indexes]
+
+    return {
+        'count': total,
+        'points': [
+            {
+                'id': row.id,
+                'create_time': row.create_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'min_unit_price': float(row.min_unit_price or 0),
+                'rolling_avg': round(float(row.rolling_avg or 0), 2),
+                'rolling_min': float(row.rolling_min or 0)
+            }
+            for row in rows
+        ]
+    }
@@ -0,0 +1,285 @@
+"""统计类型的最小单位单价分布：按统计类型持久化的 t-digest 分位数摘要
+
+新增消费项时增量加入摘要，并据此判断本次价格在历史中的位置，无需每次查询百分位数；
+修改、删除、批量重算会改变历史价格，这些操作把对应摘要标记为过期，下次读取时按表重建。
+
+并发约定（不依赖数据库锁）：
+- version 在每次变更时递增，built_version 为摘要数据对应的版本，两者不等即为过期
+- 增量加入和重建都以 version 作为条件 UPDATE，期间有其他写入时放弃保存，摘要保持过期
+"""
+from app import db
+from app.models.consumption import Consumption
+from bisect import bisect_right
+from sqlalchemy.exc import IntegrityError
+import json
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# t-digest 压缩参数：越大越精确，质心数约为其 1~2 倍
+COMPRESSION = 100
+# 未合并的新增值达到此数量时压缩
+BUFFER_SIZE = 50
+
+# 价格判定阈值（分位数）
+LOW_QUANTILE = 0.1
+HIGH_QUANTILE = 0.9
+
+class TDigest:
+    """合并式 t-digest（k1 尺度函数），可合并、可序列化"""
+
+    def __init__(self, compression=COMPRESSION, centroids=None, min=None, max=None):
+        self.compression = compression
+        self.centroids = [list(c) for c in centroids or []]
+        self.min = min
+        self.max = max
+        self._buffer = []
+
+    @property
+    def count(self):
+        return sum(c[1] for c in self.centroids) + len(self._buffer)
+
+    def add(self, value, weight=1):
+        value = float(value)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._buffer.append([value, weight])
+        if len(self._buffer) >= BUFFER_SIZE:
+            self.compress()
+
+    def merge(self, other):
+        """合并另一个摘要"""
+        other.compress()
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._buffer.extend(list(c) for c in other.centroids)
+        self.compress()
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q_limit(self, q):
+        k = self._k(q) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def compress(self):
+        if not self._buffer:
+            return
+        items = sorted(self.centroids + self._buffer, key=lambda c: c[0])
+        self._buffer = []
+        total = sum(c[1] for c in items)
+        merged = [list(items[0])]
+        cumulative = 0
+        limit = self._q_limit(0)
+        for mean, weight in items[1:]:
+            current = merged[-1]
+            if (cumulative + current[1] + weight) / total <= limit:
+                current[0] += (mean - current[0]) * weight / (current[1] + weight)
+                current[1] += weight
+            else:
+                cumulative += current[1]
+                limit = self._q_limit(cumulative / total)
+                merged.append([mean, weight])
+        self.centroids = merged
+
+    def _centers(self):
+        """各质心中心点的累计权重"""
+        self.compress()
+        centers = []
+        cumulative = 0
+        for mean, weight in self.centroids:
+            centers.append(cumulative + weight / 2)
+            cumulative += weight
+        return centers, cumulative
+
+    def quantile(self, q):
+        """分位数 q（0~1）对应的值，空摘要返回 None"""
+        centers, total = self._centers()
+        if not total:
+            return None
+        target = q * total
+        # 两端在最小值/最大值与第一个/最后一个质心中心之间插值
+        points = [(0, self.min)] + [(center, c[0]) for center, c in zip(centers, self.centroids)] + [(total, self.max)]
+        index = bisect_right([p[0] for p in points], target)
+        if index >= len(points):
+            return self.max
+        (x0, y0), (x1, y1) = points[index - 1], points[index]
+        return y0 if x1 == x0 else y0 + (y1 - y0) * (target - x0) / (x1 - x0)
+
+    def cdf(self, value):
+        """不超过 value 的近似比例（0~1），按质心中心线性插值，空摘要返回 None
+
+        与质心均值相等时计入这些质心的全部权重，历史价格全部相同或有并列时不会低估。
+        """
+        centers, total = self._centers()
+        if not total:
+            return None
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        equal = [i for i, c in enumerate(self.centroids) if c[0] == value]
+        if equal:
+            below = centers[equal[-1]] + self.centroids[equal[-1]][1] / 2
+            return min(below / total, 1.0)
+        points = [(self.min, 0)] + [(c[0], center) for center, c in zip(centers, self.centroids)] + [(self.max, total)]
+        below = 0.0
+        for (x0, w0), (x1, w1) in zip(points, points[1:]):
+            if x0 <= value < x1:
+                below = w0 + (w1 - w0) * (value - x0) / (x1 - x0)
+                break
+        return min(max(below / total, 0.0), 1.0)
+
+    def to_json(self):
+        self.compress()
+        return json.dumps({
+            'compression': self.compression,
+            'min': self.min,
+            'max': self.max,
+            'centroids': [[round(mean, 6), weight] for mean, weight in self.centroids],
+        }, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, data):
+        data = json.loads(data)
+        return cls(data['compression'], data['centroids'], data['min'], data['max'])
+
+class PriceSketch(db.Model):
+    """统计类型的最小单位单价摘要"""
+    __tablename__ = 'price_sketches'
+
+    sub_type_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    built_version = db.Column(db.Integer, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.Text)
+
+def _history_filters(sub_type_id):
+    """参与价格分布的消费项：该统计类型下未删除且单价大于0"""
+    return (
+        Consumption.sub_type_id == sub_type_id,
+        Consumption.is_deleted == False,
+        Consumption.min_unit_price > 0,
+    )
+
+def mark_price_sketches_stale(sub_type_ids=None):
+    """在当前事务中把摘要标记为过期；sub_type_ids 可为ID列表或子查询，None 表示全部"""
+    statement = db.update(PriceSketch).values(version=PriceSketch.version + 1)
+    if sub_type_ids is not None:
+        statement = statement.where(PriceSketch.sub_type_id.in_(sub_type_ids))
+    db.session.execute(statement.execution_options(synchronize_session=False))
+
+def consumption_sub_type_ids(ids):
+    """指定消费项的统计类型ID子查询"""
+    return db.select(Consumption.sub_type_id).where(Consumption.id.in_(ids)).scalar_subquery()
+
+def rebuild_price_sketch(sub_type_id, exclude=None):
+    """按表重建摘要并保存（会提交当前事务；期间有其他写入时不保存），返回摘要
+
+    exclude: 刚新增的消费项，返回不含它的摘要（新增前的历史），保存的摘要仍包含它
+    """
+    if db.session.get(PriceSketch, sub_type_id) is None:
+        db.session.add(PriceSketch(sub_type_id=sub_type_id))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # 其他请求同时建立了摘要
+            db.session.rollback()
+
+    # 先读版本号再读价格：之后提交的新增会递增版本号，使本次保存落空
+    version = db.session.query(PriceSketch.version).filter(PriceSketch.sub_type_id == sub_type_id).scalar()
+    digest = TDigest()
+    prices = db.session.query(Consumption.min_unit_price).filter(*_history_filters(sub_type_id))
+    if exclude is not None:
+        prices = prices.filter(Consumption.id != exclude.id)
+    for (price,) in prices.yield_per(10000):
+        digest.add(price)
+    history = digest
+    if exclude is not None:
+        history = TDigest.from_json(digest.to_json())
+        if float(exclude.min_unit_price or 0) > 0:
+            digest.add(exclude.min_unit_price)
+
+    result = db.session.execute(
+        db.update(PriceSketch)
+        .where(PriceSketch.sub_type_id == sub_type_id, PriceSketch.version == version)
+        .values(built_version=version, count=digest.count, data=digest.to_json())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if result.rowcount == 0:
+        logger.info(f'价格摘要重建期间有新写入，保持过期，统计类型ID: {sub_type_id}')
+    return history
+
+def get_price_sketch(sub_type_id):
+    """获取统计类型的价格摘要，过期或不存在时重建"""
+    sketch = db.session.get(PriceSketch, sub_type_id, populate_existing=True)
+    if sketch is not None and sketch.built_version == sketch.version and sketch.data:
+        return TDigest.from_json(sketch.data)
+    return rebuild_price_sketch(sub_type_id)
+
+def record_price(consumption):
+    """新增消费项时在当前事务中把单价加入摘要（须在 flush 之后、提交之前调用）
+
+    返回加入前的摘要（新增前的历史，用于价格判断）；摘要不存在或已过期时返回None
+    """
+    price = float(consumption.min_unit_price or 0)
+    if consumption.sub_type_id is None or price <= 0:
+        return None
+    sketch = db.session.get(PriceSketch, consumption.sub_type_id)
+    if sketch is None:
+        # 尚未建立摘要，首次读取时按表重建即可包含本条
+        return None
+    if sketch.built_version != sketch.version or not sketch.data:
+        mark_price_sketches_stale([consumption.sub_type_id])
+        return None
+
+    history = TDigest.from_json(sketch.data)
+    digest = TDigest.from_json(sketch.data)
+    digest.add(price)
+    result = db.session.execute(
+        db.update(PriceSketch)
+        .where(PriceSketch.sub_type_id == sketch.sub_type_id, PriceSketch.version == sketch.version)
+        .values(version=sketch.version + 1, built_version=sketch.version + 1,
+                count=digest.count, data=digest.to_json())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        mark_price_sketches_stale([consumption.sub_type_id])
+    return history
+
+def price_verdict(digest, price):
+    """价格在历史中的位置：比多少比例的历史购买便宜，以及是否偏贵/偏便宜；没有历史时返回None"""
+    if digest.count == 0:
+        return None
+    cheaper_than = round((1 - digest.cdf(price)) * 100, 1)
+    low = digest.quantile(LOW_QUANTILE)
+    high = digest.quantile(HIGH_QUANTILE)
+    if price > high:
+        verdict, message = 'high', f'高于历史P90（{high:.2f}），买贵了'
+    elif price < low:
+        verdict, message = 'low', f'低于历史P10（{low:.2f}），很划算'
+    else:
+        verdict, message = 'normal', f'比 {cheaper_than:.0f}% 的历史购买便宜'
+    return {
+        'verdict': verdict,
+        'message': message,
+        'cheaper_than': cheaper_than,
+        'history_count': digest.count,
+        'p10': round(low, 2),
+        'p50': round(digest.quantile(0.5), 2),
+        'p90': round(high, 2),
+    }
+
+def summarize_quantiles(digest, quantiles=(0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)):
+    """摘要的样本数、最值和常用分位数"""
+    return {
+        'count': digest.count,
+        'min': digest.min,
+        'max': digest.max,
+        'quantiles': {f'p{round(q * 100):g}': round(digest.quantile(q), 4) for q in quantiles} if digest.count else {},
+    }
@@ -0,0 +1,195 @@
+"""派生价格字段（最小单位单价、日均价格）的统一计算公式
+
+公式只在这里以SQL表达式定义一次：
+- 写入路径：把当前值作为绑定参数代入公式，由数据库计算后写入
+- 批量路径：把列代入同一公式，执行集合式 UPDATE
+- 修改路径：修改的字段代入新值、其余代入列，与其他字段在同一条 UPDATE 中计算
+"""
+from app import db
+from app.models.sql_functions import days_between
+from app.models.money import money_round
+from sqlalchemy import case, func, literal, or_, type_coerce
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _price_type():
+    """派生价格列的金额类型（决定按DECIMAL还是整数最小单位计算）"""
+    from app.models.consumption import Consumption
+
+    return Consumption.min_unit_price.type
+
+def min_unit_price_expr(total_price, quantity, unit_coefficient):
+    """最小单位单价 = 总价 ÷（数量 × 换算系数），除数为0时为0
+
+    乘以1.0避免SQLite对整数存储的值做整除；金额按存储单位计算，整数存储时取整到分
+    """
+    price_type = _price_type()
+    divisor = quantity * unit_coefficient
+    return type_coerce(case(
+        (divisor == 0, 0),
+        else_=money_round(total_price * 1.0 / divisor, price_type)
+    ), price_type)
+
+def daily_average_price_expr(total_price, start_use_time, end_use_time):
+    """日均价格 = 总价 ÷ 使用天数（含首尾两天），未填写使用时间或天数不合法时为0"""
+    price_type = _price_type()
+    days = days_between(start_use_time, end_use_time) + 1
+    return type_coerce(case(
+        (or_(start_use_time.is_(None), end_use_time.is_(None)), 0),
+        (days <= 0, 0),
+        else_=money_round(total_price * 1.0 / days, price_type)
+    ), price_type)
+
+def derived_price_columns():
+    """以列为参数的派生价格表达式，用于批量重算"""
+    from app.models.consumption import Consumption
+
+    return {
+        'min_unit_price': min_unit_price_expr(
+            Consumption.total_price, Consumption.quantity, Consumption.unit_coefficient
+        ),
+        'daily_average_price': daily_average_price_expr(
+            Consumption.total_price, Consumption.start_use_time, Consumption.end_use_time
+        ),
+    }
+
+def derived_price_updates(values):
+    """单条 UPDATE 中的派生价格表达式：本次修改的字段代入新值，未修改的字段取列的当前值"""
+    from app.models.consumption import Consumption
+
+    def operand(name, type_):
+        if name in values:
+            return literal(values[name], type_)
+        return getattr(Consumption, name)
+
+    total_price = operand('total_price', Consumption.total_price.type)
+    return {
+        'min_unit_price': min_unit_price_expr(
+            total_price,
+            operand('quantity', db.Numeric(10, 1)),
+            operand('unit_coefficient', db.Numeric(10, 1))
+        ),
+        'daily_average_price': daily_average_price_expr(
+            total_price,
+            operand('start_use_time', db.Date()),
+            operand('end_use_time', db.Date())
+        ),
+    }
+
+def apply_derived_prices(consumption):
+    """按消费项当前的字段值设置派生价格，在flush时由数据库计算"""
+    from app.models.consumption import Consumption
+
+    total_price = literal(consumption.total_price, Consumption.total_price.type)
+    consumption.min_unit_price = min_unit_price_expr(
+        total_price,
+        literal(consumption.quantity, db.Numeric(10, 1)),
+        literal(consumption.unit_coefficient, db.Numeric(10, 1))
+    )
+    consumption.daily_average_price = daily_average_price_expr(
+        total_price,
+        literal(consumption.start_use_time, db.Date()),
+        literal(consumption.end_use_time, db.Date())
+    )
+
+def _drift_condition(expressions):
+    """存储值与公式计算值不一致的条件"""
+    from app.models.consumption import Consumption
+
+    conditions = []
+    for column_name, expression in expressions.items():
+        column = getattr(Consumption, column_name)
+        conditions.append(or_(column.is_(None), column != expression))
+    return or_(*conditions)
+
+def drift_report(filters=(), sample_size=20):
+    """统计派生价格与公式不一致的行（只读，不修改数据）"""
+    from app.models.consumption import Consumption
+
+    expressions = derived_price_columns()
+    drift = _drift_condition(expressions)
+    counts = db.session.query(
+        func.count(Consumption.id),
+        func.sum(case((drift, 1), else_=0)),
+        func.sum(case((Consumption.min_unit_price != expressions['min_unit_price'], 1), else_=0)),
+        func.sum(case((Consumption.daily_average_price != expressions['daily_average_price'], 1), else_=0)),
+    ).filter(*filters).one()
+    samples = db.session.query(
+        Consumption.id,
+        Consumption.min_unit_price,
+        expressions['min_unit_price'].label('expected_min_unit_price'),
+        Consumption.daily_average_price,
+        expressions['daily_average_price'].label('expected_daily_average_price'),
+    ).filter(drift, *filters).order_by(Consumption.id).limit(sample_size).all()
+
+    return {
+        'total': counts[0],
+        'drifted': int(counts[1] or 0),
+        'min_unit_price_drifted': int(counts[2] or 0),
+        'daily_average_price_drifted': int(counts[3] or 0),
+        'samples': [
+            {
+                'id': row.id,
+                'min_unit_price': float(row.min_unit_price) if row.min_unit_price is not None else None,
+                'expected_min_unit_price': float(row.expected_min_unit_price),
+                'daily_average_price': float(row.daily_average_price) if row.daily_average_price is not None else None,
+                'expected_daily_average_price': float(row.expected_daily_average_price),
+            }
+            for row in samples
+        ],
+    }
+
+def build_recompute_filters(sub_type=None, start_date=None, end_date=None):
+    """按统计类型名称、购买日期范围（YYYY-MM-DD）构建重算条件，统计类型不存在时抛出 ValueError"""
+    from app.models.consumption import Consumption
+    from app.models.sub_type import SubType
+    from app.models.lookup import get_lookup_cache
+
+    filters = []
+    if sub_type:
+        sub_type_id = get_lookup_cache().get_id(SubType, sub_type)
+        if sub_type_id is None:
+            # 否则条件变为 sub_type_id IS NULL，会误处理未设置统计类型的行
+            raise ValueError(f'未知的统计类型: {sub_type}')
+        filters.append(Consumption.sub_type_id == sub_type_id)
+    if start_date:
+        filters.append(Consumption.create_time >= datetime.strptime(start_date, '%Y-%m-%d'))
+    if end_date:
+        filters.append(Consumption.create_time < datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1))
+    return filters
+
+def recompute_derived_prices(filters=(), chunk_size=50000, progress=None):
+    """按ID区间分块执行集合式 UPDATE，只改写与公式不一致的行，返回更新行数
+
+    每个分块单独提交，避免长事务长时间持有锁。
+    progress: 可选回调，每个分块提交后以完成比例（0~1）调用
+    """
+    from app.models.consumption import Consumption, mark_consumption_changed
+    from app.models.price_sketch import mark_price_sketches_stale
+
+    expressions = derived_price_columns()
+    drift = _drift_condition(expressions)
+    min_id, max_id = db.session.query(func.min(Consumption.id), func.max(Consumption.id)).filter(*filters).one()
+    if min_id is None:
+        return 0
+
+    updated = 0
+    for chunk_start in range(min_id, max_id + 1, chunk_size):
+        chunk_end = chunk_start + chunk_size - 1
+        result = db.session.execute(
+            db.update(Consumption)
+            .where(Consumption.id.between(chunk_start, chunk_end), drift, *filters)
+            .values(**expressions)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            mark_consumption_changed()
+            mark_price_sketches_stale()
+        db.session.commit()
+        updated += result.rowcount
+        logger.info(f'派生价格重算：ID {chunk_start}-{chunk_end} 更新 {result.rowcount} 行')
+        if progress:
+            progress(min((chunk_end - min_id + 1) / (max_id - min_id + 1), 1.0))
+    return updated
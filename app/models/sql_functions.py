@@ -0,0 +1,52 @@
+"""各数据库实现不同的SQL函数（MySQL为默认实现，SQLite单独编译）"""
+from app import db
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+class days_between(FunctionElement):
+    """两个日期相差的天数（end - start）"""
+    type = db.Integer()
+    inherit_cache = True
+    name = 'days_between'
+
+@compiles(days_between)
+def _compile_days_between(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return 'DATEDIFF(%s, %s)' % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+@compiles(days_between, 'sqlite')
+def _compile_days_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return 'CAST(julianday(%s) - julianday(%s) AS INTEGER)' % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+class day_number(FunctionElement):
+    """时间转换为以天为单位的连续数值（含小数部分），用于按天数开窗"""
+    type = db.Float()
+    inherit_cache = True
+    name = 'day_number'
+
+@compiles(day_number)
+def _compile_day_number(element, compiler, **kw):
+    (value,) = list(element.clauses)
+    return '(UNIX_TIMESTAMP(%s) / 86400)' % compiler.process(value, **kw)
+
+@compiles(day_number, 'sqlite')
+def _compile_day_number_sqlite(element, compiler, **kw):
+    (value,) = list(element.clauses)
+    return 'julianday(%s)' % compiler.process(value, **kw)
+
+class month_key(FunctionElement):
+    """时间所在月份，格式 YYYY-MM"""
+    type = db.String()
+    inherit_cache = True
+    name = 'month_key'
+
+@compiles(month_key)
+def _compile_month_key(element, compiler, **kw):
+    (value,) = list(element.clauses)
+    return "DATE_FORMAT(%s, '%%%%Y-%%%%m')" % compiler.process(value, **kw)
+
+@compiles(month_key, 'sqlite')
+def _compile_month_key_sqlite(element, compiler, **kw):
+    (value,) = list(element.clauses)
+    return "strftime('%%Y-%%m', %s)" % compiler.process(value, **kw)
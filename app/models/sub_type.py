@@ -5,6 +5,7 @@ class SubType(db.Model):
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False)
     
     def to_dict(self):
         return {
@@ -14,31 +15,12 @@ class SubType(db.Model):
 
 def get_all_sub_types():
     """获取所有统计类型"""
+    return SubType.query.filter_by(is_deleted=False).order_by(SubType.id).all()
+
+def get_used_sub_types():
+    """获取可查询历史价格的统计类型：未删除的统计类型，以及已删除但仍被消费项引用的统计类型（排在最后）"""
     from app.models.consumption import Consumption
-    
-    # 从sub_types表获取所有统计类型
-    db_sub_types = SubType.query.order_by(SubType.id).all()
-    
-    # 从consumption表获取所有实际使用的统计类型
-    used_sub_types = db.session.query(Consumption.sub_type).distinct().all()
-    used_sub_type_names = [item[0] for item in used_sub_types if item[0]]
-    
-    # 合并并去重
-    all_sub_type_names = set()
-    result = []
-    
-    # 先添加数据库中已有的统计类型
-    for sub_type in db_sub_types:
-        if sub_type.name not in all_sub_type_names:
-            all_sub_type_names.add(sub_type.name)
-            result.append(sub_type)
-    
-    # 再添加consumption表中使用但sub_types表中没有的统计类型
-    for name in used_sub_type_names:
-        if name not in all_sub_type_names:
-            all_sub_type_names.add(name)
-            # 创建临时SubType对象用于模板渲染
-            temp_sub_type = type('SubType', (), {'id': None, 'name': name, 'to_dict': lambda self: {'id': self.id, 'name': self.name}})()
-            result.append(temp_sub_type)
-    
-    return result
+    referenced = db.session.query(Consumption.sub_type_id).filter(Consumption.is_deleted == False)
+    return SubType.query.filter(
+        db.or_(SubType.is_deleted == False, SubType.id.in_(referenced))
+    ).order_by(SubType.is_deleted, SubType.id).all()
@@ -0,0 +1,226 @@
+"""消费内容自动补全
+
+内存中维护所有不同消费内容的有序数组，按前缀用二分查找定位区间，
+区间内按频率和最近购买时间排序，并返回最近一次购买的价格、渠道、类型等。
+- 新增消费项时增量更新；修改、删除后重新查询受影响的内容，只替换这些条目
+- 其他进程的写入等无法增量更新的变化通过数据版本发现，期间继续使用旧索引，由一个后台线程重建
+- 区间较大的短前缀结果会被缓存，相关内容变化时清除
+"""
+from app import db
+from app.models.consumption import Consumption
+from app.models.channel import Channel
+from app.models.main_type import MainType
+from app.models.sub_type import SubType
+from app.models.data_version import CONSUMPTION_VERSION, get_data_version
+from app.models.lookup import get_lookup_cache
+from flask import current_app
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+import bisect
+import heapq
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 单次最多返回的建议数
+MAX_SUGGESTIONS = 20
+# 最近购买时间每过多少天，排序分值相当于频率减半
+RECENCY_HALF_LIFE_DAYS = 30
+# 前缀结果缓存的条目上限
+PREFIX_CACHE_SIZE = 10000
+
+class ContentEntry:
+    __slots__ = ('content', 'count', 'last_time', 'total_price', 'channel_id', 'main_type_id',
+                 'sub_type_id', 'unit_coefficient', 'rank')
+
+    def __init__(self, content, count, last_time, total_price, channel_id, main_type_id, sub_type_id, unit_coefficient):
+        self.content = content
+        self.count = count
+        self.last_time = last_time
+        self.total_price = total_price
+        self.channel_id = channel_id
+        self.main_type_id = main_type_id
+        self.sub_type_id = sub_type_id
+        self.unit_coefficient = unit_coefficient
+        self.update_rank()
+
+    def update_rank(self):
+        # log2(次数) + 距今天数的衰减；衰减项对所有内容相同，因此只需按最近购买时间计算，不随当前时间变化
+        self.rank = math.log2(self.count) + self.last_time.timestamp() / 86400 / RECENCY_HALF_LIFE_DAYS
+
+    def to_dict(self):
+        lookup_cache = get_lookup_cache()
+        return {
+            'content': self.content,
+            'count': self.count,
+            'last_time': self.last_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'total_price': float(self.total_price),
+            'channel': lookup_cache.get_name(Channel, self.channel_id),
+            'main_type': lookup_cache.get_name(MainType, self.main_type_id),
+            'sub_type': lookup_cache.get_name(SubType, self.sub_type_id),
+            'unit_coefficient': float(self.unit_coefficient)
+        }
+
+class ContentIndex:
+    """消费内容前缀索引"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 同一时间只允许一个线程重建索引
+        self._build_lock = threading.Lock()
+        self._keys = []
+        self._entries = {}
+        self._prefix_cache = {}
+        # 构建索引时的消费项数据版本，None表示需要重建
+        self.version = None
+
+    @staticmethod
+    def _load(*filters):
+        """查询内容条目：每个内容取最近一次购买的行，并附带购买次数"""
+        ranked = db.session.query(
+            Consumption.content,
+            Consumption.create_time,
+            Consumption.total_price,
+            Consumption.channel_id,
+            Consumption.main_type_id,
+            Consumption.sub_type_id,
+            Consumption.unit_coefficient,
+            db.func.count(Consumption.id).over(partition_by=Consumption.content).label('count'),
+            db.func.row_number().over(
+                partition_by=Consumption.content,
+                order_by=(Consumption.create_time.desc(), Consumption.id.desc())
+            ).label('row_number')
+        ).filter(Consumption.is_deleted == False, *filters).subquery()
+        rows = db.session.query(ranked).filter(ranked.c.row_number == 1).all()
+
+        return {
+            row.content: ContentEntry(row.content, row.count, row.create_time, row.total_price, row.channel_id,
+                                      row.main_type_id, row.sub_type_id, row.unit_coefficient)
+            for row in rows
+        }
+
+    def build(self):
+        """从数据库重建索引；期间已增量更新到更新版本时丢弃本次结果"""
+        version = get_data_version(CONSUMPTION_VERSION)
+        entries = self._load()
+        with self._lock:
+            if self.version is not None and self.version > version:
+                return
+            self._entries = entries
+            self._keys = sorted(entries)
+            self._prefix_cache = {}
+            self.version = version
+        logger.info(f'消费内容索引重建完成，共 {len(entries)} 个内容')
+
+    def ensure_fresh(self):
+        """首次查询时同步构建；数据版本变化后继续使用旧索引，由一个后台线程重建"""
+        if self.version is None:
+            with self._build_lock:
+                if self.version is None:
+                    self.build()
+            return
+        if self.version == get_data_version(CONSUMPTION_VERSION):
+            return
+        # 共享单个连接的连接池不能在后台线程中使用，直接在当前线程重建
+        if isinstance(db.engine.pool, (StaticPool, SingletonThreadPool)):
+            with self._build_lock:
+                self.build()
+            return
+        if not self._build_lock.acquire(blocking=False):
+            return
+        app = current_app._get_current_object()
+        threading.Thread(target=self._build_in_background, args=(app,), name='content-index-rebuild',
+                         daemon=True).start()
+
+    def _build_in_background(self, app):
+        try:
+            with app.app_context():
+                self.build()
+        except Exception as e:
+            logger.error(f'消费内容索引重建失败: {str(e)}', exc_info=True)
+        finally:
+            self._build_lock.release()
+
+    def record(self, *consumptions):
+        """新增消费项提交后增量更新（合并提交时一次传入同一事务中的多项）；期间有其他写入时留待重建"""
+        current = get_data_version(CONSUMPTION_VERSION)
+        with self._lock:
+            if self.version is None or current != self.version + len(consumptions):
+                return
+            self.version = current
+            for consumption in consumptions:
+                self._add(consumption)
+
+    def refresh(self, contents=(), changes=1):
+        """修改、删除等写操作提交后增量更新：重新查询受影响内容的条目并替换
+
+        changes: 该事务递增数据版本的次数；期间有其他写入时留待重建
+        """
+        if self.version is None:
+            return
+        contents = set(contents)
+        current = get_data_version(CONSUMPTION_VERSION)
+        if current != self.version + changes:
+            return
+        entries = self._load(Consumption.content.in_(contents)) if contents else {}
+        with self._lock:
+            if self.version != current - changes:
+                return
+            self.version = current
+            for content in contents:
+                entry = entries.get(content)
+                if entry is None:
+                    if self._entries.pop(content, None) is not None:
+                        del self._keys[bisect.bisect_left(self._keys, content)]
+                else:
+                    if content not in self._entries:
+                        bisect.insort(self._keys, content)
+                    self._entries[content] = entry
+                self._clear_prefixes(content)
+
+    def _add(self, consumption):
+        """在持有锁时把一条新增消费项加入索引"""
+        entry = self._entries.get(consumption.content)
+        if entry is None:
+            self._entries[consumption.content] = ContentEntry(
+                consumption.content, 1, consumption.create_time, consumption.total_price, consumption.channel_id,
+                consumption.main_type_id, consumption.sub_type_id, consumption.unit_coefficient
+            )
+            bisect.insort(self._keys, consumption.content)
+        else:
+            entry.count += 1
+            if consumption.create_time >= entry.last_time:
+                entry.last_time = consumption.create_time
+                entry.total_price = consumption.total_price
+                entry.channel_id = consumption.channel_id
+                entry.main_type_id = consumption.main_type_id
+                entry.sub_type_id = consumption.sub_type_id
+                entry.unit_coefficient = consumption.unit_coefficient
+            entry.update_rank()
+        self._clear_prefixes(consumption.content)
+
+    def _clear_prefixes(self, content):
+        """在持有锁时清除包含该内容的前缀结果"""
+        for i in range(1, len(content) + 1):
+            self._prefix_cache.pop(content[:i], None)
+
+    def suggest(self, prefix, limit=10):
+        """按前缀返回排序后的建议"""
+        self.ensure_fresh()
+        with self._lock:
+            top = self._prefix_cache.get(prefix)
+            if top is None:
+                lo = bisect.bisect_left(self._keys, prefix)
+                hi = bisect.bisect_left(self._keys, prefix + chr(0x10FFFF), lo)
+                entries = self._entries
+                top = heapq.nlargest(MAX_SUGGESTIONS, self._keys[lo:hi], key=lambda content: entries[content].rank)
+                if len(self._prefix_cache) >= PREFIX_CACHE_SIZE:
+                    self._prefix_cache.clear()
+                self._prefix_cache[prefix] = top
+            entries = [self._entries[content] for content in top[:limit]]
+        return [entry.to_dict() for entry in entries]
+
+def get_content_index():
+    """获取当前应用的消费内容索引（每个应用实例一份）"""
+    return current_app.extensions.setdefault('content_index', ContentIndex())
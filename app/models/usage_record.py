@@ -0,0 +1,42 @@
+from app import db
+from datetime import datetime
+
+class UsageRecord(db.Model):
+    __tablename__ = 'usage_records'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    consumption_id = db.Column(db.Integer, db.ForeignKey('consumption.id'), nullable=False, index=True)
+    quantity = db.Column(db.DECIMAL(10, 1), nullable=False, default=1.0)
+    start_use_time = db.Column(db.Date, nullable=False)
+    end_use_time = db.Column(db.Date, nullable=False)
+    create_time = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'consumption_id': self.consumption_id,
+            'quantity': float(self.quantity),
+            'start_use_time': self.start_use_time.strftime('%Y-%m-%d'),
+            'end_use_time': self.end_use_time.strftime('%Y-%m-%d'),
+            'create_time': self.create_time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+def get_usage_records(consumption_ids):
+    """批量获取多个消费项的使用记录（单次查询），按消费项ID分组"""
+    result = {consumption_id: [] for consumption_id in consumption_ids}
+    if not consumption_ids:
+        return result
+    records = UsageRecord.query.filter(
+        UsageRecord.consumption_id.in_(consumption_ids)
+    ).order_by(UsageRecord.consumption_id, UsageRecord.start_use_time).all()
+    for record in records:
+        result[record.consumption_id].append(record)
+    return result
+
+def get_usage_summary(consumption_id):
+    """获取消费项已有使用记录的汇总：总数量、最早开始时间、最晚结束时间"""
+    return db.session.query(
+        db.func.coalesce(db.func.sum(UsageRecord.quantity), 0),
+        db.func.min(UsageRecord.start_use_time),
+        db.func.max(UsageRecord.end_use_time)
+    ).filter(UsageRecord.consumption_id == consumption_id).one()
@@ -0,0 +1,117 @@
+"""页面数据并发加载
+
+页面路由需要的几项数据（待收货数量、字典表片段、待收货列表等）互不依赖，
+逐个查询时页面耗时是各项之和。这里把它们提交到有界线程池中并发执行：
+每项在独立的应用上下文中运行，使用各自的会话和连接池连接，
+页面耗时接近最慢的一项；单项出错或超时只影响该项，其余数据照常返回。
+
+内存数据库只有一个共享连接，此时退化为在当前线程中依次执行。
+
+超时的项无法中止，仍占用一个线程和一个数据库连接：这时换用新的线程池，原线程在该项结束后退出，
+后续页面不会排在卡住的项后面。仍在运行的超时项达到 max_hung 个时，退化为在当前线程中依次执行，
+不再新建线程，占用的连接数不超过 max_workers + max_hung（连接池大小应不小于此数加上请求线程数）。
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class PageData(dict):
+    """加载结果：成功的项按名称保存，失败的项记录在 errors 中"""
+
+    def __init__(self):
+        super().__init__()
+        self.errors = {}
+
+class PageLoader:
+    """有界线程池，按项设置超时"""
+
+    def __init__(self, app, max_workers=4, timeout=5, max_hung=None):
+        self.app = app
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.max_hung = max_workers if max_hung is None else max_hung
+        self.hung = 0
+        self._lock = threading.Lock()
+        self._executor = self._new_executor() if max_workers > 0 else None
+
+    def _new_executor(self):
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='page-loader')
+
+    def _concurrent(self):
+        from app import db
+        # 共享单个连接的连接池不能并发使用
+        if self._executor is None or isinstance(db.engine.pool, (StaticPool, SingletonThreadPool)):
+            return False
+        if self.hung >= self.max_hung:
+            logger.warning(f'页面数据加载有 {self.hung} 项超时仍未结束，本次在当前线程中依次加载')
+            return False
+        return True
+
+    def _abandon(self, futures):
+        """放弃超时仍在运行的项：换用新的线程池，原线程池在这些项结束后释放线程"""
+        with self._lock:
+            self.hung += len(futures)
+            old, self._executor = self._executor, self._new_executor()
+        old.shutdown(wait=False)
+        for future in futures:
+            future.add_done_callback(self._release)
+
+    def _release(self, future):
+        with self._lock:
+            self.hung -= 1
+
+    def _run(self, loader):
+        with self.app.app_context():
+            return loader()
+
+    def load(self, loaders, timeouts=None):
+        """并发执行 {名称: 无参函数}，返回 PageData；timeouts 可按名称覆盖默认超时（秒）"""
+        timeouts = timeouts or {}
+        data = PageData()
+        if not self._concurrent():
+            for name, loader in loaders.items():
+                try:
+                    data[name] = loader()
+                except Exception as e:
+                    logger.error(f'页面数据加载失败，项: {name}, 错误: {str(e)}', exc_info=True)
+                    data.errors[name] = str(e)
+            return data
+
+        start = time.monotonic()
+        with self._lock:
+            futures = {name: self._executor.submit(self._run, loader) for name, loader in loaders.items()}
+        hung = []
+        for name, future in futures.items():
+            # 各项同时开始，超时从提交时刻算起
+            remaining = timeouts.get(name, self.timeout) - (time.monotonic() - start)
+            try:
+                data[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                if not future.cancel():
+                    hung.append(future)
+                logger.warning(f'页面数据加载超时，项: {name}')
+                data.errors[name] = '加载超时'
+            except Exception as e:
+                logger.error(f'页面数据加载失败，项: {name}, 错误: {str(e)}', exc_info=True)
+                data.errors[name] = str(e)
+        if hung:
+            self._abandon(hung)
+        return data
+
+def init_page_loader(app):
+    loader = PageLoader(
+        app,
+        max_workers=int(app.config.get('PAGE_LOADER_WORKERS', 4)),
+        timeout=float(app.config.get('PAGE_LOADER_TIMEOUT', 5)),
+        max_hung=app.config.get('PAGE_LOADER_MAX_HUNG')
+    )
+    app.extensions['page_loader'] = loader
+    return loader
+
+def load_page_data(loaders, timeouts=None):
+    return current_app.extensions['page_loader'].load(loaders, timeouts)
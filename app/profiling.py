@@ -0,0 +1,181 @@
+"""按需请求性能分析
+
+PROFILING=1 时启用（默认关闭，关闭时不注册任何钩子，没有额外开销）。
+请求满足以下任一条件时，用 cProfile 和 tracemalloc 包裹整个请求：
+- 请求头 X-Profile 等于 PROFILING_SECRET
+- 按 PROFILING_SAMPLE_RATE 的比例随机抽样
+
+分析结果（累计耗时最高的函数、分配内存最多的代码行、原始 pstats 数据）
+保存在最近 PROFILING_BUFFER_SIZE 条的环形缓冲区中，
+可通过 /api/debug/profiles 查看或下载 .pstats 文件（用 snakeviz、pstats 等工具打开）。
+结果包含带查询参数的请求路径，查看时必须提供 PROFILING_SECRET；未配置密钥时只能抽样记录，无法查看。
+
+tracemalloc 跟踪整个进程的内存分配，因此同一时刻只分析一个请求，
+其他满足条件的请求照常处理、不做分析。
+"""
+from collections import deque
+from datetime import datetime
+from flask import current_app, g, request
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import marshal
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+class Profiler:
+    """请求分析器和结果环形缓冲区"""
+
+    def __init__(self, secret=None, sample_rate=0.0, buffer_size=50, top=30):
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.top = top
+        self._records = deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _has_secret(self, headers):
+        return bool(self.secret) and hmac.compare_digest(headers.get(PROFILE_HEADER, ''), self.secret)
+
+    def authorized(self, headers):
+        """查看分析结果需提供密钥（未配置密钥时一律拒绝）"""
+        return self._has_secret(headers)
+
+    def should_profile(self, headers):
+        if self._has_secret(headers):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        """开始分析当前请求，已有请求在分析时返回None"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        # 进程已在跟踪内存分配时（如 PYTHONTRACEMALLOC）沿用，结束时不关闭
+        owns_tracing = not tracemalloc.is_tracing()
+        if owns_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.clear_traces()
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        return profile, started, owns_tracing
+
+    def stop(self, state, method, path, status):
+        """结束分析并保存结果，返回记录ID"""
+        profile, started, owns_tracing = state
+        try:
+            profile.disable()
+            duration = (time.perf_counter() - started) * 1000
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if owns_tracing:
+                tracemalloc.stop()
+            self._busy.release()
+
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        record = {
+            'id': next(self._ids),
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration, 2),
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'top_functions': self._top_functions(stats),
+            'top_allocations': self._top_allocations(snapshot),
+            'pstats': marshal.dumps(stats.stats),
+        }
+        with self._lock:
+            self._records.append(record)
+        logger.info(f'请求分析完成，ID: {record["id"]}, {method} {path}, 耗时: {record["duration_ms"]} ms')
+        return record['id']
+
+    def _top_functions(self, stats):
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        return [{
+            'function': f'{file}:{line}({name})',
+            'ncalls': ncalls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        } for (file, line, name), (_, ncalls, tottime, cumtime, _) in rows]
+
+    def _top_allocations(self, snapshot):
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        return [{
+            'site': str(stat.traceback),
+            'size_kb': round(stat.size / 1024, 2),
+            'count': stat.count,
+        } for stat in snapshot.statistics('lineno')[:self.top]]
+
+    def records(self):
+        """已保存的分析结果摘要（新的在前）"""
+        with self._lock:
+            records = list(self._records)
+        return [{key: record[key] for key in ('id', 'method', 'path', 'status', 'duration_ms', 'time')}
+                for record in reversed(records)]
+
+    def get(self, id):
+        with self._lock:
+            for record in self._records:
+                if record['id'] == id:
+                    return record
+        return None
+
+def init_profiling(app):
+    """启用时注册请求分析钩子"""
+    if not app.config.get('PROFILING'):
+        return None
+    profiler = Profiler(
+        secret=app.config.get('PROFILING_SECRET'),
+        sample_rate=float(app.config.get('PROFILING_SAMPLE_RATE') or 0),
+        buffer_size=int(app.config.get('PROFILING_BUFFER_SIZE', 50)),
+        top=int(app.config.get('PROFILING_TOP', 30)),
+    )
+    app.extensions['profiler'] = profiler
+    if not profiler.secret:
+        logger.warning('未配置 PROFILING_SECRET，分析结果无法通过 /api/debug/profiles 查看')
+
+    @app.before_request
+    def start_profile():
+        # 不分析查看分析结果的请求本身
+        if request.path.startswith('/api/debug/profiles') or not profiler.should_profile(request.headers):
+            return
+        state = profiler.start()
+        if state is not None:
+            g.profile_state = state
+
+    @app.after_request
+    def stop_profile(response):
+        state = g.pop('profile_state', None)
+        if state is not None:
+            profile_id = profiler.stop(state, request.method, request.full_path.rstrip('?'), response.status_code)
+            response.headers[PROFILE_ID_HEADER] = str(profile_id)
+        return response
+
+    @app.teardown_request
+    def abort_profile(exc):
+        # 请求出错未经过 after_request 时也要结束分析
+        state = g.pop('profile_state', None)
+        if state is not None:
+            profiler.stop(state, request.method, request.full_path.rstrip('?'), 500)
+
+    logger.info('请求性能分析已启用')
+    return profiler
+
+def get_profiler():
+    """未启用时返回None"""
+    return current_app.extensions.get('profiler')
@@ -0,0 +1,168 @@
+"""查询结果缓存
+
+统计、价格查询等接口对相同参数反复计算相同结果，这里按
+(接口, 参数, 数据版本) 缓存接口结果。消费项或字典表的任何写操作都会递增对应的数据版本，
+旧键自然不再命中，无需扫描删除，由容量上限或TTL淘汰。
+
+后端可选：
+- memory：进程内LRU，有容量上限和TTL（默认）
+- disk：本地目录，多个worker进程共享
+- redis：需安装 redis 包，配置 REDIS_URL
+- none：不缓存
+"""
+from app.models.data_version import CONSUMPTION_VERSION, LOOKUP_VERSION, get_data_versions
+from collections import OrderedDict
+from flask import current_app
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class MemoryBackend:
+    """进程内LRU缓存"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+class DiskBackend:
+    """本地目录缓存，每个键一个JSON文件，写入时先写临时文件再原子替换"""
+
+    def __init__(self, path, ttl=300):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._file(key), encoding='utf-8') as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item['expires'] < time.time():
+            return None
+        return item['value']
+
+    def set(self, key, value):
+        target = self._file(key)
+        tmp = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'expires': time.time() + self.ttl, 'value': value}, f, ensure_ascii=False)
+        os.replace(tmp, target)
+
+class RedisBackend:
+    """Redis缓存，client 需提供 get(key) 和 set(key, value, ex=秒)"""
+
+    def __init__(self, client, ttl=300, prefix='ledger:result:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+
+class ResultCache:
+    """按数据版本失效的结果缓存，并统计各接口命中率"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _record(self, endpoint, hit):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, [0, 0])
+            stats[0 if hit else 1] += 1
+
+    def get_or_compute(self, endpoint, params, compute):
+        """返回缓存结果，未命中时调用 compute() 计算并写入；结果须可JSON序列化且不为None"""
+        if self.backend is None:
+            return compute()
+        
+        # 两个数据版本在一次查询中读取
+        data_versions = get_data_versions(CONSUMPTION_VERSION, LOOKUP_VERSION)
+        versions = f'{data_versions[CONSUMPTION_VERSION]}.{data_versions[LOOKUP_VERSION]}'
+        key = f'{endpoint}:{versions}:{json.dumps(params, sort_keys=True, ensure_ascii=False)}'
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # 缓存后端故障时退化为直接计算
+            logger.error(f'读取结果缓存失败，接口: {endpoint}, 错误: {str(e)}')
+            value = None
+        if value is not None:
+            self._record(endpoint, True)
+            return value
+        
+        self._record(endpoint, False)
+        value = compute()
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            logger.error(f'写入结果缓存失败，接口: {endpoint}, 错误: {str(e)}')
+        return value
+
+    def stats(self):
+        """各接口的命中数、未命中数和命中率（本进程）"""
+        with self._lock:
+            return {
+                endpoint: {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else 0.0
+                }
+                for endpoint, (hits, misses) in self._stats.items()
+            }
+
+def create_backend(app):
+    """按配置创建缓存后端"""
+    name = app.config.get('RESULT_CACHE_BACKEND', 'memory')
+    ttl = int(app.config.get('RESULT_CACHE_TTL', 300))
+    if name == 'memory':
+        return MemoryBackend(max_entries=int(app.config.get('RESULT_CACHE_MAX_ENTRIES', 1024)), ttl=ttl)
+    if name == 'disk':
+        path = app.config.get('RESULT_CACHE_DIR') or os.path.join(app.instance_path, 'result_cache')
+        return DiskBackend(path, ttl=ttl)
+    if name == 'redis':
+        import redis
+        return RedisBackend(redis.Redis.from_url(app.config['REDIS_URL']), ttl=ttl)
+    if name == 'none':
+        return None
+    raise ValueError(f'未知的结果缓存后端: {name}')
+
+def init_result_cache(app):
+    app.extensions['result_cache'] = ResultCache(create_backend(app))
+
+def get_result_cache():
+    return current_app.extensions['result_cache']
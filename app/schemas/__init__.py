@@ -1,4 +1,7 @@
-from app.schemas.consumption import ConsumptionCreate, ConsumptionUpdate, ConsumptionResponse
+from app.schemas.consumption import ConsumptionCreate, ConsumptionUpdate, ConsumptionResponse, ConsumptionBulkUpdate
 from app.schemas.channel import ChannelCreate, ChannelUpdate, ChannelResponse
 from app.schemas.main_type import MainTypeCreate, MainTypeUpdate, MainTypeResponse
 from app.schemas.sub_type import SubTypeCreate, SubTypeUpdate, SubTypeResponse
+from app.schemas.usage_record import UsageRecordCreate, UsageRecordBatchCreate
+from app.schemas.job import JobCreate
+from app.schemas.budget import BudgetSet
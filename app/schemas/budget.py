@@ -0,0 +1,5 @@
+from pydantic import BaseModel, Field
+
+class BudgetSet(BaseModel):
+    main_type: str = Field(..., description="账单类型")
+    amount: float = Field(..., ge=0, description="月度预算金额")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import date, datetime
 
 class ConsumptionBase(BaseModel):
@@ -36,6 +36,7 @@ class ConsumptionUpdate(BaseModel):
     start_use_time: Optional[str] = Field(None, description="使用开始时间")
     end_use_time: Optional[str] = Field(None, description="使用结束时间")
     pickup_code: Optional[str] = Field(None, alias="pickupCode", description="取件码")
+    version: Optional[int] = Field(None, description="必填，读取时的版本号：仅在未被他人修改时更新，否则返回409；缺少时返回400")
 
 class ConsumptionResponse(BaseModel):
     id: int
@@ -57,6 +58,12 @@ class ConsumptionResponse(BaseModel):
     daily_average_price: float
     is_deleted: bool
     pickup_code: Optional[str]
+    version: int
     
     class Config:
         from_attributes = True
+
+class ConsumptionBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="消费项ID列表")
+    operation: Literal['receive', 'delete', 'set_tag', 'set_pickup_code'] = Field(..., description="批量操作")
+    value: Optional[str] = Field(None, description="标签或取件码")
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict
+
+class JobCreate(BaseModel):
+    job_type: str = Field(..., description="任务类型")
+    params: Dict[str, Any] = Field(default_factory=dict, description="任务参数")
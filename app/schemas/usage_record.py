@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class UsageRecordCreate(BaseModel):
+    quantity: float = Field(default=1.0, gt=0, description="使用数量")
+    start_use_time: str = Field(..., alias="startUseTime", description="使用开始时间")
+    end_use_time: str = Field(..., alias="endUseTime", description="使用结束时间")
+    
+    class Config:
+        populate_by_name = True
+
+class UsageRecordBatchCreate(BaseModel):
+    records: List[UsageRecordCreate] = Field(..., min_length=1, description="使用记录列表")
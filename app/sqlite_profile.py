@@ -0,0 +1,146 @@
+"""SQLite 运行配置
+
+使用文件型 SQLite 库时自动启用（SQLITE_PROFILE=0 可关闭）：
+- 每个连接建立时设置 WAL 日志、synchronous=NORMAL、mmap_size、cache_size、busy_timeout
+- 写事务串行化：写请求（POST/PUT/PATCH/DELETE）和 write_transactions() 范围内的事务以 BEGIN IMMEDIATE 开始，
+  在开始时就取得数据库写锁，避免先读后写的事务在升级锁时直接报 "database is locked"；
+  同一进程内的写事务先排队获取进程内写锁，不在 SQLite 的忙等待中轮询
+- 定期执行 PRAGMA optimize 和 WAL 检查点
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request
+from sqlalchemy import event
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 当前线程/请求的事务是否会写数据库
+_write_intent = ContextVar('sqlite_write_intent', default=False)
+
+# 只读请求方法，其他方法的请求视为写请求
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+def is_sqlite_file(app):
+    """是否为文件型 SQLite 库（内存库只有一个共享连接，不适用 WAL 和写事务串行化）"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    return uri.startswith('sqlite') and ':memory:' not in uri and uri.rstrip('/') not in ('sqlite:', 'sqlite')
+
+@contextmanager
+def write_transactions():
+    """在此范围内开始的事务都按写事务处理（BEGIN IMMEDIATE）"""
+    token = _write_intent.set(True)
+    try:
+        yield
+    finally:
+        _write_intent.reset(token)
+
+class WriterLock:
+    """进程内写锁：事务开始时获取，提交或回滚时释放"""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def acquire(self, info):
+        if info.get('holds_writer_lock'):
+            return
+        if self._lock.acquire(timeout=self.timeout):
+            info['holds_writer_lock'] = True
+        else:
+            # 超时后不再等待进程内锁，交给 SQLite 的 busy_timeout 处理
+            logger.warning('等待进程内写锁超时')
+
+    def release(self, info):
+        if info.pop('holds_writer_lock', False):
+            self._lock.release()
+
+def apply_pragmas(dbapi_connection, config):
+    """连接建立时设置 PRAGMA"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA mmap_size={int(config["SQLITE_MMAP_SIZE"])}')
+    cursor.execute(f'PRAGMA cache_size={int(config["SQLITE_CACHE_SIZE"])}')
+    cursor.execute(f'PRAGMA busy_timeout={int(config["SQLITE_BUSY_TIMEOUT"])}')
+    cursor.close()
+
+def run_maintenance(engine):
+    """更新查询规划统计并截断WAL文件，返回检查点结果 (busy, log, checkpointed)"""
+    with engine.connect() as connection:
+        connection.exec_driver_sql('PRAGMA optimize')
+        result = connection.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)').one()
+        connection.commit()
+    logger.info(f'SQLite维护完成，检查点结果: {tuple(result)}')
+    return tuple(result)
+
+def _start_maintenance_thread(app, engine, interval):
+    stopped = threading.Event()
+
+    def loop():
+        while not stopped.wait(interval):
+            try:
+                run_maintenance(engine)
+            except Exception as e:
+                logger.error(f'SQLite定期维护失败: {str(e)}', exc_info=True)
+
+    thread = threading.Thread(target=loop, name='sqlite-maintenance', daemon=True)
+    thread.start()
+    return stopped
+
+def init_sqlite_profile(app):
+    """为 SQLite 数据库注册连接事件、写事务串行化和定期维护（须在创建连接之前调用）"""
+    from app import db
+
+    if not is_sqlite_file(app) or not app.config.get('SQLITE_PROFILE', True):
+        return
+    with app.app_context():
+        engine = db.engine
+    config = app.config
+    writer_lock = WriterLock(timeout=int(config['SQLITE_BUSY_TIMEOUT']) / 1000)
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, config)
+
+    @event.listens_for(engine, 'begin')
+    def on_begin(connection):
+        dbapi_connection = connection.connection.dbapi_connection
+        if _write_intent.get():
+            # 写事务自行发出 BEGIN IMMEDIATE，pysqlite 不再隐式开始事务
+            writer_lock.acquire(connection.info)
+            dbapi_connection.isolation_level = None
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+        else:
+            # 其他事务沿用 pysqlite 默认行为：查询不开启事务（不持有 WAL 快照），
+            # 第一条写语句前才隐式 BEGIN，写锁等待由 busy_timeout 处理
+            dbapi_connection.isolation_level = ''
+
+    @event.listens_for(engine, 'commit')
+    @event.listens_for(engine, 'rollback')
+    def on_end(connection):
+        writer_lock.release(connection.info)
+
+    @event.listens_for(engine, 'reset')
+    def on_reset(dbapi_connection, connection_record, reset_state):
+        # 连接未提交就归还连接池时也要释放写锁
+        writer_lock.release(connection_record.info)
+
+    @app.before_request
+    def mark_write_request():
+        if request.method not in READ_METHODS:
+            request.environ['sqlite_write_token'] = _write_intent.set(True)
+
+    @app.teardown_request
+    def unmark_write_request(exc):
+        token = request.environ.pop('sqlite_write_token', None)
+        if token is not None:
+            # 写请求结束时立即归还连接，释放写锁
+            db.session.close()
+            _write_intent.reset(token)
+
+    app.extensions['sqlite_writer_lock'] = writer_lock
+    interval = int(config.get('SQLITE_MAINTENANCE_INTERVAL') or 0)
+    if interval > 0:
+        app.extensions['sqlite_maintenance'] = _start_maintenance_thread(app, engine, interval)
@@ -0,0 +1,90 @@
+"""账本备份与恢复基准
+
+用法：python benchmarks/bench_backup.py [行数]
+
+在临时SQLite库中生成账本数据，测量备份（一致性快照、服务端游标、gzip 分块）和
+恢复到空库（批量写入、写完后重建索引）的行/秒，并逐行比较恢复前后的数据。
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app import app, create_app, db
+    from app.backup import BACKUP_TABLES, backup_ledger, restore_ledger
+    from app.models import Channel, MainType, SubType, Consumption
+    from sqlalchemy import select
+
+    with app.app_context():
+        db.session.add_all([Channel(name='淘宝'), MainType(name='食品'), SubType(name='日常用品')])
+        db.session.commit()
+
+        random.seed(42)
+        begin = time.perf_counter()
+        start = datetime(2020, 1, 1)
+        batch = []
+        for i in range(count):
+            start_use = date(2020, 1, 1) + timedelta(days=random.randrange(2000))
+            has_use_time = random.random() < 0.5
+            batch.append({
+                'content': f'商品{i % 5000}',
+                'quantity': random.randint(1, 10),
+                'total_price': round(random.uniform(1, 500), 2),
+                'channel_id': 1,
+                'main_type_id': 1,
+                'sub_type_id': 1,
+                'unit_coefficient': random.choice([1, 5, 10]),
+                'receive_status': '已收货',
+                'statistical_status': '计入',
+                'create_time': start + timedelta(minutes=i),
+                'min_unit_price': round(random.uniform(1, 50), 2),
+                'daily_average_price': 0,
+                'start_use_time': start_use if has_use_time else None,
+                'end_use_time': start_use + timedelta(days=random.randrange(365)) if has_use_time else None,
+                'evaluate': '好用' if i % 7 == 0 else None,
+                'is_deleted': False,
+            })
+            if len(batch) == 50000:
+                db.session.execute(db.insert(Consumption), batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(Consumption), batch)
+        db.session.commit()
+        print(f'生成 {count} 行: {time.perf_counter() - begin:.1f} s')
+
+        path = os.path.join(tmp, 'ledger.backup.gz')
+        begin = time.perf_counter()
+        counts = backup_ledger(db.engine, path)
+        elapsed = time.perf_counter() - begin
+        total = sum(counts.values())
+        print(f'备份: {elapsed:.1f} s ({total / elapsed:,.0f} 行/s)，文件 {os.path.getsize(path) / 1024 / 1024:.1f} MB')
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "restored.db")}'
+    restored = create_app()
+    with restored.app_context():
+        begin = time.perf_counter()
+        counts = restore_ledger(db.engine, path)
+        elapsed = time.perf_counter() - begin
+        print(f'恢复: {elapsed:.1f} s ({total / elapsed:,.0f} 行/s，含重建索引和按月累计)')
+
+    # 逐表按主键顺序比较
+    def rows(application, name):
+        with application.app_context():
+            table = db.metadata.tables[name]
+            return db.session.execute(select(table).order_by(*table.primary_key.columns)).all()
+
+    begin = time.perf_counter()
+    for name in BACKUP_TABLES:
+        assert rows(app, name) == rows(restored, name), f'表 {name} 恢复后不一致'
+    print(f'恢复前后数据一致（比较 {time.perf_counter() - begin:.1f} s）')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""金额存储方式基准：DECIMAL 与整数分
+
+用法：python benchmarks/bench_money.py [行数] [序列化行数]
+
+分别以 MONEY_STORAGE=decimal 和 MONEY_STORAGE=cents 在临时SQLite库中生成相同的数据，测量：
+按账单类型的SUM聚合（与精确值的误差）、加载并序列化消费项的耗时，以及数据库文件大小。
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+def run(count, serialize_count):
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import logging
+    logging.disable(logging.INFO)
+    from app import app, db
+    from app.models import Channel, MainType, SubType, Consumption
+    from app.models.money import MONEY_STORAGE
+
+    with app.app_context():
+        db.session.add_all([Channel(name='淘宝'), SubType(name='日常用品')])
+        db.session.add_all([MainType(name=f'账单类型{i}') for i in range(20)])
+        db.session.commit()
+
+        random.seed(42)
+        exact = {}
+        start = datetime(2020, 1, 1)
+        batch = []
+        for i in range(count):
+            price = Decimal(random.randint(100, 50000)) / 100
+            main_type_id = random.randint(1, 20)
+            exact[main_type_id] = exact.get(main_type_id, Decimal(0)) + price
+            batch.append({
+                'content': f'商品{i % 5000}',
+                'quantity': 1,
+                'total_price': price,
+                'channel_id': 1,
+                'main_type_id': main_type_id,
+                'sub_type_id': 1,
+                'unit_coefficient': 1,
+                'receive_status': '已收货',
+                'statistical_status': '计入',
+                'create_time': start + timedelta(minutes=i),
+                'min_unit_price': price,
+                'daily_average_price': 0,
+                'is_deleted': False,
+            })
+            if len(batch) == 50000:
+                db.session.execute(db.insert(Consumption), batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(Consumption), batch)
+        db.session.commit()
+
+        # 与统计接口相同的聚合
+        timings = []
+        for _ in range(5):
+            begin = time.perf_counter()
+            rows = db.session.query(
+                Consumption.main_type_id,
+                db.func.sum(Consumption.total_price).label('total_amount')
+            ).filter(
+                Consumption.receive_status == '已收货',
+                Consumption.is_deleted == False
+            ).group_by(Consumption.main_type_id).all()
+            values = {row.main_type_id: float(row.total_amount) for row in rows}
+            timings.append(time.perf_counter() - begin)
+        error = max(abs(Decimal(str(values[k])) - v) for k, v in exact.items())
+
+        begin = time.perf_counter()
+        items = Consumption.query.order_by(Consumption.id).limit(serialize_count).all()
+        loaded = time.perf_counter() - begin
+        payload = json.dumps([item.to_dict() for item in items], ensure_ascii=False)
+        serialized = time.perf_counter() - begin
+        db.engine.dispose()
+
+    print(f'{MONEY_STORAGE:8s} 聚合 {min(timings) * 1000:7.1f} ms (最大误差 {error}), '
+          f'加载 {serialize_count} 行 {loaded * 1000:7.1f} ms, 加载+序列化 {serialized * 1000:7.1f} ms '
+          f'({len(payload) / 1024 / 1024:.1f} MB), 文件 {os.path.getsize(path) / 1024 / 1024:.1f} MB')
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    serialize_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    if os.getenv('MONEY_STORAGE'):
+        run(count, serialize_count)
+        return
+    print(f'{count} 行消费项，20 个账单类型')
+    # 存储方式在导入模型时确定，每种方式在独立进程中运行
+    for storage in ('decimal', 'cents'):
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), str(count), str(serialize_count)],
+            env={**os.environ, 'MONEY_STORAGE': storage},
+            stdout=sys.stdout,
+            check=True
+        )
+
+if __name__ == '__main__':
+    main()
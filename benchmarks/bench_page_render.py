@@ -0,0 +1,53 @@
+"""页面路由渲染耗时基准
+
+用法：python benchmarks/bench_page_render.py [渠道数] [账单类型数] [统计类型数] [请求次数]
+
+在临时SQLite库中填充字典表，通过测试客户端请求各页面，输出每个页面的平均/P95耗时。
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+def main():
+    channels = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    main_types = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    sub_types = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    requests = int(sys.argv[4]) if len(sys.argv) > 4 else 200
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import logging
+    logging.disable(logging.INFO)
+    from app import app, db
+    from app.models import Channel, MainType, SubType
+
+    with app.app_context():
+        db.session.add_all([Channel(name=f'渠道{i}') for i in range(channels)])
+        db.session.add_all([MainType(name=f'账单类型{i}') for i in range(main_types)])
+        db.session.add_all([SubType(name=f'统计类型{i}') for i in range(sub_types)])
+        db.session.commit()
+
+    client = app.test_client()
+    print(f'字典表: 渠道 {channels}, 账单类型 {main_types}, 统计类型 {sub_types}; 每个页面 {requests} 次请求')
+    for path in ['/', '/list', '/pending', '/price', '/manage']:
+        # 预热（首次编译模板）
+        begin = time.perf_counter()
+        client.get(path)
+        first = (time.perf_counter() - begin) * 1000
+
+        timings = []
+        for _ in range(requests):
+            begin = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - begin) * 1000)
+            assert response.status_code == 200
+        timings.sort()
+        print(f'{path:10s} 首次 {first:6.2f} ms, 平均 {statistics.mean(timings):6.2f} ms, '
+              f'P95 {timings[int(len(timings) * 0.95) - 1]:6.2f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""派生价格批量重算基准
+
+用法：python benchmarks/bench_recompute.py [行数]
+
+在临时SQLite库中生成账本数据（派生价格全部为0，即全部漂移），依次测量：
+漂移报告、首次全量重算、无漂移时的再次重算，以及逐行ORM重算（抽样后按比例估算）。
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app import app, db
+    from app.models import Channel, MainType, SubType, Consumption
+    from app.models.pricing import drift_report, recompute_derived_prices
+
+    with app.app_context():
+        db.session.add_all([Channel(name='淘宝'), MainType(name='食品'), SubType(name='日常用品')])
+        db.session.commit()
+
+        random.seed(42)
+        begin = time.perf_counter()
+        start = datetime(2020, 1, 1)
+        batch = []
+        for i in range(count):
+            start_use = date(2020, 1, 1) + timedelta(days=random.randrange(2000))
+            has_use_time = random.random() < 0.5
+            batch.append({
+                'content': f'商品{i % 5000}',
+                'quantity': random.randint(1, 10),
+                'total_price': round(random.uniform(1, 500), 2),
+                'channel_id': 1,
+                'main_type_id': 1,
+                'sub_type_id': 1,
+                'unit_coefficient': random.choice([1, 5, 10]),
+                'receive_status': '已收货',
+                'statistical_status': '计入',
+                'create_time': start + timedelta(minutes=i),
+                'min_unit_price': 0,
+                'daily_average_price': 0,
+                'start_use_time': start_use if has_use_time else None,
+                'end_use_time': start_use + timedelta(days=random.randrange(365)) if has_use_time else None,
+                'is_deleted': False,
+            })
+            if len(batch) == 50000:
+                db.session.execute(db.insert(Consumption), batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(Consumption), batch)
+        db.session.commit()
+        print(f'生成 {count} 行: {time.perf_counter() - begin:.1f} s')
+
+        begin = time.perf_counter()
+        report = drift_report()
+        print(f'漂移报告: {time.perf_counter() - begin:.2f} s, 漂移 {report["drifted"]} / {report["total"]} 行')
+
+        begin = time.perf_counter()
+        updated = recompute_derived_prices()
+        elapsed = time.perf_counter() - begin
+        print(f'集合式重算: {elapsed:.2f} s, 更新 {updated} 行 ({updated / elapsed:,.0f} 行/s)')
+
+        begin = time.perf_counter()
+        updated = recompute_derived_prices()
+        print(f'无漂移时再次重算: {time.perf_counter() - begin:.2f} s, 更新 {updated} 行')
+
+        # 对照：逐行加载ORM对象、在Python中计算后提交
+        db.session.query(Consumption).filter(Consumption.id <= 20000).update({'min_unit_price': 0})
+        db.session.commit()
+        begin = time.perf_counter()
+        sample = Consumption.query.filter(Consumption.id <= 20000).all()
+        for item in sample:
+            item.min_unit_price = round(float(item.total_price) / (float(item.quantity) * float(item.unit_coefficient)), 2)
+            if item.start_use_time and item.end_use_time:
+                days = (item.end_use_time - item.start_use_time).days + 1
+                item.daily_average_price = round(float(item.total_price) / days, 2) if days > 0 else 0
+        db.session.commit()
+        elapsed = time.perf_counter() - begin
+        print(f'逐行ORM重算: {len(sample)} 行 {elapsed:.2f} s ({len(sample) / elapsed:,.0f} 行/s)，'
+              f'按比例估算 {count} 行约 {elapsed * count / len(sample):.1f} s')
+
+if __name__ == '__main__':
+    main()
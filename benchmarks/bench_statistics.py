@@ -0,0 +1,139 @@
+"""统计查询基准：字符串分组（迁移前） vs 整数外键分组（迁移后）
+
+用法：python benchmarks/bench_statistics.py [行数] [重复次数]
+
+在临时目录生成两个SQLite库，数据相同，分别执行 get_statistics 的聚合查询，
+输出每次查询耗时和库文件大小。
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+CHANNELS = ['淘宝', '京东', '拼多多', '盒马', '山姆会员店', '线下超市', '美团买菜', '叮咚买菜']
+MAIN_TYPES = ['食品', '服装', '日用品', '数码', '交通', '娱乐', '医疗', '教育', '居家', '其他']
+SUB_TYPES = [f'统计类型{i}' for i in range(60)]
+
+LEGACY_SCHEMA = """
+CREATE TABLE consumption (
+    id INTEGER PRIMARY KEY,
+    content VARCHAR(255) NOT NULL,
+    total_price DECIMAL(10, 2) NOT NULL,
+    channel VARCHAR(50) NOT NULL,
+    main_type VARCHAR(50) NOT NULL,
+    sub_type VARCHAR(50),
+    receive_status VARCHAR(20) NOT NULL,
+    create_time DATETIME NOT NULL,
+    is_deleted BOOLEAN
+);
+CREATE INDEX ix_consumption_create_time ON consumption (create_time);
+CREATE INDEX ix_consumption_main_type ON consumption (main_type);
+CREATE INDEX ix_consumption_channel ON consumption (channel);
+CREATE INDEX ix_consumption_sub_type ON consumption (sub_type);
+"""
+
+FK_SCHEMA = """
+CREATE TABLE main_types (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL UNIQUE);
+CREATE TABLE consumption (
+    id INTEGER PRIMARY KEY,
+    content VARCHAR(255) NOT NULL,
+    total_price DECIMAL(10, 2) NOT NULL,
+    channel_id INTEGER NOT NULL,
+    main_type_id INTEGER NOT NULL,
+    sub_type_id INTEGER,
+    receive_status VARCHAR(20) NOT NULL,
+    create_time DATETIME NOT NULL,
+    is_deleted BOOLEAN
+);
+CREATE INDEX ix_consumption_create_time ON consumption (create_time);
+CREATE INDEX ix_consumption_main_type_id ON consumption (main_type_id);
+CREATE INDEX ix_consumption_channel_id ON consumption (channel_id);
+CREATE INDEX ix_consumption_sub_type_id ON consumption (sub_type_id);
+"""
+
+LEGACY_QUERY = """
+SELECT main_type, SUM(total_price) FROM consumption
+WHERE create_time BETWEEN ? AND ? AND receive_status = '已收货' AND is_deleted = 0
+GROUP BY main_type
+"""
+
+FK_QUERY = """
+SELECT main_type_id, SUM(total_price) FROM consumption
+WHERE create_time BETWEEN ? AND ? AND receive_status = '已收货' AND is_deleted = 0
+GROUP BY main_type_id
+"""
+
+def generate_rows(count):
+    random.seed(42)
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        yield (
+            i + 1,
+            f'商品{i % 5000}',
+            round(random.uniform(1, 500), 2),
+            random.randrange(len(CHANNELS)),
+            random.randrange(len(MAIN_TYPES)),
+            random.randrange(len(SUB_TYPES)),
+            '已收货' if random.random() < 0.95 else '待收货',
+            (start + timedelta(minutes=random.randrange(6 * 365 * 24 * 60))).strftime('%Y-%m-%d %H:%M:%S'),
+            0,
+        )
+
+def build(path, schema, rows, legacy):
+    conn = sqlite3.connect(path)
+    conn.executescript(schema)
+    if legacy:
+        conn.executemany(
+            'INSERT INTO consumption VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((r[0], r[1], r[2], CHANNELS[r[3]], MAIN_TYPES[r[4]], SUB_TYPES[r[5]], r[6], r[7], r[8]) for r in rows)
+        )
+    else:
+        conn.executemany('INSERT INTO main_types VALUES (?, ?)', [(i + 1, n) for i, n in enumerate(MAIN_TYPES)])
+        conn.executemany(
+            'INSERT INTO consumption VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((r[0], r[1], r[2], r[3] + 1, r[4] + 1, r[5] + 1, r[6], r[7], r[8]) for r in rows)
+        )
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.execute('VACUUM')
+    return conn
+
+def timed(conn, query, params, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        best = min(best, time.perf_counter() - begin)
+    return best * 1000
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rows = list(generate_rows(count))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        fk_path = os.path.join(tmp, 'fk.db')
+        legacy = build(legacy_path, LEGACY_SCHEMA, rows, legacy=True)
+        fk = build(fk_path, FK_SCHEMA, rows, legacy=False)
+
+        ranges = {
+            '一个月': ('2024-03-01 00:00:00', '2024-03-31 23:59:59'),
+            '一年': ('2024-01-01 00:00:00', '2024-12-31 23:59:59'),
+            '全部': ('2000-01-01 00:00:00', '2099-12-31 23:59:59'),
+        }
+        print(f'行数: {count}, 每项取 {repeat} 次中的最快值')
+        print(f'库文件大小: 字符串列 {os.path.getsize(legacy_path) / 1024 / 1024:.1f} MB, '
+              f'整数外键 {os.path.getsize(fk_path) / 1024 / 1024:.1f} MB')
+        for label, params in ranges.items():
+            legacy_ms = timed(legacy, LEGACY_QUERY, params, repeat)
+            fk_ms = timed(fk, FK_QUERY, params, repeat)
+            print(f'{label}: 字符串分组 {legacy_ms:.1f} ms, 整数分组 {fk_ms:.1f} ms')
+        legacy.close()
+        fk.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""消费内容补全基准
+
+用法：python benchmarks/bench_suggest.py [不同内容数] [每个内容平均购买次数] [查询次数]
+
+在临时SQLite库中生成消费项，测量索引重建耗时，以及按随机前缀（1~4个字）查询的 P50/P99，
+分别统计直接调用索引和通过HTTP接口（测试客户端）的耗时。
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WORDS = '牛奶面包鸡蛋大米食用油洗衣液纸巾牙膏洗发水苹果香蕉橙子猪肉牛肉鸡肉咖啡茶叶酸奶饼干巧克力矿泉水可乐啤酒毛巾袜子电池灯泡'
+
+def main():
+    distinct = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    per_item = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    queries = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import logging
+    logging.disable(logging.INFO)
+    from app import app, db
+    from app.models import Channel, MainType, Consumption
+    from app.models.suggest import get_content_index
+
+    random.seed(42)
+    contents = set()
+    while len(contents) < distinct:
+        contents.add(''.join(random.choice(WORDS) for _ in range(random.randint(2, 6))) + str(random.randint(0, 99)))
+    contents = sorted(contents)
+
+    with app.app_context():
+        db.session.add_all([Channel(name='淘宝'), MainType(name='食品')])
+        db.session.commit()
+        start = datetime(2024, 1, 1)
+        batch = []
+        total = 0
+        for content in contents:
+            for _ in range(random.randint(1, per_item * 2 - 1)):
+                batch.append({
+                    'content': content, 'quantity': 1, 'total_price': round(random.uniform(1, 200), 2),
+                    'channel_id': 1, 'main_type_id': 1, 'unit_coefficient': 1, 'receive_status': '已收货',
+                    'statistical_status': '计入', 'create_time': start + timedelta(minutes=random.randrange(1000000)),
+                    'min_unit_price': 0, 'daily_average_price': 0, 'is_deleted': False,
+                })
+                if len(batch) == 50000:
+                    db.session.execute(db.insert(Consumption), batch)
+                    total += len(batch)
+                    batch = []
+        db.session.execute(db.insert(Consumption), batch)
+        total += len(batch)
+        db.session.commit()
+        print(f'{distinct} 个不同内容，{total} 行消费项')
+
+        index = get_content_index()
+        begin = time.perf_counter()
+        index.build()
+        print(f'索引重建: {time.perf_counter() - begin:.2f} s')
+
+        prefixes = [content[:random.randint(1, 4)] for content in random.choices(contents, k=queries)]
+        timings = []
+        for prefix in prefixes:
+            begin = time.perf_counter()
+            index.suggest(prefix)
+            timings.append((time.perf_counter() - begin) * 1000)
+        timings.sort()
+        print(f'直接调用: P50 {statistics.median(timings):.2f} ms, P99 {timings[int(len(timings) * 0.99) - 1]:.2f} ms, '
+              f'最大 {timings[-1]:.2f} ms')
+
+    client = app.test_client()
+    timings = []
+    for prefix in prefixes:
+        begin = time.perf_counter()
+        response = client.get('/api/consumption/suggest', query_string={'prefix': prefix})
+        timings.append((time.perf_counter() - begin) * 1000)
+        assert response.status_code == 200
+    timings.sort()
+    print(f'HTTP接口: P50 {statistics.median(timings):.2f} ms, P99 {timings[int(len(timings) * 0.99) - 1]:.2f} ms')
+
+if __name__ == '__main__':
+    main()
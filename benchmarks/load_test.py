@@ -0,0 +1,302 @@
+"""并发压测：按真实比例混合请求，逐级提高并发数
+
+用法：
+    python benchmarks/load_test.py [--url http://127.0.0.1:5000] [--levels 1,4,8,16,32]
+                                   [--duration 10] [--rows 20000] [--output report.json]
+                                   [--baseline 上次的report.json] [--slo-p99 500]
+
+不指定 --url 时在进程内压测：在临时目录生成SQLite文件库并写入 --rows 行消费项，
+每个并发用户使用独立的测试客户端直接调用WSGI应用；指定 --url 时用 urllib 请求正在运行的服务
+（服务端需已有渠道、账单类型和统计类型数据）。
+
+请求组成（权重）：
+    list        按随机日期范围查询消费列表     30
+    price       按统计类型查询价格              20
+    statistics  按随机日期范围统计              20
+    create      新增消费项（部分为待收货）      10
+    update      修改已有消费项的总价            10
+    pending     查询待收货列表                   5
+    receive     确认收货                         5
+
+每个并发级别持续 --duration 秒，输出吞吐量、各接口 P50/P95/P99 和错误率，
+并写入JSON报告；指定 --baseline 时打印与上次报告的对比。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, datetime, timedelta
+
+CHANNELS = ['淘宝', '京东', '拼多多', '盒马', '线下超市']
+MAIN_TYPES = ['食品', '服装', '日用品', '数码', '交通']
+SUB_TYPES = [f'统计类型{i}' for i in range(20)]
+DATA_START = date(2024, 1, 1)
+DATA_DAYS = 730
+
+MIX = [
+    ('list', 30),
+    ('price', 20),
+    ('statistics', 20),
+    ('create', 10),
+    ('update', 10),
+    ('pending', 5),
+    ('receive', 5),
+]
+
+class InProcessClient:
+    """直接调用WSGI应用（每个并发用户一个测试客户端）"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self._client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+class HttpClient:
+    """通过HTTP请求正在运行的服务"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+class Scenario:
+    """生成各类请求，记录可供修改和确认收货的消费项ID"""
+
+    def __init__(self, ids):
+        self._lock = threading.Lock()
+        self.ids = list(ids)
+
+    def _date_range(self, rng):
+        start = DATA_START + timedelta(days=rng.randrange(DATA_DAYS))
+        end = start + timedelta(days=rng.choice([7, 30, 90, 365]))
+        return start.isoformat(), end.isoformat()
+
+    def run(self, name, client, rng):
+        """执行一个请求，返回状态码"""
+        if name == 'list':
+            start, end = self._date_range(rng)
+            return client.request('GET', f'/api/consumption?startDate={start}&endDate={end}')[0]
+        if name == 'price':
+            start, end = self._date_range(rng)
+            sub_type = urllib.request.quote(rng.choice(SUB_TYPES))
+            return client.request('GET', f'/api/consumption/type/{sub_type}?startDate={start}&endDate={end}')[0]
+        if name == 'statistics':
+            start, end = self._date_range(rng)
+            return client.request('GET', f'/api/consumption/statistics?startDate={start}&endDate={end}')[0]
+        if name == 'create':
+            status, body = client.request('POST', '/api/consumption', {
+                'content': f'压测商品{rng.randrange(1000)}', 'quantity': rng.randint(1, 5),
+                'total_price': round(rng.uniform(1, 500), 2), 'channel': rng.choice(CHANNELS),
+                'main_type': rng.choice(MAIN_TYPES), 'sub_type': rng.choice(SUB_TYPES),
+                'receive_status': '待收货' if rng.random() < 0.3 else '已收货',
+            })
+            if status == 201 and body:
+                with self._lock:
+                    self.ids.append(body['data']['id'])
+            return status
+        if name == 'update':
+            with self._lock:
+                id = rng.choice(self.ids)
+            return client.request('PUT', f'/api/consumption/{id}', {'total_price': round(rng.uniform(1, 500), 2)})[0]
+        if name == 'pending':
+            return client.request('GET', '/api/consumption/pending')[0]
+        if name == 'receive':
+            status, body = client.request('GET', '/api/consumption/pending')
+            items = (body or {}).get('data') or []
+            if status != 200 or not items:
+                return status
+            return client.request('PATCH', '/api/consumption/bulk', {
+                'ids': [rng.choice(items)['id']], 'operation': 'receive'
+            })[0]
+        raise ValueError(f'未知的请求类型: {name}')
+
+def percentile(sorted_values, p):
+    """最近秩百分位数"""
+    if not sorted_values:
+        return None
+    index = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def summarize(samples, elapsed):
+    """samples: [(接口, 耗时ms, 是否成功)]"""
+    endpoints = {}
+    for name, _ in MIX:
+        timings = sorted(ms for endpoint, ms, _ in samples if endpoint == name)
+        if not timings:
+            continue
+        errors = sum(1 for endpoint, _, ok in samples if endpoint == name and not ok)
+        endpoints[name] = {
+            'requests': len(timings),
+            'errors': errors,
+            'error_rate': round(errors / len(timings), 4),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+        }
+    timings = sorted(ms for _, ms, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0,
+        'error_rate': round(errors / len(samples), 4) if samples else 0,
+        'p50_ms': round(percentile(timings, 50), 2) if timings else None,
+        'p95_ms': round(percentile(timings, 95), 2) if timings else None,
+        'p99_ms': round(percentile(timings, 99), 2) if timings else None,
+        'endpoints': endpoints,
+    }
+
+def run_level(concurrency, duration, make_client, scenario, seed):
+    """以指定并发数持续压测，返回汇总结果"""
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(n):
+        rng = random.Random(seed * 1000 + n)
+        client = make_client()
+        local = []
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            begin = time.perf_counter()
+            try:
+                ok = scenario.run(name, client, rng) < 400
+            except Exception:
+                ok = False
+            local.append((name, (time.perf_counter() - begin) * 1000, ok))
+        with lock:
+            samples.extend(local)
+
+    begin = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = summarize(samples, time.perf_counter() - begin)
+    result['concurrency'] = concurrency
+    return result
+
+def seed_database(app, rows):
+    """在进程内压测的临时库中写入字典表和消费项，返回消费项ID"""
+    from app import db
+    from app.models import Channel, MainType, SubType, Consumption
+
+    rng = random.Random(42)
+    with app.app_context():
+        db.session.add_all([Channel(name=name) for name in CHANNELS])
+        db.session.add_all([MainType(name=name) for name in MAIN_TYPES])
+        db.session.add_all([SubType(name=name) for name in SUB_TYPES])
+        db.session.commit()
+        start = datetime.combine(DATA_START, datetime.min.time())
+        batch = []
+        for _ in range(rows):
+            total_price = round(rng.uniform(1, 500), 2)
+            batch.append({
+                'content': f'商品{rng.randrange(2000)}', 'quantity': 1, 'total_price': total_price,
+                'channel_id': rng.randint(1, len(CHANNELS)), 'main_type_id': rng.randint(1, len(MAIN_TYPES)),
+                'sub_type_id': rng.randint(1, len(SUB_TYPES)), 'unit_coefficient': 1,
+                'receive_status': '待收货' if rng.random() < 0.02 else '已收货', 'statistical_status': '计入',
+                'create_time': start + timedelta(minutes=rng.randrange(DATA_DAYS * 24 * 60)),
+                'min_unit_price': total_price, 'daily_average_price': 0, 'is_deleted': False,
+            })
+        if batch:
+            db.session.execute(db.insert(Consumption), batch)
+        db.session.commit()
+        return [id for (id,) in db.session.query(Consumption.id)]
+
+def compare(report, baseline):
+    """打印与上次报告的对比（吞吐量和各接口P99）"""
+    previous = {level['concurrency']: level for level in baseline.get('levels', [])}
+    print('\n与基线对比：')
+    for level in report['levels']:
+        old = previous.get(level['concurrency'])
+        if old is None:
+            continue
+        print(f'  并发 {level["concurrency"]}: 吞吐量 {old["throughput_rps"]} -> {level["throughput_rps"]} req/s')
+        for name, stats in level['endpoints'].items():
+            old_stats = old['endpoints'].get(name)
+            if old_stats:
+                change = (stats['p99_ms'] - old_stats['p99_ms']) / old_stats['p99_ms'] * 100 if old_stats['p99_ms'] else 0
+                print(f'    {name:<10} P99 {old_stats["p99_ms"]:>8.2f} -> {stats["p99_ms"]:>8.2f} ms ({change:+.1f}%)')
+
+def main():
+    parser = argparse.ArgumentParser(description='并发压测')
+    parser.add_argument('--url', help='压测正在运行的服务；不指定时在进程内压测')
+    parser.add_argument('--levels', default='1,4,8,16,32', help='逐级并发数，逗号分隔')
+    parser.add_argument('--duration', type=float, default=10, help='每级持续秒数')
+    parser.add_argument('--rows', type=int, default=20000, help='进程内压测时生成的消费项行数')
+    parser.add_argument('--output', default='load_test_report.json', help='JSON报告路径')
+    parser.add_argument('--baseline', help='用于对比的上次JSON报告')
+    parser.add_argument('--slo-p99', type=float, default=500, help='整体P99上限（毫秒），用于给出可承受的最大并发数')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(',')]
+
+    import logging
+    logging.disable(logging.INFO)
+    if args.url:
+        target = args.url
+        make_client = lambda: HttpClient(args.url)
+        status, body = make_client().request('GET', '/api/consumption')
+        ids = [item['id'] for item in (body or {}).get('data') or []] or [1]
+    else:
+        tmp = tempfile.mkdtemp()
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "load.db")}'
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from app import app
+        target = 'in-process'
+        ids = seed_database(app, args.rows)
+        make_client = lambda: InProcessClient(app)
+        print(f'进程内压测，{len(ids)} 行消费项')
+
+    scenario = Scenario(ids)
+    report = {
+        'target': target,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'duration': args.duration,
+        'rows': len(ids),
+        'mix': dict(MIX),
+        'slo_p99_ms': args.slo_p99,
+        'levels': [],
+    }
+    print(f'{"并发":>6} {"请求数":>8} {"吞吐量/s":>10} {"错误率":>8} {"P50":>8} {"P95":>8} {"P99":>8}')
+    for seed, concurrency in enumerate(levels):
+        result = run_level(concurrency, args.duration, make_client, scenario, seed)
+        report['levels'].append(result)
+        print(f'{concurrency:>6} {result["requests"]:>8} {result["throughput_rps"]:>10} {result["error_rate"]:>8.2%} '
+              f'{result["p50_ms"]:>8} {result["p95_ms"]:>8} {result["p99_ms"]:>8}')
+
+    # 整体P99未超限且无错误的最大并发数
+    within = [level['concurrency'] for level in report['levels']
+              if level['p99_ms'] is not None and level['p99_ms'] <= args.slo_p99 and level['error_rate'] == 0]
+    report['max_concurrency_within_slo'] = max(within) if within else None
+    print(f'P99 <= {args.slo_p99} ms 且无错误的最大并发数: {report["max_concurrency_within_slo"]}')
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'报告已写入 {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+if __name__ == '__main__':
+    main()
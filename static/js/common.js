@@ -273,4 +273,37 @@ function executeMobileConfirm() {
         window.mobileConfirmCallback();
     }
     closeMobileConfirm();
-}
\ No newline at end of file
+}
+/**
+ * 按需加载脚本，同一地址只加载一次
+ * @param {string} src - 脚本地址
+ * @returns {Promise}
+ */
+const loadedScripts = {};
+function loadScript(src) {
+    if (!loadedScripts[src]) {
+        loadedScripts[src] = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = src;
+            script.onload = resolve;
+            script.onerror = () => {
+                delete loadedScripts[src];
+                reject(new Error(`脚本加载失败: ${src}`));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return loadedScripts[src];
+}
+
+/**
+ * 按需加载ECharts（地址由页面的 <meta name="echarts-src"> 提供）
+ * @returns {Promise}
+ */
+function loadEcharts() {
+    if (window.echarts) {
+        return Promise.resolve(window.echarts);
+    }
+    const src = document.querySelector('meta[name="echarts-src"]').content;
+    return loadScript(src).then(() => window.echarts);
+}
@@ -0,0 +1,93 @@
+import os
+import pytest
+
+# 导入app时会创建模块级应用实例，需要先设置数据库地址
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+from app import create_app
+from app.models import Channel, MainType, SubType, Consumption
+from app import db
+from datetime import datetime
+
+@pytest.fixture
+def app():
+    """创建Flask应用实例"""
+    import os
+    # 保存原始环境变量
+    original_env = os.environ.get('DATABASE_URL')
+    # 设置测试环境变量
+    os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+    
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    yield app
+    
+    # 恢复原始环境变量
+    if original_env:
+        os.environ['DATABASE_URL'] = original_env
+    else:
+        del os.environ['DATABASE_URL']
+
+@pytest.fixture
+def client(app):
+    """创建测试客户端"""
+    return app.test_client()
+
+@pytest.fixture
+def init_db(app):
+    """初始化数据库"""
+    with app.app_context():
+        db.create_all()
+        # 添加测试数据
+        channel1 = Channel(name='淘宝')
+        channel2 = Channel(name='京东')
+        main_type1 = MainType(name='食品')
+        main_type2 = MainType(name='服装')
+        sub_type1 = SubType(name='日常用品')
+        sub_type2 = SubType(name='电子产品')
+        
+        db.session.add_all([channel1, channel2, main_type1, main_type2, sub_type1, sub_type2])
+        db.session.commit()
+        
+        # 添加测试消费数据
+        consumption1 = Consumption(
+            content='测试商品1',
+            quantity=2,
+            total_price=200.0,
+            channel='淘宝',
+            main_type='食品',
+            sub_type='日常用品',
+            receive_status='已收货',
+            is_deleted=False,
+            create_time=datetime.now()
+        )
+        
+        consumption2 = Consumption(
+            content='测试商品2',
+            quantity=1,
+            total_price=50.0,
+            channel='京东',
+            main_type='服装',
+            sub_type='电子产品',
+            receive_status='已收货',
+            is_deleted=False,
+            create_time=datetime.now()
+        )
+        
+        db.session.add_all([consumption1, consumption2])
+        db.session.commit()
+        
+        yield
+        
+        db.drop_all()
+
+@pytest.fixture
+def put_consumption(client):
+    """按当前版本号修改消费项（修改消费项必须携带读取时的版本号）"""
+    def put(id, data):
+        version = client.get(f'/api/consumption/{id}').get_json()['data']['version']
+        return client.put(f'/api/consumption/{id}', json={**data, 'version': version})
+    return put
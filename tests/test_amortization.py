@@ -0,0 +1,71 @@
+import random
+from datetime import date, timedelta
+from app.models.amortization import amortize_daily
+
+def brute_force(items, start, end):
+    """逐天循环的参考实现"""
+    values = []
+    day = start
+    while day <= end:
+        amount = 0.0
+        for item_start, item_end, total_price in items:
+            days = (item_end - item_start).days + 1
+            if days > 0 and item_start <= day <= item_end:
+                amount += total_price / days
+        values.append(amount)
+        day += timedelta(days=1)
+    return values
+
+def test_amortize_daily_matches_brute_force():
+    """测试差分数组结果与逐天循环一致"""
+    rng = random.Random(7)
+    base = date(2025, 1, 1)
+    for _ in range(20):
+        items = []
+        for _ in range(rng.randint(0, 60)):
+            item_start = base + timedelta(days=rng.randint(-100, 500))
+            item_end = item_start + timedelta(days=rng.randint(-3, 400))
+            items.append((item_start, item_end, round(rng.uniform(0, 1000), 2)))
+        start = base + timedelta(days=rng.randint(-50, 300))
+        end = start + timedelta(days=rng.randint(0, 200))
+        
+        expected = brute_force(items, start, end)
+        actual = amortize_daily(items, start, end)
+        assert len(actual) == len(expected)
+        for a, b in zip(actual, expected):
+            assert abs(a - b) < 1e-6
+
+def test_amortize_daily_empty_range():
+    """测试结束日期早于开始日期"""
+    assert amortize_daily([(date(2025, 1, 1), date(2025, 1, 2), 10)], date(2025, 1, 2), date(2025, 1, 1)) == []
+
+def test_get_amortized_statistics(client, init_db, put_consumption):
+    """测试分摊后的每日花费接口"""
+    put_consumption(1, {'start_use_time': '2026-01-01', 'end_use_time': '2026-01-10'})
+    put_consumption(2, {'start_use_time': '2026-01-06', 'end_use_time': '2026-01-15'})
+    
+    response = client.get('/api/consumption/amortized?startDate=2026-01-05&endDate=2026-01-06')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['dates'] == ['2026-01-05', '2026-01-06']
+    assert data['series'][0]['values'] == [20.0, 25.0]
+    assert data['total'] == 45.0
+    
+    response = client.get('/api/consumption/amortized?startDate=2026-01-05&endDate=2026-01-06&group_by=main_type')
+    series = {item['name']: item['values'] for item in response.get_json()['data']['series']}
+    assert series == {'食品': [20.0, 20.0], '服装': [0.0, 5.0]}
+    
+    response = client.get('/api/consumption/amortized?startDate=2026-01-05&endDate=2026-01-06&group_by=content')
+    assert response.status_code == 400
+
+def test_amortized_single_use_date_and_range_limit(client, init_db, put_consumption):
+    """测试只填写开始使用时间且晚于购买日期时计入开始当天，日期范围过长返回400"""
+    put_consumption(1, {'purchase_time': '2026-01-01 10:00:00', 'start_use_time': '2026-02-01'})
+    response = client.get('/api/consumption/amortized?startDate=2026-01-01&endDate=2026-02-01')
+    data = response.get_json()['data']
+    assert data['series'][0]['values'][-1] == 200.0
+    assert data['total'] == 200.0
+    
+    response = client.get('/api/consumption/amortized?startDate=2020-01-01&endDate=2026-01-01')
+    assert response.status_code == 400
+    assert '不能超过' in response.get_json()['message']
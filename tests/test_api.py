@@ -1,84 +1,5 @@
-import pytest
-from app import create_app
-from app.models import Channel, MainType, SubType, Consumption
-from app import db
 from datetime import datetime
 
-@pytest.fixture
-def app():
-    """创建Flask应用实例"""
-    import os
-    # 保存原始环境变量
-    original_env = os.environ.get('DATABASE_URL')
-    # 设置测试环境变量
-    os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
-    
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
-    yield app
-    
-    # 恢复原始环境变量
-    if original_env:
-        os.environ['DATABASE_URL'] = original_env
-    else:
-        del os.environ['DATABASE_URL']
-
-@pytest.fixture
-def client(app):
-    """创建测试客户端"""
-    return app.test_client()
-
-@pytest.fixture
-def init_db(app):
-    """初始化数据库"""
-    with app.app_context():
-        db.create_all()
-        # 添加测试数据
-        channel1 = Channel(name='淘宝')
-        channel2 = Channel(name='京东')
-        main_type1 = MainType(name='食品')
-        main_type2 = MainType(name='服装')
-        sub_type1 = SubType(name='日常用品')
-        sub_type2 = SubType(name='电子产品')
-        
-        db.session.add_all([channel1, channel2, main_type1, main_type2, sub_type1, sub_type2])
-        db.session.commit()
-        
-        # 添加测试消费数据
-        consumption1 = Consumption(
-            content='测试商品1',
-            quantity=2,
-            total_price=200.0,
-            channel='淘宝',
-            main_type='食品',
-            sub_type='日常用品',
-            receive_status='已收货',
-            is_deleted=False,
-            create_time=datetime.now()
-        )
-        
-        consumption2 = Consumption(
-            content='测试商品2',
-            quantity=1,
-            total_price=50.0,
-            channel='京东',
-            main_type='服装',
-            sub_type='电子产品',
-            receive_status='已收货',
-            is_deleted=False,
-            create_time=datetime.now()
-        )
-        
-        db.session.add_all([consumption1, consumption2])
-        db.session.commit()
-        
-        yield
-        
-        db.drop_all()
-
 # 渠道相关测试
 def test_get_channels(client, init_db):
     """测试获取渠道列表"""
@@ -114,6 +35,38 @@ def test_delete_channel(client, init_db):
     assert data['success'] == True
     assert data['message'] == '渠道删除成功！'
 
+def test_lookup_cache_misses_and_uncommitted_rows(app, init_db):
+    """测试字典缓存：未命中不重复加载整表，未提交的新字典项不写入缓存"""
+    from app import db
+    from app.models import Channel
+    from app.models.lookup import get_lookup_cache
+
+    cache = get_lookup_cache()
+    cache.invalidate()
+    loads = []
+    original_load = cache._load
+    cache._load = lambda model: (loads.append(model), original_load(model))[1]
+    assert cache.get_id(Channel, '淘宝') == 1
+    assert cache.get_id(Channel, '不存在') is None
+    assert cache.get_name(Channel, 99) is None
+    assert len(loads) == 1
+
+    # 事务中新建的字典项本事务可见，回滚后不残留在缓存中
+    id = cache.get_or_create_id(Channel, '拼多多')
+    assert cache.get_id(Channel, '拼多多') == id
+    assert cache.get_name(Channel, id) == '拼多多'
+    db.session.rollback()
+    assert cache.get_id(Channel, '拼多多') is None
+    assert cache.get_name(Channel, id) is None
+
+    # 提交后数据版本变化，未命中时重新加载一次
+    id = cache.get_or_create_id(Channel, '拼多多')
+    db.session.commit()
+    loads.clear()
+    assert cache.get_name(Channel, id) == '拼多多'
+    assert cache.get_id(Channel, '拼多多') == id
+    assert len(loads) == 1
+
 # 账单类型相关测试
 def test_get_main_types(client, init_db):
     """测试获取账单类型列表"""
@@ -193,6 +146,52 @@ def test_get_consumptions(client, init_db):
     assert data['success'] == True
     assert len(data['data']) == 2
 
+def test_get_consumptions_paged(client, init_db):
+    """测试分页获取消费列表"""
+    first = client.get('/api/consumption?limit=1').get_json()
+    assert len(first['data']) == 1
+    assert first['has_more'] == True
+    assert first['next_offset'] == 1
+
+    second = client.get(f"/api/consumption?limit=1&offset={first['next_offset']}").get_json()
+    assert second['has_more'] == False
+    assert second['next_offset'] == 2
+    ids = [item['id'] for item in client.get('/api/consumption').get_json()['data']]
+    assert [first['data'][0]['id'], second['data'][0]['id']] == ids
+    assert 'has_more' not in client.get('/api/consumption').get_json()
+
+def test_get_consumptions_with_fields(app, client, init_db, put_consumption):
+    """测试 fields 参数：只查询所需的列，只返回指定字段，不支持的字段返回400"""
+    from app import db
+    from sqlalchemy import event
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        data = client.get('/api/consumption?fields=id,content,channel,total_price').get_json()['data']
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert data[0] == {'id': 2, 'content': '测试商品2', 'channel': '京东', 'total_price': 50.0}
+    select = next(s for s in statements if 'FROM consumption' in s)
+    assert 'channel_id' in select and 'evaluate' not in select and 'quantity' not in select
+
+    item = client.get('/api/consumption/1?fields=content,sub_type').get_json()['data']
+    assert item == {'content': '测试商品1', 'sub_type': '日常用品'}
+    put_consumption(1, {'receive_status': '待收货'})
+    pending = client.get('/api/consumption/pending?fields=id,receive_status').get_json()['data']
+    assert pending == [{'id': 1, 'receive_status': '待收货'}]
+    put_consumption(1, {'receive_status': '已收货'})
+    by_type = client.get('/api/consumption/type/日常用品?fields=min_unit_price').get_json()['data']
+    assert by_type == [{'min_unit_price': 100.0}]
+    assert client.get('/api/consumption/type/日常用品').get_json()['data'][0]['content'] == '测试商品1'
+
+    for url in ('/api/consumption?fields=content,password', '/api/consumption/1?fields=', '/api/consumption/pending?fields=__class__'):
+        response = client.get(url)
+        assert response.status_code == 400
+        assert '不支持的字段' in response.get_json()['message']
+
 def test_get_consumption_by_type(client, init_db):
     """测试按类型获取消费项"""
     response = client.get('/api/consumption/type/日常用品')
@@ -201,6 +200,136 @@ def test_get_consumption_by_type(client, init_db):
     assert data['success'] == True
     assert len(data['data']) >= 1
 
+def test_rename_sub_type_applies_to_consumption(client, init_db):
+    """测试统计类型改名后消费项随之改名"""
+    client.put('/api/sub-type/1', json={'name': '生活用品'})
+    response = client.get('/api/consumption/type/生活用品')
+    data = response.get_json()
+    assert len(data['data']) == 1
+    assert data['data'][0]['sub_type'] == '生活用品'
+    
+    response = client.get('/api/consumption/type/日常用品')
+    assert response.get_json()['data'] == []
+
+def test_delete_used_channel_keeps_name(client, init_db):
+    """测试删除仍被引用的渠道后消费项保留渠道名称"""
+    client.delete('/api/channel/1')
+    response = client.get('/api/channel')
+    assert [item['name'] for item in response.get_json()['data']] == ['京东']
+    
+    response = client.get('/api/consumption')
+    channels = {item['channel'] for item in response.get_json()['data']}
+    assert channels == {'淘宝', '京东'}
+    
+    # 重新添加同名渠道时恢复原记录
+    response = client.post('/api/channel', json={'name': '淘宝'})
+    assert response.status_code == 201
+    assert response.get_json()['data']['id'] == 1
+
+def test_create_consumption_with_new_channel(client, init_db):
+    """测试创建消费项时自动创建不存在的渠道"""
+    response = client.post('/api/consumption', json={
+        'content': '测试商品3',
+        'quantity': 1,
+        'total_price': 30.0,
+        'channel': '拼多多',
+        'main_type': '食品'
+    })
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['data']['channel'] == '拼多多'
+    assert data['data']['sub_type'] is None
+
+def test_update_consumption_version_conflict(client, init_db):
+    """测试带版本号修改：版本一致时更新并递增版本号，已被他人修改时返回409，缺少版本号时返回400"""
+    item = client.get('/api/consumption/1').get_json()['data']
+    assert item['version'] == 1
+
+    response = client.put('/api/consumption/1', json={'quantity': 4, 'version': 1})
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['version'] == 2
+    # 未修改的字段保持不变，派生价格按新数量和原总价计算
+    assert data['content'] == '测试商品1'
+    assert data['min_unit_price'] == 50.0
+
+    # 使用过期的版本号修改被拒绝，返回当前数据
+    response = client.put('/api/consumption/1', json={'content': '覆盖', 'version': 1})
+    assert response.status_code == 409
+    assert response.get_json()['data']['version'] == 2
+    assert client.get('/api/consumption/1').get_json()['data']['content'] == '测试商品1'
+    # 不带版本号的修改被拒绝，不会覆盖他人的修改
+    response = client.put('/api/consumption/1', json={'content': '覆盖'})
+    assert response.status_code == 400
+    assert client.get('/api/consumption/1').get_json()['data']['version'] == 2
+    # 被拒绝的修改不会创建新的字典项
+    response = client.put('/api/consumption/1', json={'channel': '拼多多', 'version': 1})
+    assert response.status_code == 409
+    assert '拼多多' not in [item['name'] for item in client.get('/api/channel').get_json()['data']]
+    assert client.put('/api/consumption/99', json={'channel': '拼多多', 'version': 1}).status_code == 404
+    assert '拼多多' not in [item['name'] for item in client.get('/api/channel').get_json()['data']]
+
+    # 批量操作同样递增版本号
+    client.patch('/api/consumption/bulk', json={'ids': [1], 'operation': 'set_tag', 'value': '常买'})
+    assert client.put('/api/consumption/1', json={'tag': '其他', 'version': 2}).status_code == 409
+    assert client.put('/api/consumption/1', json={'tag': '其他', 'version': 3}).status_code == 200
+
+    client.delete('/api/consumption/1')
+    assert client.put('/api/consumption/1', json={'tag': '其他', 'version': 4}).status_code == 404
+
+def test_update_consumption_skips_unaffected_bookkeeping(app, client, init_db, put_consumption):
+    """测试只修改标签时不维护累计支出和价格摘要：条件UPDATE、递增数据版本、读取预算共3条语句"""
+    from app import db
+    from sqlalchemy import event
+
+    put_consumption(2, {'tag': '其他'})
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.put('/api/consumption/1', json={'tag': '常买', 'version': 1})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.get_json()['data']['tag'] == '常买'
+    assert len(statements) == 3
+    assert not any(statement.startswith(('UPDATE monthly_spend', 'INSERT INTO monthly_spend', 'UPDATE price_sketches'))
+                   for statement in statements)
+
+def test_delete_consumption(client, init_db):
+    """测试删除消费项"""
+    response = client.delete('/api/consumption/1')
+    assert response.status_code == 200
+    response = client.delete('/api/consumption/1')
+    assert response.status_code == 404
+
+def test_bulk_receive_consumption(client, init_db, put_consumption):
+    """测试批量确认收货"""
+    put_consumption(1, {'receive_status': '待收货'})
+    put_consumption(2, {'receive_status': '待收货'})
+    response = client.patch('/api/consumption/bulk', json={'ids': [1, 2, 99], 'operation': 'receive'})
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['updated'] == 2
+    assert {item['receive_status'] for item in data['items']} == {'已收货'}
+    assert {item['statistical_status'] for item in data['items']} == {'计入'}
+    
+    # 已收货的不会重复更新，也不出现在返回的行中
+    response = client.patch('/api/consumption/bulk', json={'ids': [1], 'operation': 'receive'})
+    assert response.get_json()['data'] == {'updated': 0, 'items': []}
+    put_consumption(2, {'receive_status': '待收货'})
+    response = client.patch('/api/consumption/bulk', json={'ids': [1, 2], 'operation': 'receive'})
+    assert [item['id'] for item in response.get_json()['data']['items']] == [2]
+
+def test_bulk_set_pickup_code_and_delete(client, init_db):
+    """测试批量设置取件码和批量删除"""
+    response = client.patch('/api/consumption/bulk', json={'ids': [1, 2], 'operation': 'set_pickup_code', 'value': 'A-12'})
+    assert [item['pickup_code'] for item in response.get_json()['data']['items']] == ['A-12', 'A-12']
+    
+    response = client.patch('/api/consumption/bulk', json={'ids': [1, 2], 'operation': 'delete'})
+    assert response.get_json()['data'] == {'updated': 2, 'items': []}
+    assert client.get('/api/consumption').get_json()['data'] == []
+
 # 统计数据相关测试
 def test_get_statistics(client, init_db):
     """测试获取统计数据"""
@@ -0,0 +1,49 @@
+from app.assets import build_assets, load_manifest, IMMUTABLE_CACHE_CONTROL
+import os
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def test_build_assets_hashes_by_content(tmp_path):
+    """测试构建时按内容生成带哈希的文件名"""
+    static = str(tmp_path)
+    _write(os.path.join(static, 'js', 'common.js'), 'console.log(1);')
+    _write(os.path.join(static, 'css', 'style.css'), 'body {}')
+    _write(os.path.join(static, 'favicon.ico'), 'icon')
+    
+    manifest = build_assets(static)
+    assert set(manifest) == {'js/common.js', 'css/style.css'}
+    assert manifest['js/common.js'].startswith('dist/js/common.')
+    assert os.path.exists(os.path.join(static, *manifest['js/common.js'].split('/')))
+    assert load_manifest(static) == manifest
+    
+    # 内容不变则文件名不变，内容变化则文件名变化，旧文件被清理
+    assert build_assets(static) == manifest
+    _write(os.path.join(static, 'js', 'common.js'), 'console.log(2);')
+    rebuilt = build_assets(static)
+    assert rebuilt['js/common.js'] != manifest['js/common.js']
+    assert rebuilt['css/style.css'] == manifest['css/style.css']
+    assert not os.path.exists(os.path.join(static, *manifest['js/common.js'].split('/')))
+
+def test_asset_url_and_immutable_cache(app, client, init_db, tmp_path):
+    """测试模板引用带哈希的地址，且带哈希的资源返回长期缓存头"""
+    _write(os.path.join(str(tmp_path), 'css', 'style.css'), 'body {}')
+    app.static_folder = str(tmp_path)
+    app.extensions['asset_manifest'] = build_assets(app.static_folder)
+    hashed = app.extensions['asset_manifest']['css/style.css']
+    
+    html = client.get('/pending').get_data(as_text=True)
+    assert f'/static/{hashed}' in html
+    
+    response = client.get(f'/static/{hashed}')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    response.close()
+
+def test_asset_url_falls_back_without_manifest(client, init_db):
+    """测试未构建清单时使用原始路径"""
+    html = client.get('/price').get_data(as_text=True)
+    assert '/static/js/common.js' in html
+    assert '<meta name="echarts-src"' in html
@@ -0,0 +1,113 @@
+import gzip
+import json
+import pytest
+from app import create_app, db
+from app.backup import BACKUP_TABLES, _snapshot, backup_ledger, restore_ledger
+from app.models import Channel, Consumption
+from sqlalchemy import select
+
+def _create_file_app(path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{path}')
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """备份读取快照时与写入并发，使用文件数据库"""
+    app = _create_file_app(tmp_path / 'ledger.db', monkeypatch)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+def _dump_tables(app):
+    with app.app_context():
+        return {
+            name: [tuple(row) for row in db.session.execute(
+                select(db.metadata.tables[name]).order_by(*db.metadata.tables[name].primary_key.columns)
+            )]
+            for name in BACKUP_TABLES
+        }
+
+def test_backup_restore_round_trip(app, client, init_db, tmp_path, monkeypatch):
+    """测试备份后恢复到新库，各表数据完全一致，派生数据随之重建"""
+    client.post('/api/consumption', json={
+        'content': '纸巾', 'quantity': 2, 'total_price': 19.9, 'channel': '拼多多', 'main_type': '食品',
+        'sub_type': '日常用品', 'start_use_time': '2026-01-01', 'end_use_time': '2026-01-31', 'evaluate': '好用\n"划算"'
+    })
+    client.post('/api/consumption/1/usage', json={'records': [{'quantity': 1, 'start_use_time': '2026-01-01', 'end_use_time': '2026-01-10'}]})
+    client.put('/api/budget', json={'main_type': '食品', 'amount': 500})
+    expected = _dump_tables(app)
+    assert all(expected[name] for name in BACKUP_TABLES)
+
+    path = str(tmp_path / 'ledger.backup.gz')
+    result = app.test_cli_runner().invoke(args=['ledger', 'backup', path, '--chunk-size', '1'])
+    assert result.exit_code == 0, result.output
+    assert '备份完成' in result.output
+
+    restored = _create_file_app(tmp_path / 'restored.db', monkeypatch)
+    runner = restored.test_cli_runner()
+    # init_db 保持着原应用的上下文，命令行需在新库的应用上下文中执行
+    with restored.app_context():
+        result = runner.invoke(args=['ledger', 'restore', path])
+        assert result.exit_code == 0, result.output
+        assert _dump_tables(restored) == expected
+
+        # 恢复后按月累计支出已重建，已有数据时需 --force
+        assert restored.test_client().get('/api/budget').get_json()['data'][0]['spent'] == 219.9
+        assert runner.invoke(args=['ledger', 'reconcile-budgets']).exit_code == 0
+        result = runner.invoke(args=['ledger', 'restore', path])
+        assert result.exit_code == 1
+        assert '--force' in result.output
+        assert runner.invoke(args=['ledger', 'restore', path, '--force']).exit_code == 0
+        assert _dump_tables(restored) == expected
+
+        # 不完整的备份文件整体放弃，原数据不受影响
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            lines = f.readlines()
+        truncated = str(tmp_path / 'truncated.gz')
+        with gzip.open(truncated, 'wt', encoding='utf-8') as f:
+            f.writelines(lines[:-2])
+        result = runner.invoke(args=['ledger', 'restore', truncated, '--force'])
+        assert result.exit_code == 1
+        assert '不完整' in result.output
+        assert _dump_tables(restored) == expected
+        db.engine.dispose()
+
+def test_backup_snapshot_does_not_block_writers(app, init_db):
+    """测试快照读取期间写入不被阻塞，快照内看不到之后提交的数据"""
+    with app.app_context():
+        with _snapshot(db.engine) as connection:
+            before = connection.execute(select(db.func.count()).select_from(Consumption)).scalar()
+            db.session.add(Channel(name='拼多多'))
+            db.session.execute(db.update(Consumption).where(Consumption.id == 1).values(content='已修改'))
+            db.session.commit()
+            assert connection.execute(select(db.func.count()).select_from(Channel)).scalar() == 2
+            assert connection.execute(select(Consumption.content).where(Consumption.id == 1)).scalar() == '测试商品1'
+            assert before == 2
+
+def test_restore_backup_from_older_schema(app, init_db, tmp_path, monkeypatch):
+    """测试恢复旧结构版本的备份：备份中没有的列按默认值写入"""
+    path = str(tmp_path / 'ledger.backup.gz')
+    backup_ledger(db.engine, path)
+
+    # 改写为增加 version 列之前的备份
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        chunks = [json.loads(line) for line in f]
+    position = chunks[0]['tables']['consumption'].index('version')
+    chunks[0]['schema_version'] = 1
+    del chunks[0]['tables']['consumption'][position]
+    for chunk in chunks:
+        if chunk.get('table') == 'consumption':
+            for row in chunk['rows']:
+                del row[position]
+    older = str(tmp_path / 'older.backup.gz')
+    with gzip.open(older, 'wt', encoding='utf-8') as f:
+        f.writelines(json.dumps(chunk) + '\n' for chunk in chunks)
+
+    restored = _create_file_app(tmp_path / 'restored.db', monkeypatch)
+    with restored.app_context():
+        assert restore_ledger(db.engine, older)['consumption'] == 2
+        assert [c.version for c in Consumption.query.order_by(Consumption.id)] == [1, 1]
+        assert db.session.get(Consumption, 1).content == '测试商品1'
+        db.engine.dispose()
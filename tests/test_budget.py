@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+def _spent(client):
+    data = client.get('/api/budget').get_json()['data']
+    return {item['main_type']: item['spent'] for item in data}
+
+def test_running_totals_follow_consumption_writes(app, client, init_db, put_consumption):
+    """测试新增、跨月/跨类型修改、确认收货和删除都同步维护累计支出"""
+    runner = app.test_cli_runner()
+    # init_db 直接写表，累计支出为空，核对不一致后修正
+    assert runner.invoke(args=['ledger', 'reconcile-budgets']).exit_code == 1
+    assert runner.invoke(args=['ledger', 'reconcile-budgets', '--fix']).exit_code == 0
+
+    assert client.put('/api/budget', json={'main_type': '食品', 'amount': 300}).status_code == 200
+    client.put('/api/budget', json={'main_type': '服装', 'amount': 100})
+    assert _spent(client) == {'食品': 200.0, '服装': 50.0}
+
+    payload = {'content': '零食', 'quantity': 1, 'total_price': 150, 'channel': '淘宝', 'main_type': '食品'}
+    budget = client.post('/api/consumption', json=payload).get_json()['data']['budget']
+    assert budget == {'month': datetime.now().strftime('%Y-%m'), 'main_type': '食品', 'budget': 300.0,
+                      'spent': 350.0, 'remaining': -50.0, 'over_budget': True}
+
+    # 修改到上个月并换成服装：从本月食品移出
+    last_month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%Y-%m-%d 12:00')
+    put_consumption(3, {'purchase_time': last_month, 'main_type': '服装', 'total_price': 120})
+    assert _spent(client) == {'食品': 200.0, '服装': 50.0}
+    assert client.get(f'/api/budget?month={last_month[:7]}').get_json()['data'][1]['spent'] == 120.0
+
+    # 待收货不计入，确认收货后计入，批量删除后移出
+    pending = client.post('/api/consumption', json={**payload, 'total_price': 80, 'receive_status': '待收货'}).get_json()['data']
+    assert pending['budget']['spent'] == 200.0
+    client.patch('/api/consumption/bulk', json={'ids': [pending['id']], 'operation': 'receive'})
+    assert _spent(client)['食品'] == 280.0
+    client.patch('/api/consumption/bulk', json={'ids': [pending['id'], 2], 'operation': 'delete'})
+    assert _spent(client) == {'食品': 200.0, '服装': 0.0}
+    client.delete('/api/consumption/1')
+    assert _spent(client)['食品'] == 0.0
+
+    result = runner.invoke(args=['ledger', 'reconcile-budgets'])
+    assert result.exit_code == 0
+    assert '一致' in result.output
+
+def test_budget_api_and_index_page(client, init_db):
+    """测试预算设置、删除和首页展示"""
+    assert client.put('/api/budget', json={'main_type': '不存在', 'amount': 1}).status_code == 404
+    assert client.put('/api/budget', json={'main_type': '食品', 'amount': -1}).status_code == 400
+    assert client.get('/api/budget?month=2026-13').status_code == 400
+
+    client.put('/api/budget', json={'main_type': '食品', 'amount': 500})
+    client.put('/api/budget', json={'main_type': '食品', 'amount': 600})
+    data = client.get('/api/budget').get_json()['data']
+    assert [(item['main_type'], item['budget']) for item in data] == [('食品', 600.0)]
+
+    html = client.get('/').get_data(as_text=True)
+    assert 'id="budgetCard"' in html
+    assert '预算 ¥600.00' in html
+
+    assert client.delete('/api/budget/食品').status_code == 200
+    assert client.delete('/api/budget/食品').status_code == 404
+    assert 'id="budgetCard"' not in client.get('/').get_data(as_text=True)
+
+def test_monthly_spend_seeded_when_table_created(app, client, init_db):
+    """测试为已有账本新建 monthly_spend 时按消费项写入初始累计，之后的写入用 upsert 累加"""
+    from app import db
+    from app.models import MonthlySpend
+
+    with app.app_context():
+        MonthlySpend.__table__.drop(db.engine)
+        db.create_all()
+    client.put('/api/budget', json={'main_type': '食品', 'amount': 300})
+    client.put('/api/budget', json={'main_type': '服装', 'amount': 100})
+    assert _spent(client) == {'食品': 200.0, '服装': 50.0}
+
+    client.post('/api/consumption', json={'content': '零食', 'quantity': 1, 'total_price': 30, 'channel': '淘宝', 'main_type': '食品'})
+    assert _spent(client)['食品'] == 230.0
+    assert app.test_cli_runner().invoke(args=['ledger', 'reconcile-budgets']).exit_code == 0
@@ -0,0 +1,34 @@
+def _post(client, price, channel, purchase_time, sub_type='日常用品'):
+    response = client.post('/api/consumption', json={
+        'content': '纸巾', 'quantity': 1, 'total_price': price, 'channel': channel,
+        'main_type': '食品', 'sub_type': sub_type, 'purchase_time': purchase_time
+    })
+    assert response.status_code == 201
+
+def test_channel_ranking_by_type_and_bulk(client, init_db):
+    """测试渠道单价排行：按最低价排序，最近价格取最后一次购买，写入后缓存失效"""
+    _post(client, 10, '淘宝', '2026-01-01 10:00')
+    _post(client, 8, '淘宝', '2026-02-01 10:00')
+    _post(client, 12, '淘宝', '2026-03-01 10:00')
+    _post(client, 9, '京东', '2026-02-15 10:00')
+
+    data = client.get('/api/consumption/type/日常用品/channels').get_json()['data']
+    assert data == [
+        {'rank': 1, 'channel': '淘宝', 'count': 3, 'min_price': 8.0, 'avg_price': 10.0,
+         'latest_price': 12.0, 'last_purchase_date': '2026-03-01'},
+        {'rank': 2, 'channel': '京东', 'count': 1, 'min_price': 9.0, 'avg_price': 9.0,
+         'latest_price': 9.0, 'last_purchase_date': '2026-02-15'},
+    ]
+
+    # 新的消费项递增数据版本，缓存的排行随之失效
+    _post(client, 5, '京东', '2026-03-02 10:00')
+    data = client.get('/api/consumption/type/日常用品/channels').get_json()['data']
+    assert [(item['channel'], item['min_price'], item['latest_price']) for item in data] == [('京东', 5.0, 5.0), ('淘宝', 8.0, 12.0)]
+
+    _post(client, 3000, '京东', '2026-03-03 10:00', sub_type='电子产品')
+    rankings = client.get('/api/consumption/channels').get_json()['data']
+    assert set(rankings) == {'日常用品', '电子产品'}
+    assert rankings['日常用品'] == data
+    assert rankings['电子产品'][0]['count'] == 1
+
+    assert client.get('/api/consumption/type/不存在/channels').get_json()['data'] == []
@@ -0,0 +1,56 @@
+from app import db
+from app.models import Consumption
+from datetime import date, datetime
+import json
+import re
+
+def _add(content, total_price, create_time, channel='淘宝', sub_type='日常用品', receive_status='已收货'):
+    db.session.add(Consumption(
+        content=content, quantity=1, total_price=total_price, channel=channel, main_type='食品',
+        sub_type=sub_type, receive_status=receive_status, create_time=create_time
+    ))
+
+def test_dashboard_summary(app, client, init_db):
+    """测试概览：本期合计、环比、排行、待收货数量"""
+    with app.app_context():
+        _add('本期1', 100, datetime(2026, 5, 3), channel='京东')
+        _add('本期2', 40, datetime(2026, 5, 20), sub_type='电子产品')
+        _add('上期', 70, datetime(2026, 4, 20))
+        _add('上期范围外', 500, datetime(2026, 4, 10))
+        _add('待收货', 10, datetime(2026, 5, 5), receive_status='待收货')
+        db.session.commit()
+    
+    response = client.get('/api/dashboard?startDate=2026-05-01&endDate=2026-05-20')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['total'] == 140.0
+    assert data['count'] == 2
+    assert data['previous_start_date'] == '2026-04-11'
+    assert data['previous_end_date'] == '2026-04-30'
+    assert data['previous_total'] == 70.0
+    assert data['delta'] == 70.0
+    assert data['delta_ratio'] == 1.0
+    assert dict(zip(data['categories'], data['values'])) == {'食品': 140.0}
+    assert data['top_channels'] == [{'name': '京东', 'total': 100.0}, {'name': '淘宝', 'total': 40.0}]
+    assert data['top_sub_types'][0] == {'name': '日常用品', 'total': 100.0}
+    assert data['pending_count'] == 1
+
+def test_dashboard_previous_period_does_not_overlap(client, init_db):
+    """测试长于一个月的区间：上期天数相同，在本期开始前一天结束，不与本期重叠"""
+    data = client.get('/api/dashboard?startDate=2026-01-01&endDate=2026-03-31').get_json()['data']
+    assert data['previous_start_date'] == '2025-10-03'
+    assert data['previous_end_date'] == '2025-12-31'
+
+def test_dashboard_empty_range_and_bad_range(client, init_db):
+    """测试区间内无数据时仍返回待收货数量，开始日期晚于结束日期返回400"""
+    data = client.get('/api/dashboard?startDate=2000-01-01&endDate=2000-01-31').get_json()['data']
+    assert data['total'] == 0 and data['delta_ratio'] is None and data['pending_count'] == 0
+    assert client.get('/api/dashboard?startDate=2026-05-02&endDate=2026-05-01').status_code == 400
+
+def test_index_embeds_bootstrap_json(client, init_db):
+    """测试首页嵌入概览数据"""
+    html = client.get('/').get_data(as_text=True)
+    match = re.search(r'<script id="dashboardData" type="application/json">(.*?)</script>', html, re.S)
+    dashboard = json.loads(match.group(1))
+    assert dashboard['total'] == 250.0
+    assert dashboard['start_date'] == date.today().replace(day=1).strftime('%Y-%m-%d')
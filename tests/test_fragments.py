@@ -0,0 +1,71 @@
+from app.models.data_version import LOOKUP_VERSION, get_data_version
+
+def test_list_page_renders_lookup_options(client, init_db):
+    """测试消费列表页渲染字典表下拉选项"""
+    html = client.get('/list').get_data(as_text=True)
+    assert '<option value="淘宝">淘宝</option>' in html
+    assert '<option value="日常用品">日常用品</option>' in html
+
+def test_fragment_rebuilt_after_rename(app, client, init_db):
+    """测试修改字典表后片段缓存按版本失效"""
+    channel_id = client.get('/api/channel').get_json()['data'][0]['id']
+    with app.app_context():
+        version = get_data_version(LOOKUP_VERSION)
+    assert '淘宝' in client.get('/manage').get_data(as_text=True)
+    
+    client.put(f'/api/channel/{channel_id}', json={'name': '天猫'})
+    with app.app_context():
+        assert get_data_version(LOOKUP_VERSION) == version + 1
+    
+    html = client.get('/manage').get_data(as_text=True)
+    assert '天猫' in html
+    assert '淘宝' not in html
+    assert '<option value="天猫">天猫</option>' in client.get('/list').get_data(as_text=True)
+
+def test_fragment_rebuilt_after_implicit_lookup_create(client, init_db):
+    """测试新增消费项时自动创建的字典项也会出现在片段中"""
+    assert '拼多多' not in client.get('/price').get_data(as_text=True)
+    client.post('/api/consumption', json={
+        'content': '测试商品', 'quantity': 1, 'total_price': 10.0,
+        'channel': '拼多多', 'main_type': '食品', 'sub_type': '新类型'
+    })
+    assert '<option value="新类型">新类型</option>' in client.get('/price').get_data(as_text=True)
+    assert '拼多多' in client.get('/manage').get_data(as_text=True)
+
+def test_deleted_sub_type_only_offered_for_price_query(client, init_db):
+    """测试已删除的统计类型不再出现在列表和管理页，仍被引用时可在价格查询页查询历史价格"""
+    sub_type_id = client.post('/api/sub-type', json={'name': '未使用'}).get_json()['data']['id']
+    client.delete(f'/api/sub-type/{sub_type_id}')
+    client.delete('/api/sub-type/1')
+
+    assert [item['name'] for item in client.get('/api/sub-type').get_json()['data']] == ['电子产品']
+    assert '<option value="日常用品">' not in client.get('/list').get_data(as_text=True)
+    assert '日常用品' not in client.get('/manage').get_data(as_text=True)
+    html = client.get('/price').get_data(as_text=True)
+    assert html.index('<option value="电子产品">') < html.index('<option value="日常用品">')
+    assert '未使用' not in html
+    # 已删除统计类型的消费项仍能解析名称
+    assert client.get('/api/consumption/1').get_json()['data']['sub_type'] == '日常用品'
+
+def test_page_uses_preloaded_fragments(client, init_db, monkeypatch):
+    """测试页面直接使用并发加载的片段，不在渲染时再次加载，字典表数据版本每个请求只读取一次"""
+    import app.fragments as fragments
+    from app import db
+    from sqlalchemy import event
+
+    calls = []
+    load_fragment = fragments.load_fragment
+    monkeypatch.setattr(fragments, 'load_fragment',
+                        lambda name, version=None: calls.append(name) or load_fragment(name, version))
+    client.get('/list')
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        html = client.get('/list').get_data(as_text=True)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert '<option value="淘宝">淘宝</option>' in html
+    assert sorted(calls) == sorted(['channel_options', 'main_type_options', 'sub_type_options'] * 2)
+    assert len([statement for statement in statements if 'FROM data_versions' in statement]) == 1
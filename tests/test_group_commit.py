@@ -0,0 +1,84 @@
+import pytest
+import threading
+from app import create_app, db
+from app.group_commit import get_group_committer
+from app.models import Channel, Consumption
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """合并提交在后台线程中执行，使用文件数据库"""
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "group.db"}')
+    monkeypatch.setenv('GROUP_COMMIT', '1')
+    monkeypatch.setenv('GROUP_COMMIT_MAX_DELAY_MS', '20')
+    app = create_app()
+    app.config['TESTING'] = True
+    
+    yield app
+    
+    with app.app_context():
+        db.engine.dispose()
+
+def _run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_creates_share_commits(app, init_db):
+    """测试并发新增合并提交：各自返回自己的ID，数据全部提交，提交次数少于新增次数"""
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['ledger', 'reconcile-budgets', '--fix']).exit_code == 0
+    results = []
+    
+    def post(worker):
+        client = app.test_client()
+        for i in range(10):
+            response = client.post('/api/consumption', json={
+                'content': f'纸巾{worker}-{i}', 'quantity': 1, 'total_price': 10 + i,
+                'channel': '淘宝', 'main_type': '食品', 'sub_type': '日常用品'
+            })
+            results.append((response.status_code, response.get_json()['data']))
+    
+    _run_threads(8, post)
+    
+    assert [status for status, _ in results] == [201] * 80
+    assert len({data['id'] for _, data in results}) == 80
+    assert all(data['budget'] is None and 'price_verdict' in data for _, data in results)
+    with app.app_context():
+        assert Consumption.query.count() == 82
+        committer = get_group_committer()
+        assert committer.items == 80
+        assert committer.batches < 80
+    
+    # 各项在保存点中维护的当月累计与按表汇总一致
+    assert runner.invoke(args=['ledger', 'reconcile-budgets']).exit_code == 0
+    client = app.test_client()
+    assert client.get('/api/consumption/suggest?prefix=纸巾7-').get_json()['data'][0]['content'].startswith('纸巾7-')
+
+def test_failed_item_only_fails_its_caller(app, init_db):
+    """测试同一批中单项出错只回滚该项，异常交还给对应的调用方"""
+    outcomes = {}
+    barrier = threading.Barrier(4)
+    
+    def work(i):
+        if i == 2:
+            raise ValueError('单项失败')
+        db.session.add(Channel(name=f'渠道{i}'))
+        db.session.flush()
+        return i
+    
+    def submit(i):
+        with app.app_context():
+            barrier.wait()
+            try:
+                outcomes[i] = get_group_committer().submit(lambda: work(i))
+            except ValueError as e:
+                outcomes[i] = str(e)
+    
+    _run_threads(4, submit)
+    
+    assert outcomes == {0: 0, 1: 1, 2: '单项失败', 3: 3}
+    with app.app_context():
+        names = {channel.name for channel in Channel.query.all()}
+        assert names == {'淘宝', '京东', '渠道0', '渠道1', '渠道3'}
@@ -0,0 +1,156 @@
+import json
+import pytest
+import threading
+from app import create_app, db
+from app.jobs import job_type, get_job_runner
+from app.models import Job
+
+# 测试用任务：等待信号后结束，期间响应取消
+release = threading.Event()
+
+@job_type('test_wait', max_concurrency=1)
+def wait_job(ctx, value=None):
+    while not release.wait(0.01):
+        ctx.check_cancelled()
+    return {'value': value}
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """任务在后台线程中执行，使用文件数据库，避免与请求线程共用同一个内存库连接"""
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "jobs.db"}')
+    app = create_app()
+    app.config['TESTING'] = True
+    
+    yield app
+    
+    with app.app_context():
+        db.engine.dispose()
+
+def test_run_recompute_job(app, client, init_db):
+    """测试提交重算任务并查询结果"""
+    response = client.post('/api/jobs', json={'job_type': 'recompute_prices', 'params': {'chunk_size': 1}})
+    assert response.status_code == 202
+    job_id = response.get_json()['data']['id']
+    
+    with app.app_context():
+        assert get_job_runner().wait(job_id, timeout=5)
+    
+    response = client.get(f'/api/jobs/{job_id}')
+    data = response.get_json()['data']
+    assert data['status'] == 'succeeded'
+    assert data['progress'] == 1.0
+    assert data['result'] == {'updated': 2}
+
+def test_export_job_download(app, client, init_db):
+    """测试导出任务生成可下载文件"""
+    response = client.post('/api/jobs', json={'job_type': 'export_consumption'})
+    job_id = response.get_json()['data']['id']
+    with app.app_context():
+        get_job_runner().wait(job_id, timeout=5)
+    
+    data = client.get(f'/api/jobs/{job_id}').get_json()['data']
+    assert data['result']['rows'] == 2
+    response = client.get(f'/api/jobs/{job_id}/download')
+    assert response.status_code == 200
+    assert '测试商品1' in response.data.decode('utf-8-sig')
+
+def test_unknown_job_type(client, init_db):
+    """测试提交未知任务类型"""
+    response = client.post('/api/jobs', json={'job_type': 'unknown'})
+    assert response.status_code == 400
+
+def test_concurrency_cap_and_cancel(app, client, init_db):
+    """测试同类型任务并发上限，以及取消排队中和运行中的任务"""
+    release.clear()
+    first = client.post('/api/jobs', json={'job_type': 'test_wait', 'params': {'value': 1}}).get_json()['data']['id']
+    second = client.post('/api/jobs', json={'job_type': 'test_wait', 'params': {'value': 2}}).get_json()['data']['id']
+    
+    # 并发上限为1，第二个任务排队，取消后直接结束
+    response = client.post(f'/api/jobs/{second}/cancel')
+    assert response.get_json()['data']['status'] == 'cancelled'
+    
+    # 运行中的任务在检查点响应取消
+    client.post(f'/api/jobs/{first}/cancel')
+    with app.app_context():
+        assert get_job_runner().wait(first, timeout=5)
+    assert client.get(f'/api/jobs/{first}').get_json()['data']['status'] == 'cancelled'
+    
+    # 名额释放后新任务可以执行
+    release.set()
+    third = client.post('/api/jobs', json={'job_type': 'test_wait', 'params': {'value': 3}}).get_json()['data']['id']
+    with app.app_context():
+        assert get_job_runner().wait(third, timeout=5)
+    assert client.get(f'/api/jobs/{third}').get_json()['data']['result'] == {'value': 3}
+
+def test_recover_interrupted_jobs(app, client, init_db):
+    """测试恢复：心跳超时的运行中任务标记失败，存活进程的任务不受影响，排队中的任务只执行一次"""
+    from datetime import datetime, timedelta
+
+    with app.app_context():
+        release.set()
+        stale = Job(job_type='test_wait', status='running', params='{}', heartbeat=datetime.now() - timedelta(minutes=5))
+        alive = Job(job_type='test_wait', status='running', params='{}', owner='other:1', heartbeat=datetime.now())
+        pending = Job(job_type='test_wait', status='pending', params=json.dumps({'value': 4}))
+        db.session.add_all([stale, alive, pending])
+        db.session.commit()
+        
+        # 创建应用（命令行、脚本导入应用时）不做恢复
+        other = create_app()
+        assert db.session.get(Job, stale.id).status == 'running'
+        
+        # 服务进程处理第一个请求前恢复；排队任务被两个进程同时入队时只执行一次
+        runner = get_job_runner()
+        with other.app_context():
+            other.extensions['job_runner'].recover()
+            assert other.extensions['job_runner'].wait(pending.id, timeout=5)
+        client.get('/api/jobs')
+        assert runner.wait(pending.id, timeout=5)
+        
+        db.session.expire_all()
+        assert db.session.get(Job, stale.id).status == 'failed'
+        assert db.session.get(Job, alive.id).status == 'running'
+        finished = db.session.get(Job, pending.id)
+        assert finished.status == 'succeeded'
+        assert finished.owner is not None
+
+def test_claim_is_exclusive(app, init_db):
+    """测试任务只能被领取一次"""
+    from app.jobs import execute_job
+
+    with app.app_context():
+        release.set()
+        job = Job(job_type='test_wait', status='pending', params='{}')
+        db.session.add(job)
+        db.session.commit()
+        assert execute_job(job.id).status == 'succeeded'
+        finish_time = db.session.get(Job, job.id).finish_time
+        # 再次执行（如另一个进程重复入队）不会重新运行
+        assert execute_job(job.id).finish_time == finish_time
+
+def test_run_job_cli(app, init_db):
+    """测试命令行同步执行任务"""
+    result = app.test_cli_runner().invoke(args=['ledger', 'run-job', 'recompute_prices'])
+    assert result.exit_code == 0
+    assert '"status": "succeeded"' in result.output
+
+def test_running_job_heartbeat(app, client, init_db):
+    """测试运行中的任务定期更新心跳"""
+    import time
+
+    app.config['JOB_HEARTBEAT_INTERVAL'] = 0.01
+    release.clear()
+    job_id = client.post('/api/jobs', json={'job_type': 'test_wait'}).get_json()['data']['id']
+    try:
+        with app.app_context():
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                job = db.session.get(Job, job_id, populate_existing=True)
+                if job.status == 'running' and job.heartbeat > job.start_time:
+                    break
+                db.session.rollback()
+                time.sleep(0.02)
+            assert job.heartbeat > job.start_time
+    finally:
+        release.set()
+    with app.app_context():
+        assert get_job_runner().wait(job_id, timeout=5)
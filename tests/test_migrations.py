@@ -0,0 +1,120 @@
+from sqlalchemy import create_engine, text
+from app.migrations import lookup_fk
+
+LEGACY_SCHEMA = [
+    'CREATE TABLE channels (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL UNIQUE)',
+    'CREATE TABLE main_types (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL UNIQUE)',
+    'CREATE TABLE sub_types (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL UNIQUE)',
+    '''CREATE TABLE consumption (
+        id INTEGER PRIMARY KEY,
+        content VARCHAR(255) NOT NULL,
+        total_price DECIMAL(10, 2) NOT NULL,
+        channel VARCHAR(50) NOT NULL,
+        main_type VARCHAR(50) NOT NULL,
+        sub_type VARCHAR(50),
+        create_time DATETIME NOT NULL
+    )''',
+]
+
+def test_lookup_fk_migration():
+    """测试字符串列迁移为整数外键"""
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO channels (name) VALUES ('淘宝')"))
+        conn.execute(text("INSERT INTO main_types (name) VALUES ('食品')"))
+        conn.execute(text(
+            "INSERT INTO consumption (content, total_price, channel, main_type, sub_type, create_time) VALUES "
+            "('商品1', 10, '淘宝', '食品', '零食', '2026-01-01 10:00:00'), "
+            "('商品2', 20, '京东', '食品', NULL, '2026-01-02 10:00:00'), "
+            "('商品3', 30, '', '食品', '', '2026-01-03 10:00:00')"
+        ))
+
+        lookup_fk.upgrade(conn)
+        # 重复执行不应报错
+        lookup_fk.upgrade(conn)
+
+        rows = conn.execute(text(
+            'SELECT c.content, ch.name, mt.name, st.name FROM consumption c '
+            'JOIN channels ch ON ch.id = c.channel_id '
+            'JOIN main_types mt ON mt.id = c.main_type_id '
+            'LEFT JOIN sub_types st ON st.id = c.sub_type_id ORDER BY c.id'
+        )).all()
+        assert [tuple(r) for r in rows] == [
+            ('商品1', '淘宝', '食品', '零食'), ('商品2', '京东', '食品', None), ('商品3', '未设置', '食品', None)
+        ]
+
+        # 补入的字典项标记为已删除，原有字典项不受影响；空名称的渠道归入“未设置”
+        channels = dict(conn.execute(text('SELECT name, is_deleted FROM channels')).all())
+        assert channels == {'淘宝': 0, '京东': 1, '未设置': 1}
+
+        columns = {r[1] for r in conn.execute(text('PRAGMA table_info(consumption)')).all()}
+        assert 'channel' not in columns and 'channel_id' in columns
+
+def test_money_storage_migration_round_trip():
+    """测试金额列转为整数分后再转回DECIMAL"""
+    from app.migrations import money_storage
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE consumption (id INTEGER PRIMARY KEY, total_price DECIMAL(10, 2) NOT NULL, '
+            'min_unit_price DECIMAL(10, 2), daily_average_price DECIMAL(10, 2))'
+        ))
+        conn.execute(text(
+            'INSERT INTO consumption (total_price, min_unit_price, daily_average_price) VALUES '
+            '(10.01, 3.34, NULL), (0.29, 0.1, 0)'
+        ))
+
+        money_storage.upgrade(conn)
+        money_storage.upgrade(conn)
+        rows = conn.execute(text(
+            'SELECT total_price, min_unit_price, daily_average_price, typeof(total_price) FROM consumption ORDER BY id'
+        )).all()
+        assert [tuple(r) for r in rows] == [(1001, 334, None, 'integer'), (29, 10, 0, 'integer')]
+
+        money_storage.downgrade(conn)
+        rows = conn.execute(text('SELECT total_price, min_unit_price FROM consumption ORDER BY id')).all()
+        assert [tuple(r) for r in rows] == [(10.01, 3.34), (0.29, 0.1)]
+
+def test_consumption_version_migration():
+    """测试增加行版本号列，已有行版本号为1"""
+    from app.migrations import consumption_version
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE consumption (id INTEGER PRIMARY KEY, content VARCHAR(255) NOT NULL)'))
+        conn.execute(text("INSERT INTO consumption (content) VALUES ('商品1')"))
+
+        consumption_version.upgrade(conn)
+        consumption_version.upgrade(conn)
+        assert conn.execute(text('SELECT version FROM consumption')).scalar() == 1
+
+def test_job_heartbeat_migration():
+    """测试jobs表增加执行进程和心跳列"""
+    from app.migrations import job_heartbeat
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE jobs (id INTEGER PRIMARY KEY, status VARCHAR(20) NOT NULL)"))
+        job_heartbeat.upgrade(conn)
+        job_heartbeat.upgrade(conn)
+        columns = {r[1] for r in conn.execute(text('PRAGMA table_info(jobs)')).all()}
+        assert {'owner', 'heartbeat'} <= columns
+
+def test_data_versions_migration():
+    """测试预先写入数据版本计数行，已有版本号保持不变"""
+    from app.migrations import data_versions
+    from app.models.data_version import DATA_VERSION_SHARDS
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE data_versions (name VARCHAR(50) PRIMARY KEY, version INTEGER NOT NULL)'))
+        conn.execute(text("INSERT INTO data_versions (name, version) VALUES ('consumption', 7)"))
+        data_versions.upgrade(conn)
+        data_versions.upgrade(conn)
+        versions = dict(conn.execute(text('SELECT name, version FROM data_versions')).all())
+        assert len(versions) == 2 * DATA_VERSION_SHARDS
+        assert versions['consumption'] == 7
+        assert sum(versions.values()) == 7
@@ -0,0 +1,105 @@
+import pytest
+import threading
+import time
+from app import create_app, db
+from app.models import Channel
+from app.page_loader import load_page_data
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    """并发加载需要真正的连接池，使用文件数据库"""
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "loader.db"}')
+    app = create_app()
+    app.config['TESTING'] = True
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+def test_loads_concurrently_with_per_field_errors(file_app):
+    """测试各项并发执行，单项出错或超时只记录该项错误"""
+    threads = set()
+
+    def slow(value, seconds=0.2):
+        def loader():
+            threads.add(threading.current_thread().name)
+            time.sleep(seconds)
+            return value
+        return loader
+
+    def count_channels():
+        return Channel.query.count()
+
+    def broken():
+        raise RuntimeError('查询失败')
+
+    with file_app.app_context():
+        start = time.monotonic()
+        data = load_page_data({
+            'a': slow(1), 'b': slow(2), 'c': slow(3),
+            'channels': count_channels, 'broken': broken, 'hanging': slow(4, 1)
+        }, timeouts={'hanging': 0.05})
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 0.5
+    assert len(threads) > 1
+    assert data == {'a': 1, 'b': 2, 'c': 3, 'channels': 0}
+    assert data.errors == {'broken': '查询失败', 'hanging': '加载超时'}
+
+def test_page_renders_remaining_fields_on_error(app, client, init_db, monkeypatch):
+    """测试页面某项数据加载失败时，其余数据照常渲染并提示失败项"""
+    import app.models.consumption as consumption
+
+    def broken():
+        raise RuntimeError('查询失败')
+
+    monkeypatch.setattr(consumption, 'get_pending_count', broken)
+    html = client.get('/list').get_data(as_text=True)
+    assert 'id="loadErrors"' in html
+    assert '待收货数量' in html
+    assert '<option value="淘宝">淘宝</option>' in html
+
+    monkeypatch.undo()
+    assert 'id="loadErrors"' not in client.get('/manage').get_data(as_text=True)
+
+def test_hung_loader_does_not_block_later_pages(tmp_path, monkeypatch):
+    """测试超时仍在运行的项不占用后续页面的线程，卡住的项过多时退化为依次加载"""
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "hung.db"}')
+    monkeypatch.setenv('PAGE_LOADER_WORKERS', '1')
+    monkeypatch.setenv('PAGE_LOADER_MAX_HUNG', '2')
+    app = create_app()
+    release = threading.Event()
+
+    def hang():
+        release.wait(5)
+        return 'late'
+
+    def current_thread():
+        return threading.current_thread()
+
+    try:
+        with app.app_context():
+            loader = app.extensions['page_loader']
+            assert load_page_data({'hang': hang}, timeouts={'hang': 0.05}).errors == {'hang': '加载超时'}
+            assert loader.hung == 1
+            # 唯一的工作线程仍被占用，后续加载在新的线程池中执行
+            start = time.monotonic()
+            data = load_page_data({'thread': current_thread})
+            assert time.monotonic() - start < 1
+            assert data['thread'] is not threading.current_thread()
+
+            # 达到上限后在当前线程中依次加载
+            load_page_data({'hang': hang}, timeouts={'hang': 0.05})
+            assert loader.hung == 2
+            assert load_page_data({'thread': current_thread})['thread'] is threading.current_thread()
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while loader.hung and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert loader.hung == 0
+    finally:
+        release.set()
+        with app.app_context():
+            db.engine.dispose()
@@ -0,0 +1,66 @@
+import math
+from datetime import datetime, timedelta
+from app import db
+from app.models import Consumption
+from app.models.price_series import lttb
+
+def test_lttb_keeps_endpoints_and_extremes():
+    """测试LTTB保留首尾点和明显的峰值"""
+    points = [(i, math.sin(i / 10.0)) for i in range(1000)]
+    points[500] = (500, 10.0)
+    indexes = lttb(points, 50)
+    assert len(indexes) == 50
+    assert indexes[0] == 0 and indexes[-1] == 999
+    assert indexes == sorted(indexes)
+    assert 500 in indexes
+    
+    assert lttb(points[:10], 50) == list(range(10))
+
+def add_prices(prices, start=datetime(2026, 1, 1)):
+    for i, price in enumerate(prices):
+        db.session.add(Consumption(
+            content=f'纸巾{i}', quantity=1, total_price=price, channel='淘宝', main_type='食品',
+            sub_type='日常用品', min_unit_price=price, create_time=start + timedelta(days=i)
+        ))
+    db.session.commit()
+
+def test_price_series_rolling_purchases(app, client, init_db):
+    """测试按购买次数计算滚动均价和滚动最低价"""
+    with app.app_context():
+        db.session.query(Consumption).delete()
+        add_prices([10, 20, 30, 5, 40])
+    
+    response = client.get('/api/consumption/type/日常用品/series?window=3')
+    assert response.status_code == 200
+    points = response.get_json()['data']['points']
+    assert [p['rolling_avg'] for p in points] == [10.0, 15.0, 20.0, 18.33, 25.0]
+    assert [p['rolling_min'] for p in points] == [10.0, 10.0, 10.0, 5.0, 5.0]
+    
+    # 开始日期只裁剪输出，窗口仍包含之前的历史
+    response = client.get('/api/consumption/type/日常用品/series?window=3&startDate=2026-01-04')
+    points = response.get_json()['data']['points']
+    assert [p['rolling_avg'] for p in points] == [18.33, 25.0]
+
+def test_price_series_rolling_days(app, client, init_db):
+    """测试按天数计算滚动值"""
+    with app.app_context():
+        db.session.query(Consumption).delete()
+        add_prices([10, 20, 30, 5, 40])
+    
+    response = client.get('/api/consumption/type/日常用品/series?window=1&window_type=days')
+    points = response.get_json()['data']['points']
+    assert [p['rolling_min'] for p in points] == [10.0, 10.0, 20.0, 5.0, 5.0]
+
+def test_price_series_downsampled(app, client, init_db):
+    """测试降采样到指定点数"""
+    with app.app_context():
+        db.session.query(Consumption).delete()
+        add_prices([float(i % 17) for i in range(200)])
+    
+    response = client.get('/api/consumption/type/日常用品/series?points=20')
+    data = response.get_json()['data']
+    assert data['count'] == 200
+    assert len(data['points']) == 20
+    
+    response = client.get('/api/consumption/type/日常用品/series?points=1')
+    assert response.status_code == 400
@@ -0,0 +1,104 @@
+import random
+from bisect import bisect_right
+from app import db
+from app.models import Consumption
+from app.models.price_sketch import PriceSketch, TDigest
+
+def _rank_error(digest, sorted_values, q):
+    """摘要给出的分位数在精确排序中的实际位置与 q 的差"""
+    return abs(bisect_right(sorted_values, digest.quantile(q)) / len(sorted_values) - q)
+
+def test_tdigest_accuracy_against_exact_percentiles():
+    """测试摘要分位数与精确百分位数的误差，以及合并和序列化"""
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3, 1) for _ in range(20000)]
+    sorted_values = sorted(values)
+    whole, left, right = TDigest(), TDigest(), TDigest()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+    left.merge(right)
+
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        assert _rank_error(whole, sorted_values, q) < 0.005
+        assert _rank_error(left, sorted_values, q) < 0.005
+        assert abs(whole.cdf(sorted_values[int(q * len(values))]) - q) < 0.005
+
+    restored = TDigest.from_json(whole.to_json())
+    assert restored.count == 20000
+    assert len(restored.centroids) <= 2 * restored.compression
+    assert abs(restored.quantile(0.5) - whole.quantile(0.5)) < 1e-3
+
+def test_tdigest_cdf_counts_ties():
+    """测试与历史价格相等时计入全部相等的权重，包括历史价格全部相同"""
+    same = TDigest()
+    for _ in range(4):
+        same.add(10)
+    assert same.cdf(10) == 1.0
+    assert same.cdf(9.99) == 0.0
+
+    single = TDigest()
+    single.add(5)
+    assert single.cdf(5) == 1.0
+
+    ties = TDigest()
+    for value in (1, 2, 2, 2, 3):
+        ties.add(value)
+    assert ties.cdf(2) == 0.8
+    assert ties.cdf(1) == 0.2
+
+def test_price_verdict_on_create_and_quantiles_endpoint(app, client, init_db):
+    """测试新增消费项返回价格判断，分位数接口与精确值接近"""
+    with app.app_context():
+        db.session.add_all([Consumption(
+            content=f'纸巾{i}', quantity=1, total_price=float(price), channel='淘宝', main_type='食品',
+            sub_type='日常用品', min_unit_price=float(price)
+        ) for i, price in enumerate(range(1, 101))])
+        db.session.commit()
+
+    # 首次读取时按表重建（init_db 中的消费项未计算单价，不计入）
+    data = client.get('/api/sub-type/日常用品/quantiles').get_json()['data']
+    assert data['count'] == 100
+    assert abs(data['quantiles']['p50'] - 50.5) <= 1.5
+    assert abs(data['quantiles']['p90'] - 90.5) <= 1.5
+
+    payload = {'content': '纸巾', 'quantity': 1, 'channel': '淘宝', 'main_type': '食品', 'sub_type': '日常用品'}
+    verdict = client.post('/api/consumption', json={**payload, 'total_price': 20}).get_json()['data']['price_verdict']
+    assert verdict['verdict'] == 'normal'
+    assert 75 <= verdict['cheaper_than'] <= 85
+    assert verdict['history_count'] == 100
+    assert client.post('/api/consumption', json={**payload, 'total_price': 150}).get_json()['data']['price_verdict']['verdict'] == 'high'
+    assert client.post('/api/consumption', json={**payload, 'total_price': 3}).get_json()['data']['price_verdict']['verdict'] == 'low'
+
+    # 新增消费项增量加入摘要，无需重建
+    with app.app_context():
+        sketch = db.session.get(PriceSketch, 1)
+        assert sketch.built_version == sketch.version
+        assert sketch.count == 103
+
+    # 价格与全部历史相同时不比任何历史便宜
+    same = {**payload, 'sub_type': '电子产品'}
+    assert client.post('/api/consumption', json={**same, 'total_price': 10}).get_json()['data']['price_verdict'] is None
+    verdict = client.post('/api/consumption', json={**same, 'total_price': 10}).get_json()['data']['price_verdict']
+    assert verdict['history_count'] == 1
+    assert verdict['cheaper_than'] == 0.0
+
+    assert client.get('/api/sub-type/日常用品/quantiles?price=20').get_json()['data']['price_verdict']['verdict'] == 'normal'
+    assert client.get('/api/sub-type/不存在/quantiles').status_code == 404
+    assert client.get('/api/sub-type/日常用品/quantiles?price=abc').status_code == 400
+
+def test_sketch_rebuilt_after_update_and_delete(app, client, init_db, put_consumption):
+    """测试修改、删除后摘要过期，读取时按表重建"""
+    assert client.get('/api/sub-type/日常用品/quantiles').get_json()['data']['count'] == 0
+
+    put_consumption(1, {'total_price': 300})
+    data = client.get('/api/sub-type/日常用品/quantiles').get_json()['data']
+    assert data['max'] == 150.0
+
+    put_consumption(2, {'sub_type': '日常用品'})
+    assert client.get('/api/sub-type/日常用品/quantiles').get_json()['data']['count'] == 2
+
+    client.delete('/api/consumption/1')
+    data = client.get('/api/sub-type/日常用品/quantiles').get_json()['data']
+    assert data['count'] == 1
+    assert data['max'] == 50.0
@@ -0,0 +1,85 @@
+from app import db
+from app.models import Consumption
+from app.models.pricing import build_recompute_filters, drift_report, recompute_derived_prices
+import pytest
+
+def test_create_consumption_derived_prices(client, init_db):
+    """测试创建消费项时计算派生价格"""
+    response = client.post('/api/consumption', json={
+        'content': '测试商品3',
+        'quantity': 3,
+        'total_price': 50.0,
+        'channel': '淘宝',
+        'main_type': '食品',
+        'unit_coefficient': 1.0,
+        'start_use_time': '2026-01-01',
+        'end_use_time': '2026-01-03'
+    })
+    assert response.status_code == 201
+    data = response.get_json()['data']
+    assert data['min_unit_price'] == 16.67
+    assert data['daily_average_price'] == 16.67
+
+def test_update_consumption_derived_prices(client, init_db, put_consumption):
+    """测试更新消费项时重新计算派生价格"""
+    response = put_consumption(1, {
+        'total_price': 90.0,
+        'start_use_time': '2026-01-01',
+        'end_use_time': '2026-01-10'
+    })
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['min_unit_price'] == 45.0
+    assert data['daily_average_price'] == 9.0
+
+def test_recompute_derived_prices(app, init_db):
+    """测试派生价格漂移报告和批量重算"""
+    with app.app_context():
+        # 测试数据未设置派生价格，与公式不一致
+        report = drift_report()
+        assert report['total'] == 2
+        assert report['drifted'] == 2
+        assert report['samples'][0]['expected_min_unit_price'] == 100.0
+        
+        assert recompute_derived_prices(chunk_size=1) == 2
+        assert drift_report()['drifted'] == 0
+        assert recompute_derived_prices() == 0
+        
+        prices = [float(c.min_unit_price) for c in Consumption.query.order_by(Consumption.id)]
+        assert prices == [100.0, 50.0]
+        
+        # 只重算符合条件的行
+        db.session.query(Consumption).update({'min_unit_price': 0})
+        db.session.commit()
+        assert recompute_derived_prices([Consumption.id == 2]) == 1
+        assert drift_report()['drifted'] == 1
+
+def test_recompute_rejects_unknown_sub_type(app, init_db):
+    """测试指定不存在的统计类型时报错，不会误处理未设置统计类型的行"""
+    with app.app_context():
+        with pytest.raises(ValueError, match='未知的统计类型'):
+            build_recompute_filters(sub_type='不存在')
+        assert len(build_recompute_filters(sub_type='日常用品')) == 1
+
+    result = app.test_cli_runner().invoke(args=['ledger', 'recompute-prices', '--dry-run', '--sub-type', '不存在'])
+    assert result.exit_code == 2
+    assert '未知的统计类型: 不存在' in result.output
+
+def test_money_minor_unit_storage():
+    """测试整数分存储：绑定、读取、聚合结果换算，以及与普通数值的算术运算不做换算"""
+    from decimal import Decimal
+    from app.models.money import Money
+    from sqlalchemy import Column, Integer, MetaData, Table, create_engine, func, insert, select
+
+    metadata = MetaData()
+    table = Table('items', metadata, Column('id', Integer, primary_key=True), Column('price', Money(storage='cents')))
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(table), [{'price': 10.01}, {'price': Decimal('0.29')}, {'price': None}])
+        assert [r[0] for r in conn.execute(db.text('SELECT price FROM items ORDER BY id'))] == [1001, 29, None]
+        assert conn.execute(select(table.c.price).order_by(table.c.id)).scalars().all() == [Decimal('10.01'), Decimal('0.29'), None]
+        assert conn.execute(select(func.sum(table.c.price))).scalar() == Decimal('10.30')
+        # 比较时按金额换算，乘除时另一侧按普通数值
+        assert conn.execute(select(func.count()).where(table.c.price > 1)).scalar() == 1
+        assert conn.execute(select(table.c.price * 2).where(table.c.id == 2)).scalar() == 58
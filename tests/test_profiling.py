@@ -0,0 +1,60 @@
+import pstats
+import pytest
+from app import create_app
+
+@pytest.fixture
+def app(monkeypatch):
+    """启用请求性能分析，按密钥请求头触发"""
+    monkeypatch.setenv('PROFILING', '1')
+    monkeypatch.setenv('PROFILING_SECRET', 's3cret')
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+def test_profile_request_with_secret_header(client, init_db, tmp_path):
+    """测试带密钥的请求被分析，结果可查看和下载"""
+    response = client.get('/api/consumption')
+    assert 'X-Profile-Id' not in response.headers
+
+    response = client.get('/api/consumption', headers={'X-Profile': 's3cret'})
+    assert response.status_code == 200
+    profile_id = int(response.headers['X-Profile-Id'])
+
+    # 查看结果同样需要密钥
+    assert client.get('/api/debug/profiles').status_code == 403
+    headers = {'X-Profile': 's3cret'}
+    records = client.get('/api/debug/profiles', headers=headers).get_json()['data']
+    assert [record['id'] for record in records] == [profile_id]
+    assert records[0]['path'] == '/api/consumption'
+
+    data = client.get(f'/api/debug/profiles/{profile_id}', headers=headers).get_json()['data']
+    assert any('get_consumption' in row['function'] for row in data['top_functions'])
+    assert data['top_functions'][0]['cumtime_ms'] >= data['top_functions'][-1]['cumtime_ms']
+    assert data['top_allocations']
+
+    response = client.get(f'/api/debug/profiles/{profile_id}/pstats', headers=headers)
+    path = tmp_path / 'profile.pstats'
+    path.write_bytes(response.data)
+    assert pstats.Stats(str(path)).total_calls > 0
+    assert client.get('/api/debug/profiles/999', headers=headers).status_code == 404
+
+def test_disabled_by_default(monkeypatch, init_db):
+    """测试默认不启用：不注册分析钩子，查看接口返回404"""
+    monkeypatch.delenv('PROFILING')
+    app = create_app()
+    assert 'profiler' not in app.extensions
+    client = app.test_client()
+    response = client.get('/api/consumption', headers={'X-Profile': 's3cret'})
+    assert 'X-Profile-Id' not in response.headers
+    assert client.get('/api/debug/profiles').status_code == 404
+
+def test_profiles_require_secret(monkeypatch, init_db):
+    """测试未配置密钥时抽样分析照常进行，但分析结果无法查看"""
+    monkeypatch.delenv('PROFILING_SECRET')
+    monkeypatch.setenv('PROFILING_SAMPLE_RATE', '1')
+    app = create_app()
+    client = app.test_client()
+    assert 'X-Profile-Id' in client.get('/api/consumption?token=abc').headers
+    assert client.get('/api/debug/profiles').status_code == 403
+    assert client.get('/api/debug/profiles', headers={'X-Profile': ''}).status_code == 403
+    assert client.get('/api/debug/profiles/1/pstats').status_code == 403
@@ -0,0 +1,98 @@
+from app.result_cache import MemoryBackend, DiskBackend, RedisBackend
+from datetime import datetime
+import time
+
+class FakeRedis:
+    """内存实现的Redis替身，只实现缓存用到的命令"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        item = self.data.get(key)
+        if item is None or item[0] < time.time():
+            return None
+        return item[1]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (time.time() + ex if ex else float('inf'), value.encode('utf-8'))
+
+def test_memory_backend_lru_and_ttl():
+    """测试进程内缓存的容量上限和过期"""
+    backend = MemoryBackend(max_entries=2, ttl=60)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')
+    backend.set('c', 3)
+    assert backend.get('a') == 1
+    assert backend.get('b') is None
+    
+    expired = MemoryBackend(ttl=-1)
+    expired.set('a', 1)
+    assert expired.get('a') is None
+
+def test_disk_backend_shared_between_instances(tmp_path):
+    """测试磁盘缓存可被另一个实例（worker）读取"""
+    DiskBackend(str(tmp_path), ttl=60).set('key', {'values': [1.5]})
+    assert DiskBackend(str(tmp_path), ttl=60).get('key') == {'values': [1.5]}
+    assert DiskBackend(str(tmp_path), ttl=60).get('other') is None
+
+def test_redis_backend_with_fake_client():
+    """测试Redis后端的序列化和过期时间"""
+    client = FakeRedis()
+    backend = RedisBackend(client, ttl=60)
+    backend.set('key', {'categories': ['食品']})
+    assert backend.get('key') == {'categories': ['食品']}
+    assert list(client.data) == ['ledger:result:key']
+
+def test_statistics_cached_until_consumption_write(client, init_db):
+    """测试统计结果被缓存，消费项写入后自动失效"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    url = f'/api/consumption/statistics?startDate={today}&endDate={today}'
+    first = client.get(url).get_json()['data']
+    assert client.get(url).get_json()['data'] == first
+    
+    stats = client.get('/api/cache/stats').get_json()['data']
+    assert stats['statistics'] == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5}
+    
+    client.post('/api/consumption', json={
+        'content': '测试商品3', 'quantity': 1, 'total_price': 30.0,
+        'channel': '淘宝', 'main_type': '食品', 'sub_type': '日常用品', 'receive_status': '已收货'
+    })
+    after = client.get(url).get_json()['data']
+    assert after['values'][after['categories'].index('食品')] == first['values'][first['categories'].index('食品')] + 30.0
+    assert client.get('/api/cache/stats').get_json()['data']['statistics']['misses'] == 2
+
+def test_consumption_by_type_cache_follows_lookup_rename(client, init_db):
+    """测试字典表改名后按类型查询的结果不会返回旧名称"""
+    assert client.get('/api/consumption/type/日常用品').get_json()['data'][0]['channel'] == '淘宝'
+    channel_id = next(c['id'] for c in client.get('/api/channel').get_json()['data'] if c['name'] == '淘宝')
+    client.put(f'/api/channel/{channel_id}', json={'name': '天猫'})
+    assert client.get('/api/consumption/type/日常用品').get_json()['data'][0]['channel'] == '天猫'
+
+def test_cache_hit_reads_versions_in_one_query(app, client, init_db):
+    """测试缓存命中时两个数据版本只查询一次；计数行建表时预先写入，递增版本号只执行UPDATE"""
+    from app import db
+    from app.models.data_version import CONSUMPTION_VERSION, get_data_version
+    from app.models.consumption import mark_consumption_changed
+    from sqlalchemy import event
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    url = f'/api/consumption/statistics?startDate={today}&endDate={today}'
+    client.get(url)
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client.get(url)
+        assert len(statements) == 1 and 'FROM data_versions' in statements[0]
+        
+        statements.clear()
+        version = get_data_version(CONSUMPTION_VERSION)
+        mark_consumption_changed()
+        db.session.commit()
+        assert get_data_version(CONSUMPTION_VERSION) == version + 1
+        assert not any(statement.startswith('INSERT') for statement in statements)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
@@ -0,0 +1,64 @@
+import pytest
+import threading
+from app import create_app, db
+from app.models import Consumption
+from app.sqlite_profile import run_maintenance
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """SQLite 运行配置只对文件型数据库生效"""
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "profile.db"}')
+    app = create_app()
+    app.config['TESTING'] = True
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+def test_pragmas_and_maintenance(app, init_db):
+    """测试连接参数已设置，维护任务可以执行"""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert connection.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+            assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+            assert connection.exec_driver_sql('PRAGMA cache_size').scalar() == -64000
+
+        busy, _, _ = run_maintenance(db.engine)
+        assert busy == 0
+
+def test_concurrent_readers_and_writers(app, init_db):
+    """测试多线程同时新增消费和查询统计，不出现 database is locked"""
+    writers, readers, per_thread = 6, 4, 10
+    statuses = []
+    lock = threading.Lock()
+
+    def write(n):
+        client = app.test_client()
+        for i in range(per_thread):
+            response = client.post('/api/consumption', json={
+                'content': f'并发商品{n}-{i}', 'quantity': 1, 'total_price': 10.0,
+                'channel': '淘宝' if i % 2 else '京东', 'main_type': '食品', 'sub_type': f'并发分类{n}'
+            })
+            with lock:
+                statuses.append(response.status_code)
+
+    def read():
+        client = app.test_client()
+        for _ in range(per_thread):
+            response = client.get('/api/consumption/statistics?startDate=2000-01-01&endDate=2999-12-31')
+            with lock:
+                statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(statuses) == (writers + readers) * per_thread
+    assert all(status < 300 for status in statuses)
+    with app.app_context():
+        assert Consumption.query.count() == 2 + writers * per_thread
@@ -0,0 +1,96 @@
+from app import create_app, db
+from app.models import Consumption
+from app.models.consumption import mark_consumption_changed
+from app.models.suggest import get_content_index
+from datetime import datetime
+import threading
+
+def _add(content, total_price, create_time, channel='淘宝'):
+    db.session.add(Consumption(
+        content=content, quantity=1, total_price=total_price, channel=channel, main_type='食品',
+        create_time=create_time
+    ))
+
+def test_suggest_ranked_with_last_purchase(app, client, init_db):
+    """测试按前缀补全，按频率和最近购买排序，并返回最近一次的价格和渠道"""
+    with app.app_context():
+        _add('牛奶', 50, datetime(2026, 1, 1))
+        _add('牛奶', 55, datetime(2026, 3, 1), channel='京东')
+        _add('牛肉', 80, datetime(2026, 2, 1))
+        _add('牛排', 99, datetime(2024, 1, 1))
+        db.session.commit()
+    
+    data = client.get('/api/consumption/suggest?prefix=牛').get_json()['data']
+    assert [item['content'] for item in data] == ['牛奶', '牛肉', '牛排']
+    assert data[0]['count'] == 2
+    assert data[0]['total_price'] == 55.0
+    assert data[0]['channel'] == '京东'
+    assert data[0]['main_type'] == '食品'
+    assert client.get('/api/consumption/suggest?prefix=牛&limit=1').get_json()['data'][0]['content'] == '牛奶'
+    assert client.get('/api/consumption/suggest?prefix=羊').get_json()['data'] == []
+    assert client.get('/api/consumption/suggest?prefix=').status_code == 400
+
+def test_suggest_incremental_update_and_rebuild(app, client, init_db, put_consumption):
+    """测试新增、修改、删除消费项增量更新索引，其他进程写入后重建索引"""
+    assert client.get('/api/consumption/suggest?prefix=测试').get_json()['data'][0]['content'] == '测试商品2'
+    with app.app_context():
+        index = get_content_index()
+        builds = []
+        original_build = index.build
+        index.build = lambda: (builds.append(1), original_build())
+    
+    response = client.post('/api/consumption', json={
+        'content': '测试商品9', 'quantity': 1, 'total_price': 9.0, 'channel': '淘宝', 'main_type': '食品'
+    })
+    id = response.get_json()['data']['id']
+    data = client.get('/api/consumption/suggest?prefix=测试商品9').get_json()['data']
+    assert data[0]['total_price'] == 9.0
+    
+    put_consumption(id, {'content': '测试商品8', 'channel': '京东'})
+    assert client.get('/api/consumption/suggest?prefix=测试商品9').get_json()['data'] == []
+    assert client.get('/api/consumption/suggest?prefix=测试商品8').get_json()['data'][0]['channel'] == '京东'
+    
+    client.patch('/api/consumption/bulk', json={'ids': [id], 'operation': 'set_tag', 'value': '常买'})
+    client.delete(f'/api/consumption/{id}')
+    assert client.get('/api/consumption/suggest?prefix=测试商品8').get_json()['data'] == []
+    assert builds == []
+    
+    # 其他进程的写入只能通过数据版本发现，需要重建
+    with app.app_context():
+        _add('测试商品7', 7, datetime(2026, 1, 1))
+        mark_consumption_changed()
+        db.session.commit()
+    assert client.get('/api/consumption/suggest?prefix=测试商品7').get_json()['data'][0]['total_price'] == 7.0
+    assert builds == [1]
+
+def test_stale_index_rebuilds_in_background(tmp_path, monkeypatch):
+    """测试数据版本变化后继续使用旧索引，由一个后台线程重建"""
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "suggest.db"}')
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        _add('牛奶', 50, datetime(2026, 1, 1))
+        db.session.commit()
+        index = get_content_index()
+        assert [item['content'] for item in index.suggest('牛')] == ['牛奶']
+        
+        release = threading.Event()
+        original_load = index._load
+        def slow_load(*filters):
+            release.wait(5)
+            return original_load(*filters)
+        index._load = slow_load
+        _add('牛肉', 80, datetime(2026, 2, 1))
+        mark_consumption_changed()
+        db.session.commit()
+        
+        # 重建期间返回旧索引，且只启动一个重建线程
+        assert [item['content'] for item in index.suggest('牛')] == ['牛奶']
+        assert [item['content'] for item in index.suggest('牛')] == ['牛奶']
+        assert len([t for t in threading.enumerate() if t.name == 'content-index-rebuild']) == 1
+        release.set()
+        with index._build_lock:
+            pass
+        assert [item['content'] for item in index.suggest('牛')] == ['牛肉', '牛奶']
+        db.drop_all()
+        db.engine.dispose()
@@ -0,0 +1,46 @@
+def test_create_usage_records(client, init_db):
+    """测试批量创建使用记录并更新消费项"""
+    response = client.post('/api/consumption/1/usage', json={'records': [
+        {'startUseTime': '2026-01-01', 'endUseTime': '2026-01-05'},
+        {'startUseTime': '2026-01-06', 'endUseTime': '2026-01-10'}
+    ]})
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['data']['count'] == 2
+    consumption = data['data']['consumption']
+    assert consumption['start_use_time'] == '2026-01-01'
+    assert consumption['end_use_time'] == '2026-01-10'
+    assert consumption['daily_average_price'] == 20.0
+
+def test_create_usage_records_exceeds_quantity(client, init_db):
+    """测试使用数量超过消费项数量"""
+    client.post('/api/consumption/1/usage', json={'records': [
+        {'startUseTime': '2026-01-01', 'endUseTime': '2026-01-05'}
+    ]})
+    response = client.post('/api/consumption/1/usage', json={'records': [
+        {'startUseTime': '2026-01-06', 'endUseTime': '2026-01-10'},
+        {'startUseTime': '2026-01-11', 'endUseTime': '2026-01-15'}
+    ]})
+    assert response.status_code == 400
+    assert response.get_json()['success'] == False
+    
+    # 失败的提交不写入任何记录
+    response = client.get('/api/consumption/1/usage')
+    assert len(response.get_json()['data']) == 1
+
+def test_create_usage_records_invalid_range(client, init_db):
+    """测试使用开始时间晚于结束时间"""
+    response = client.post('/api/consumption/1/usage', json={'records': [
+        {'startUseTime': '2026-01-05', 'endUseTime': '2026-01-01'}
+    ]})
+    assert response.status_code == 400
+
+def test_get_usage_records_by_ids(client, init_db):
+    """测试批量获取多个消费项的使用记录"""
+    client.post('/api/consumption/1/usage', json={'records': [
+        {'startUseTime': '2026-01-01', 'endUseTime': '2026-01-05'}
+    ]})
+    response = client.get('/api/consumption/usage?ids=1,2')
+    data = response.get_json()['data']
+    assert len(data['1']) == 1
+    assert data['2'] == []